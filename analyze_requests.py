@@ -0,0 +1,105 @@
+import click
+import column_cache
+import milliscope
+import multiprocessing
+import os
+
+
+def analyze_group(pid, port, log_entries, output_path, interval_size):
+    """Calculate the response times and queue lengths of a server, write them to data files in its
+    own directory, along with their statistics, and return the lines of the statistics.
+
+    pid -- [int] Process id of the server.
+    port -- [int] Port of the server.
+    log_entries -- [numpy.ndarray/str] Log entries of the server sorted by timestamp, or path to
+                   the cache of the milliScope log files to read them from.
+    output_path -- [str] Path to the directory where the directory of the server is created.
+    interval_size -- [int] Length of an interval in microseconds.
+    """
+    if isinstance(log_entries, str):
+        chunks = milliscope.stream_cached_log_entries(pid, port, log_entries)
+    else:
+        chunks = milliscope.iter_chunks(log_entries)
+    group_path = os.path.join(output_path, "{pid}_{port}".format(pid=pid, port=port))
+    os.makedirs(group_path, exist_ok=True)
+    (start_ts, finish_ts) = milliscope.request_spans(chunks)
+    statistics = milliscope.write_response_times(
+        start_ts, finish_ts, os.path.join(group_path, "response_time.data")
+    ) + milliscope.write_queue_lengths(
+        start_ts, finish_ts, interval_size, os.path.join(group_path, "queue_length.data")
+    )
+    with open(os.path.join(group_path, "statistics.txt"), 'w') as statistics_file:
+        for line in statistics:
+            statistics_file.write(line + "\n")
+    return statistics
+
+
+def analyze_group_star(args):
+    """Call function analyze_group with a tuple of arguments, for multiprocessing.Pool.imap.
+
+    args -- [tuple] Arguments of function analyze_group.
+    """
+    return analyze_group(*args)
+
+
+@click.command()
+@click.option("-g", "--group", "groups", metavar="<pid>:<port>", multiple=True)
+@click.option("--logs-path", default="logs")
+@click.option("-o", "--output-path", default=".")
+@click.option("--interval-size", default=milliscope.INTERVAL_SIZE)
+@click.option("-p", "--processes", default=None, type=int)
+def main(groups, logs_path, output_path, interval_size, processes):
+    """Calculate the response times and queue lengths of every server, i.e., every process id and
+    port in the milliScope log files, or of the specified ones, reading the log files once.
+
+    The data files and statistics of a server are written to directory <output_path>/<pid>_<port>.
+    Servers are analyzed in parallel by a pool of processes.
+
+    groups -- [list of str] Process ids and ports of the servers, or none to analyze all servers.
+    logs_path -- [str] Path to the directory of the milliScope log files.
+    output_path -- [str] Path to the directory of the output.
+    interval_size -- [int] Length of an interval of queue lengths in microseconds.
+    processes -- [int] Number of processes, by default the number of CPUs.
+    """
+    cache_path = os.path.join(logs_path, milliscope.CACHE_DIRECTORY)
+    if column_cache.is_fresh(cache_path, milliscope.log_paths(logs_path)):
+        # Every process reads the rows of its servers from the cache.
+        index = column_cache.read(cache_path, "index")
+        group_log_entries = {
+            (pid, port): cache_path
+            for (pid, port) in zip(index["pid"].tolist(), index["port"].tolist())
+        }
+    else:
+        (log_entries, index) = milliscope.read_grouped_log_entries(logs_path)
+        group_log_entries = {
+            (pid, port): log_entries[start:stop]
+            for (pid, port, start, stop) in index.tolist()
+        }
+    if groups:
+        selected_groups = [tuple([int(value) for value in group.split(":")]) for group in groups]
+    else:
+        selected_groups = sorted(group_log_entries.keys())
+    tasks = []
+    for (pid, port) in selected_groups:
+        if (pid, port) not in group_log_entries:
+            print("No log entries of PID %s on port %s" % (pid, port))
+            continue
+        tasks.append((pid, port, group_log_entries[(pid, port)], output_path, interval_size))
+    if processes == 1:
+        results = map(analyze_group_star, tasks)
+    else:
+        pool = multiprocessing.Pool(processes)
+        results = pool.imap(analyze_group_star, tasks)
+    try:
+        for (task, statistics) in zip(tasks, results):
+            print("PID %s on port %s:" % (task[0], task[1]))
+            for line in statistics:
+                print("  " + line)
+    finally:
+        if processes != 1:
+            pool.close()
+            pool.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+import analyze_requests
+import click
+import codecs
+import collectl
+import cpu
+import disk
+import downsample
+import mem
+import milliscope
+import multiprocessing
+import numpy
+import os
+import re
+import tarfile
+
+# Extensions of result tarballs, removed from their names to name the runs.
+TARBALL_EXTENSIONS = (".tar.gz", ".tgz", ".tar.xz", ".tar.bz2", ".tar")
+
+# Name of a collectl raw file renamed after an experiment, <host>_COLL_<extension>.data.
+COLLECTL_FILE_NAME = re.compile(r"^(?P<host>.+)_COLL_(?P<extension>[a-z]+)\.data$")
+
+# Analyzer of the collectl raw files of every extension: the details of each CPU (-sC), the
+# details of each disk (-sD), and the summary of memory, network, and TCP (-smnt).
+COLLECTL_ANALYZERS = {"cpu": cpu, "dsk": disk, "tab": mem}
+
+# Name of the file of the statistics of all runs, written to the output directory.
+STATISTICS_FILE_NAME = "statistics.tsv"
+
+
+def run_name(tarball_path):
+    """Return the name of the run of a result tarball, i.e., its file name without extension.
+
+    tarball_path -- [str] Path to the result tarball.
+    """
+    name = os.path.basename(tarball_path)
+    for extension in TARBALL_EXTENSIONS:
+        if name.endswith(extension):
+            return name[:-len(extension)]
+    return name
+
+
+def log_directory(member_name):
+    """Return the directory of a member of a result tarball, without its "." and ".." components,
+    e.g., "web/logs" for the milliScope log files of one host, or "" at the top level.
+
+    member_name -- [str] Name of the member.
+    """
+    return "/".join([
+        part for part in os.path.dirname(member_name).split("/") if part not in ("", ".", "..")
+    ])
+
+
+def analyze_run(tarball_path, output_path, interval_size, plot_points):
+    """Run the analyzers on the collectl raw files and milliScope log files of a result tarball,
+    streaming its members without extracting them, write the data files to directory
+    <output_path>/<run>/<host> for the collectl raw files of a host and <output_path>/<run>/<dir>/
+    <pid>_<port> for a server in the milliScope log files of directory <dir> of the tarball (see
+    function log_directory), and return their statistics, as a list of (source, statistic, value)
+    tuples. The milliScope log files of every directory, e.g., of every host, are analyzed
+    separately.
+
+    tarball_path -- [str] Path to the result tarball.
+    output_path -- [str] Path to the directory where the directory of the run is created.
+    interval_size -- [int] Length of an interval of queue lengths in microseconds.
+    plot_points -- [int/None] Number of points of the time series downsampled for plotting (see
+                   function downsample.downsample), or None not to downsample them.
+    """
+    run_path = os.path.join(output_path, run_name(tarball_path))
+    statistics = []
+    # Log entries of the milliScope log files of every directory, by syscall.
+    event_log_entries = {}
+    with tarfile.open(tarball_path, "r|*") as tarball:
+        for member in tarball:
+            if not member.isfile():
+                continue
+            name = os.path.basename(member.name)
+            match = COLLECTL_FILE_NAME.match(name)
+            if match and match.group("extension") in COLLECTL_ANALYZERS:
+                host_path = os.path.join(run_path, match.group("host"))
+                os.makedirs(host_path, exist_ok=True)
+                # io.TextIOWrapper requires seekable members, which streamed ones are not.
+                chunks = collectl.iter_stream(
+                    codecs.getreader("utf-8")(tarball.extractfile(member))
+                )
+                for line in COLLECTL_ANALYZERS[match.group("extension")].analyze(
+                        chunks, host_path):
+                    statistics.append((match.group("host"),) + tuple(line.split(": ", 1)))
+                continue
+            for (event, log_path) in zip(milliscope.EVENTS, milliscope.log_paths(".")):
+                if name == os.path.basename(log_path):
+                    event_log_entries.setdefault(
+                        log_directory(member.name), {event: [] for event in milliscope.EVENTS}
+                    )[event].extend(milliscope.iter_log_stream(tarball.extractfile(member), event))
+    for directory in sorted(event_log_entries):
+        directory_log_entries = event_log_entries.pop(directory)
+        if not all(directory_log_entries.values()):
+            continue
+        # Log entries with the same timestamp are kept in the order of the log files.
+        (log_entries, index) = milliscope.group_log_entries(numpy.concatenate([
+            log_entries for event in milliscope.EVENTS
+            for log_entries in directory_log_entries[event]
+        ]))
+        del directory_log_entries
+        for (pid, port, start, stop) in index.tolist():
+            for line in analyze_requests.analyze_group(
+                    pid, port, log_entries[start:stop], os.path.join(run_path, directory),
+                    interval_size):
+                statistics.append((os.path.join(directory, "%s_%s" % (pid, port)),) +
+                                  tuple(line.split(": ", 1)))
+    if plot_points is not None:
+        for data_path in downsample.data_paths(run_path):
+            downsample.downsample(data_path, plot_points)
+    return statistics
+
+
+def analyze_run_star(args):
+    """Call function analyze_run with a tuple of arguments, for multiprocessing.Pool.imap.
+
+    args -- [tuple] Arguments of function analyze_run.
+    """
+    return analyze_run(*args)
+
+
+@click.command()
+@click.argument("tarball_paths", metavar="<tarball>...", nargs=-1, required=True)
+@click.option("-o", "--output-path", default=".")
+@click.option("--interval-size", default=milliscope.INTERVAL_SIZE)
+@click.option("-p", "--processes", default=None, type=int)
+@click.option("--plot-points", default=None, type=int)
+def main(tarball_paths, output_path, interval_size, processes, plot_points):
+    """Run cpu.py, mem.py, disk.py, response_time.py, and queue_length.py on the result tarballs
+    of many experiment runs, without extracting them, and merge their statistics into one table.
+
+    The data files of a run are written to directory <output_path>/<run>, where <run> is the name
+    of its tarball without extension, and the statistics of all runs to file <output_path>/
+    STATISTICS_FILE_NAME, with one row per run, host or server, and statistic. The milliScope log
+    files of every directory of a tarball, e.g., of every host, are analyzed separately. Runs are
+    analyzed in parallel by a pool of processes.
+
+    tarball_paths -- [list of str] Paths to the result tarballs (BENCH_RESULTSTARBALL).
+    output_path -- [str] Path to the directory of the output.
+    interval_size -- [int] Length of an interval of queue lengths in microseconds.
+    processes -- [int] Number of processes, by default the number of CPUs.
+    plot_points -- [int] Number of points of the time series downsampled for plotting next to the
+                   data files of cpu.py, response_time.py, and queue_length.py (see downsample.py),
+                   by default none.
+    """
+    if plot_points is not None and plot_points < 3:
+        raise click.BadParameter("must be at least 3", param_hint="--plot-points")
+    run_names = [run_name(tarball_path) for tarball_path in tarball_paths]
+    if len(set(run_names)) < len(run_names):
+        raise click.BadParameter("result tarballs must have distinct names",
+                                 param_hint="<tarball>...")
+    tasks = [(tarball_path, output_path, interval_size, plot_points)
+             for tarball_path in tarball_paths]
+    if processes == 1:
+        results = map(analyze_run_star, tasks)
+    else:
+        pool = multiprocessing.Pool(processes)
+        results = pool.imap(analyze_run_star, tasks)
+    os.makedirs(output_path, exist_ok=True)
+    try:
+        with open(os.path.join(output_path, STATISTICS_FILE_NAME), 'w') as statistics_file:
+            statistics_file.write("RUN\tSOURCE\tSTATISTIC\tVALUE\n")
+            for (name, statistics) in zip(run_names, results):
+                print("%s: %s statistics" % (name, len(statistics)))
+                for row in statistics:
+                    statistics_file.write("\t".join((name,) + row) + "\n")
+    finally:
+        if processes != 1:
+            pool.close()
+            pool.join()
+
+
+if __name__ == "__main__":
+    main()
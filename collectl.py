@@ -0,0 +1,212 @@
+import column_cache
+import gzip
+import lzma
+import numpy
+import os
+
+# Suffix of the path to the cache directory of a collectl raw file.
+CACHE_SUFFIX = ".cache"
+
+# Name patterns of collectl raw files, as written by collectl (-f) or renamed after an experiment.
+RAW_FILE_PATTERNS = ("coll-*", "*_COLL_*")
+
+# Functions opening compressed collectl raw files, by extension. collectl compresses its raw files
+# with gzip unless it is run with -oz.
+COMPRESSED_OPENERS = {".gz": gzip.open, ".xz": lzma.open}
+
+# Approximate number of characters of the lines, or of bytes of the cached fields, of the samples
+# parsed and analyzed at a time when streaming a collectl raw file.
+CHUNK_SIZE = 1 << 22
+
+
+def parse_times(times):
+    """Return the number of microseconds since midnight of collectl times of day, as an int64
+    array, computed arithmetically rather than with datetime.datetime.strptime.
+
+    times -- [list of str] Times of day formatted as %H:%M:%S.%f.
+    """
+    if len(times) == 0:
+        return numpy.empty(0, dtype=numpy.int64)
+    # Hours, minutes, and seconds with their fraction, one row per time of day.
+    clock = numpy.fromstring(" ".join(times).replace(":", " "), sep=" ").reshape(len(times), 3)
+    # The seconds have at most 6 decimals, which rounding to microseconds recovers exactly.
+    return (clock[:, 0].astype(numpy.int64) * 60 + clock[:, 1].astype(numpy.int64)) * 60 * \
+        1000000 + numpy.rint(clock[:, 2] * 1000000).astype(numpy.int64)
+
+
+def parse_fields(rows):
+    """Return the fields of samples as a 2-D float64 array with one row per sample. Columns with
+    fields that are not numbers are NaN, and missing fields of short rows are NaN.
+
+    rows -- [list of str] Fields of every sample, separated by whitespace.
+    """
+    n_columns = len(rows[0].split()) if len(rows) > 0 else 0
+    # collectl separates fields with single spaces, so rows with as many spaces have as many
+    # fields, and NumPy can parse all of them at once.
+    if len(set([row.strip().count(" ") for row in rows])) == 1:
+        text = " ".join(rows)
+        # Integers parse faster than floats, and most collectl fields are integers.
+        for dtype in (numpy.int64, numpy.float64):
+            values = column_cache.parse_numbers(text, len(rows) * n_columns, dtype)
+            if values is not None:
+                return values.reshape(len(rows), n_columns).astype(numpy.float64)
+    # Some column is not a number, or the rows have different numbers of fields.
+    samples = [row.split() for row in rows]
+    n_columns = max([len(sample) for sample in samples] + [0])
+    samples = [sample + ["nan"] * (n_columns - len(sample)) for sample in samples]
+    values = numpy.empty((len(samples), n_columns))
+    for (column, fields) in enumerate(zip(*samples)):
+        try:
+            values[:, column] = numpy.array(fields, dtype=numpy.float64)
+        except ValueError:
+            values[:, column] = numpy.nan
+    return values
+
+
+def parse(raw_path):
+    """Parse a collectl raw file in plot format (-P) and return the times of day of its samples,
+    in microseconds since midnight, as an int64 array, and the fields of its samples following the
+    date and time, as a 2-D float64 array with one row per sample. Columns with fields that are not
+    numbers (e.g., disk names) are NaN.
+
+    raw_path -- [str] Path to the collectl raw file, which may be compressed (see function
+                open_raw_file).
+    """
+    with open_raw_file(raw_path) as raw_file:
+        return parse_stream(raw_file)
+
+
+def open_raw_file(raw_path):
+    """Open a collectl raw file in text mode, decompressing it on the fly if its extension is one
+    of COMPRESSED_OPENERS, and return it.
+
+    raw_path -- [str] Path to the collectl raw file.
+    """
+    return COMPRESSED_OPENERS.get(os.path.splitext(raw_path)[1], open)(raw_path, 'rt')
+
+
+def parse_stream(raw_file):
+    """Parse a collectl raw file opened in text mode, like function parse. The raw file is read
+    sequentially, so it may be a stream, e.g., a member of a tarball.
+
+    raw_file -- [file] collectl raw file opened in text mode.
+    """
+    return parse_lines([line for line in raw_file if line[0] != '#'])
+
+
+def iter_stream(raw_file, chunk_size=CHUNK_SIZE):
+    """Parse a collectl raw file opened in text mode in chunks of samples, and yield the times of
+    day and fields of the samples of each chunk (see function parse). Only one chunk is in memory
+    at a time. The columns of each chunk are parsed separately, so a column is NaN only in the
+    chunks where some of its fields are not numbers.
+
+    raw_file -- [file] collectl raw file opened in text mode.
+    chunk_size -- [int] Number of characters of the lines of the samples of a chunk, at least.
+    """
+    lines = []
+    size = 0
+    for line in raw_file:
+        # Check if it is a comment.
+        if line[0] == '#':
+            continue
+        lines.append(line)
+        size += len(line)
+        if size >= chunk_size:
+            yield parse_lines(lines)
+            lines = []
+            size = 0
+    if lines:
+        yield parse_lines(lines)
+
+
+def parse_lines(lines):
+    """Parse lines of samples of a collectl raw file, without comments, like function parse.
+
+    lines -- [list of str] Lines of the samples, starting with their date and time.
+    """
+    # Date, time, and the other fields of every sample.
+    samples = [line.split(None, 2) for line in lines]
+    return (
+        parse_times([sample[1] for sample in samples]),
+        parse_fields([sample[2] if len(sample) > 2 else "" for sample in samples])
+    )
+
+
+def ingest(raw_path):
+    """Parse a collectl raw file once and cache its samples next to it, in directory
+    <raw_path>CACHE_SUFFIX, and return the number of samples.
+
+    The fields are stored column by column (Fortran order), so that reading a column of the
+    memory-mapped cache only touches that column.
+
+    raw_path -- [str] Path to the collectl raw file.
+    """
+    (timestamps, values) = parse(raw_path)
+    column_cache.write(raw_path + CACHE_SUFFIX, {
+        "timestamp": timestamps,
+        "values": numpy.asfortranarray(values)
+    })
+    return len(timestamps)
+
+
+def load(raw_path):
+    """Return the times of day and fields of the samples of a collectl raw file (see function
+    parse), memory-mapped from its cache if it is up to date, or parsed from the raw file
+    otherwise.
+
+    raw_path -- [str] Path to the collectl raw file.
+    """
+    cache_path = raw_path + CACHE_SUFFIX
+    if column_cache.is_fresh(cache_path, [raw_path]):
+        return (column_cache.read(cache_path, "timestamp"), column_cache.read(cache_path, "values"))
+    return parse(raw_path)
+
+
+def stream(raw_path, chunk_size=CHUNK_SIZE):
+    """Yield the times of day and fields of the samples of a collectl raw file in chunks (see
+    function iter_stream), sliced from its memory-mapped cache if it is up to date, or parsed from
+    the raw file otherwise, which may be compressed.
+
+    raw_path -- [str] Path to the collectl raw file.
+    chunk_size -- [int] Number of characters of the lines, or of bytes of the cached fields, of
+                  the samples of a chunk.
+    """
+    cache_path = raw_path + CACHE_SUFFIX
+    if column_cache.is_fresh(cache_path, [raw_path]):
+        timestamps = column_cache.read(cache_path, "timestamp")
+        values = column_cache.read(cache_path, "values")
+        chunk_samples = max(chunk_size // max(values.itemsize * values.shape[1], 1), 1)
+        for start in range(0, len(timestamps), chunk_samples):
+            yield (timestamps[start:start + chunk_samples], values[start:start + chunk_samples])
+        return
+    with open_raw_file(raw_path) as raw_file:
+        yield from iter_stream(raw_file, chunk_size)
+
+
+def elapsed(timestamps, start=None):
+    """Return the time elapsed since the first sample at every sample, formatted as
+    <seconds>.<microseconds>, as a list of str. The seconds wrap around at midnight and the
+    microseconds are not zero-padded, as in the output of datetime.timedelta differences.
+
+    timestamps -- [numpy.ndarray] Times of day of the samples in microseconds since midnight.
+    start -- [int/None] Time of day of the first sample, if it is not the first of timestamps,
+             e.g., when the samples are a later chunk of a raw file.
+    """
+    if len(timestamps) == 0:
+        return []
+    if start is None:
+        start = timestamps[0]
+    differences = (numpy.asarray(timestamps) - start).tolist()
+    return ["%s.%s" % (difference // 1000000 % 86400, difference % 1000000)
+            for difference in differences]
+
+
+def write_samples(data_file, elapsed, values):
+    """Write samples of a time series to a data file, with one line per sample of its elapsed time
+    (see function elapsed) and value.
+
+    data_file -- [file] Data file opened in text mode.
+    elapsed -- [list of str] Elapsed time of every sample.
+    values -- [list] Value of every sample.
+    """
+    data_file.writelines(["%s %s\n" % sample for sample in zip(elapsed, values)])
@@ -0,0 +1,87 @@
+import numpy
+import os
+import shutil
+import tempfile
+import warnings
+
+# Number of bytes of a text file read at a time by function iter_chunks.
+CHUNK_SIZE = 1 << 22
+
+
+def is_fresh(cache_path, raw_paths):
+    """Return whether a cache exists and was written after its raw files were last modified.
+
+    cache_path -- [str] Path to the cache directory.
+    raw_paths -- [list of str] Paths to the raw files the cache was built from.
+    """
+    if not os.path.isdir(cache_path):
+        return False
+    return os.path.getmtime(cache_path) >= max([os.path.getmtime(raw_path)
+                                                for raw_path in raw_paths])
+
+
+def write(cache_path, columns):
+    """Write columns to a cache directory, one .npy file per column, replacing any previous
+    cache. The columns are written to a temporary directory first, so readers never see a partial
+    cache.
+
+    cache_path -- [str] Path to the cache directory.
+    columns -- [dict] NumPy arrays by column name.
+    """
+    tmp_path = tempfile.mkdtemp(dir=os.path.dirname(os.path.abspath(cache_path)),
+                                prefix=".{name}.".format(name=os.path.basename(cache_path)))
+    try:
+        for (name, column) in columns.items():
+            numpy.save(os.path.join(tmp_path, "{name}.npy".format(name=name)), column)
+        if os.path.isdir(cache_path):
+            shutil.rmtree(cache_path)
+        os.rename(tmp_path, cache_path)
+    except BaseException:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise
+
+
+def read(cache_path, name):
+    """Memory-map a column of a cache directory and return it as a read-only NumPy array.
+
+    cache_path -- [str] Path to the cache directory.
+    name -- [str] Column name.
+    """
+    return numpy.load(os.path.join(cache_path, "{name}.npy".format(name=name)), mmap_mode='r')
+
+
+def iter_chunks(text_file, chunk_size=CHUNK_SIZE):
+    """Read a text file opened in binary mode in chunks of complete lines, of chunk_size bytes
+    followed by the rest of their last line, and yield the chunks that are not blank, stripped.
+
+    text_file -- [file] Text file opened in binary mode, read from its current position.
+    chunk_size -- [int] Number of bytes of a chunk, before completing its last line.
+    """
+    while True:
+        chunk = text_file.read(chunk_size)
+        if not chunk:
+            break
+        chunk += text_file.readline()
+        if chunk.strip():
+            yield chunk.strip()
+
+
+def parse_numbers(text, n_numbers, dtype=numpy.float64, sep=" "):
+    """Parse numbers of a text with numpy.fromstring and return them as an array, or None if the
+    text does not contain exactly the expected number of numbers of the type, e.g., if some field
+    is not a number of the type.
+
+    text -- [str/bytes] Numbers separated by sep, in which whitespace matches any whitespace.
+    n_numbers -- [int] Expected number of numbers.
+    dtype -- [numpy.dtype] Type of the numbers.
+    sep -- [str] Separator of the numbers.
+    """
+    try:
+        with warnings.catch_warnings():
+            # NumPy stops at the first field that is not a number of the type, with a warning or
+            # an error depending on its version.
+            warnings.simplefilter("ignore", DeprecationWarning)
+            values = numpy.fromstring(text, dtype=dtype, sep=sep)
+    except ValueError:
+        return None
+    return values if values.size == n_numbers else None
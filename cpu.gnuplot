@@ -7,5 +7,16 @@ set timefmt "%s"
 set format x "%s"
 set key left top
 set grid
-plot "cpu0.data" using 1:2 with lines title "CPU 0", \
-     "cpu1.data" using 1:2 with lines title "CPU 1"
+# Plot the data files downsampled by downsample.py, over the min/max envelopes of their samples,
+# with gnuplot -e 'suffix=".lttb"'.
+if (!exists("suffix")) suffix = ""
+if (suffix eq "") {
+  plot "cpu0.data" using 1:2 with lines title "CPU 0", \
+       "cpu1.data" using 1:2 with lines title "CPU 1"
+} else {
+  set style fill solid 0.5 noborder
+  plot "cpu0.envelope.data" using 1:2:3 with filledcurves lc rgb "#c0c0c0" notitle, \
+       "cpu1.envelope.data" using 1:2:3 with filledcurves lc rgb "#c0c0c0" notitle, \
+       "cpu0".suffix.".data" using 1:2 with lines title "CPU 0", \
+       "cpu1".suffix.".data" using 1:2 with lines title "CPU 1"
+}
@@ -1,52 +1,47 @@
-import datetime
+import collectl
+import numpy
+import os
 import sys
 
-
-class DiskEntry:
-    """A disk entry."""
-
-    def __init__(self, read_in_kb, write_in_kb):
-        """Initialize a DiskEntry."""
-        self._read_in_kb = read_in_kb
-        self._write_in_kb = write_in_kb
-
-    def read_in_kb(self):
-        return self._read_in_kb
-
-    def write_in_kb(self):
-        return self._write_in_kb
+# Number of fields of every disk in a collectl disk raw file.
+N_DISK_FIELDS = 14
+
+# Indexes of the KB read and written among the fields of a disk.
+READ_IN_KB = 3
+WRITE_IN_KB = 7
+
+
+def analyze(chunks, output_path="."):
+    """Write the total disk reads and writes in KB to data files diskread.data and diskwrite.data
+    and return the lines of their statistics, none. The samples are processed one chunk at a time.
+
+    chunks -- [iterable] Times of day and fields of the samples of a collectl disk raw file, in
+              chunks (see function collectl.stream).
+    output_path -- [str] Path to the directory of the data files.
+    """
+    start = None
+    with open(os.path.join(output_path, "diskread.data"), 'w') as disk_read_file, \
+            open(os.path.join(output_path, "diskwrite.data"), 'w') as disk_write_file:
+        for (timestamps, values) in chunks:
+            if start is None:
+                start = int(timestamps[0])
+            elapsed = collectl.elapsed(timestamps, start)
+            n_disks = values.shape[1] // N_DISK_FIELDS
+            # Write disk reads and writes in kb, summed over all disks.
+            for (field, disk_file) in ((READ_IN_KB, disk_read_file),
+                                       (WRITE_IN_KB, disk_write_file)):
+                collectl.write_samples(
+                    disk_file, elapsed,
+                    values[:, field:n_disks * N_DISK_FIELDS:N_DISK_FIELDS].sum(axis=1).astype(
+                        numpy.int64).tolist()
+                )
+    return []
 
 
 def main():
-    # List of timestamps and DiskEntry.
-    timestamps = []
-    disk_entries = []
-    # Process disk raw file.
-    with open(sys.argv[1]) as disk_file:
-        for disk_line in disk_file:
-            # Check if it is a comment.
-            if disk_line[0] == '#':
-                continue
-            disk_entry_data = disk_line.split()
-            timestamps.append(datetime.datetime.strptime(disk_entry_data[1], "%H:%M:%S.%f"))
-            total_read_in_kb = 0
-            total_write_in_kb = 0
-            for disk_no in range((len(disk_entry_data) - 2) // 14):
-                total_read_in_kb += int(disk_entry_data[disk_no * 14 + 5])
-                total_write_in_kb += int(disk_entry_data[disk_no * 14 + 9])
-            disk_entries.append(DiskEntry(total_read_in_kb, total_write_in_kb))
-    # Write disk reads in kb.
-    disk_reads_in_kb = [disk_entry.read_in_kb() for disk_entry in disk_entries]
-    with open("diskread.data", 'w') as disk_read_file:
-        for (timestamp, disk_read_in_kb) in zip(timestamps, disk_reads_in_kb):
-            td = timestamp - timestamps[0]
-            disk_read_file.write("%s.%s %s\n" % (td.seconds, td.microseconds, disk_read_in_kb))
-    # Write disk writes in kb.
-    disk_writes_in_kb = [disk_entry.write_in_kb() for disk_entry in disk_entries]
-    with open("diskwrite.data", 'w') as disk_write_file:
-        for (timestamp, disk_write_in_kb) in zip(timestamps, disk_writes_in_kb):
-            td = timestamp - timestamps[0]
-            disk_write_file.write("%s.%s %s\n" % (td.seconds, td.microseconds, disk_write_in_kb))
+    # Process disk raw file, compressed or not, or its cache.
+    for line in analyze(collectl.stream(sys.argv[1])):
+        print(line)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,169 @@
+import click
+import column_cache
+import numpy
+import os
+import re
+
+# Default number of points of a downsampled time series, one per horizontal pixel of the plots of
+# the gnuplot templates (set terminal png size 900,400).
+N_POINTS = 900
+
+# Names of the data files of the time series that are downsampled.
+DATA_FILE_NAME = re.compile(r"^(cpu[0-9]+|queue_length|response_time)\.data$")
+
+# Suffix inserted before the extension of a data file to name its downsampled data file, e.g.,
+# queue_length.lttb.data, which the gnuplot templates plot with gnuplot -e 'suffix=".lttb"'.
+LTTB_SUFFIX = ".lttb"
+
+# Suffix inserted before the extension of a data file to name the data file of its envelope, with
+# the time, minimum, and maximum of every bucket of samples, which the gnuplot templates shade
+# under the downsampled time series.
+ENVELOPE_SUFFIX = ".envelope"
+
+
+def read_series(data_path):
+    """Read a data file with one line per sample of its time and value and return the times and
+    values, as float64 arrays.
+
+    data_path -- [str] Path to the data file.
+    """
+    chunks = []
+    with open(data_path, 'rb') as data_file:
+        for chunk in column_cache.iter_chunks(data_file):
+            chunks.append(column_cache.parse_numbers(chunk, 2 * (chunk.count(b'\n') + 1)))
+            if chunks[-1] is None:
+                raise ValueError("%s is not a data file of a time series" % data_path)
+    samples = numpy.concatenate(chunks + [numpy.empty(0)]).reshape(-1, 2)
+    return (samples[:, 0], samples[:, 1])
+
+
+def lttb(times, values, n_points):
+    """Downsample a time series with the Largest-Triangle-Three-Buckets algorithm and return the
+    indexes of the samples it keeps, in order, as an int64 array.
+
+    The first and last samples are kept, and the other samples are split into n_points - 2 buckets
+    of consecutive samples. The sample kept from a bucket is the one forming the largest triangle
+    with the sample kept from the previous bucket and the average of the next bucket, which
+    preserves the peaks and the shape of the series.
+
+    times -- [numpy.ndarray] Times of the samples.
+    values -- [numpy.ndarray] Values of the samples.
+    n_points -- [int] Number of samples kept, at least 3.
+    """
+    n_samples = len(times)
+    if n_samples <= n_points:
+        return numpy.arange(n_samples)
+    # Boundaries of the buckets, followed by the last sample as a bucket of its own.
+    bounds = numpy.append(
+        numpy.arange(n_points - 1) * (n_samples - 2) // (n_points - 2) + 1, n_samples
+    )
+    sizes = numpy.diff(bounds)
+    average_times = numpy.add.reduceat(times, bounds[:-1]) / sizes
+    average_values = numpy.add.reduceat(values, bounds[:-1]) / sizes
+    indexes = numpy.empty(n_points, dtype=numpy.int64)
+    indexes[0] = 0
+    indexes[-1] = n_samples - 1
+    kept = 0
+    for bucket in range(n_points - 2):
+        (start, stop) = (bounds[bucket], bounds[bucket + 1])
+        (kept_time, kept_value) = (float(times[kept]), float(values[kept]))
+        # Twice the areas of the triangles, whose maximum is the same.
+        areas = numpy.abs(
+            (kept_time - average_times[bucket + 1]) * (values[start:stop] - kept_value) -
+            (kept_time - times[start:stop]) * (average_values[bucket + 1] - kept_value)
+        )
+        kept = start + int(numpy.argmax(areas))
+        indexes[bucket + 1] = kept
+    return indexes
+
+
+def envelope(times, values, n_buckets):
+    """Split a time series into buckets of consecutive samples and return the time of the first
+    sample, the minimum value, and the maximum value of every bucket, as float64 arrays, so that
+    spikes that downsampling may skip remain visible.
+
+    times -- [numpy.ndarray] Times of the samples.
+    values -- [numpy.ndarray] Values of the samples.
+    n_buckets -- [int] Number of buckets, or fewer if there are fewer samples.
+    """
+    n_buckets = min(n_buckets, len(times))
+    if n_buckets == 0:
+        return (numpy.empty(0), numpy.empty(0), numpy.empty(0))
+    starts = numpy.arange(n_buckets) * len(times) // n_buckets
+    return (times[starts], numpy.minimum.reduceat(values, starts),
+            numpy.maximum.reduceat(values, starts))
+
+
+def downsampled_path(data_path, suffix):
+    """Return the path to a data file derived from another one, with a suffix inserted before its
+    extension.
+
+    data_path -- [str] Path to the data file.
+    suffix -- [str] Suffix, e.g., LTTB_SUFFIX.
+    """
+    (root, extension) = os.path.splitext(data_path)
+    return root + suffix + extension
+
+
+def downsample(data_path, n_points=N_POINTS):
+    """Write the downsampled time series of a data file (see function lttb) and its envelope (see
+    function envelope) to data files next to it, whose paths have suffixes LTTB_SUFFIX and
+    ENVELOPE_SUFFIX, and return the number of samples of the data file. The data file keeps the
+    full resolution.
+
+    data_path -- [str] Path to the data file.
+    n_points -- [int] Number of points of the downsampled time series and of buckets of the
+                envelope.
+    """
+    (times, values) = read_series(data_path)
+    indexes = lttb(times, values, n_points)
+    with open(downsampled_path(data_path, LTTB_SUFFIX), 'w') as lttb_file:
+        lttb_file.writelines(["%s %s\n" % point for point in zip(
+            times[indexes].tolist(), values[indexes].tolist()
+        )])
+    with open(downsampled_path(data_path, ENVELOPE_SUFFIX), 'w') as envelope_file:
+        envelope_file.writelines(["%s %s %s\n" % bucket for bucket in zip(
+            *[column.tolist() for column in envelope(times, values, n_points)]
+        )])
+    return len(times)
+
+
+def data_paths(path):
+    """Return the paths to the data files of a directory and its subdirectories that are
+    downsampled (see DATA_FILE_NAME), or the path itself if it is a file.
+
+    path -- [str] Path to a directory or data file.
+    """
+    if os.path.isfile(path):
+        return [path]
+    return [os.path.join(dir_path, file_name)
+            for (dir_path, dir_names, file_names) in sorted(os.walk(path))
+            for file_name in sorted(file_names) if DATA_FILE_NAME.match(file_name)]
+
+
+@click.command()
+@click.argument("paths", metavar="<path>...", nargs=-1, required=True)
+@click.option("-n", "--points", default=N_POINTS)
+def main(paths, points):
+    """Downsample the time series of data files written by cpu.py, queue_length.py, and
+    response_time.py for plotting, so that plotting takes the same time however long the run was.
+
+    Data file <name>.data is downsampled to <name>.lttb.data, which the gnuplot templates plot with
+    gnuplot -e 'suffix=".lttb"', and the minimum and maximum of its buckets are written to
+    <name>.envelope.data, which they shade under it. The data file itself keeps the full
+    resolution.
+
+    paths -- [list of str] Paths to data files, or to directories searched recursively for the data
+             files of cpu.py, queue_length.py, and response_time.py, e.g., the output directory of
+             analyze_requests.py or batch_analyze.py.
+    points -- [int] Number of points of a downsampled time series, at least 3.
+    """
+    if points < 3:
+        raise click.BadParameter("must be at least 3", param_hint="--points")
+    for path in paths:
+        for data_path in data_paths(path):
+            print("%s: %s samples" % (data_path, downsample(data_path, points)))
+
+
+if __name__ == "__main__":
+    main()
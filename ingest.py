@@ -0,0 +1,36 @@
+import click
+import collectl
+import fnmatch
+import milliscope
+import os
+
+
+@click.command()
+@click.argument("paths", metavar="<path>...", nargs=-1, required=True)
+def main(paths):
+    """Parse the milliScope log files and collectl raw files of experiment runs once and cache
+    them in a columnar format next to the originals, which later analyses memory-map.
+
+    paths -- [list of str] Paths to the directories of experiment runs, which are searched
+             recursively, or to collectl raw files.
+    """
+    for path in paths:
+        if os.path.isfile(path):
+            print("%s: %s samples" % (path, collectl.ingest(path)))
+            continue
+        for (dir_path, dir_names, file_names) in os.walk(path):
+            # Skip caches.
+            dir_names[:] = [dir_name for dir_name in dir_names
+                            if not dir_name.endswith(collectl.CACHE_SUFFIX)]
+            if all([os.path.basename(log_path) in file_names
+                    for log_path in milliscope.log_paths(dir_path)]):
+                print("%s: %s log entries" % (dir_path, milliscope.ingest(dir_path)))
+            for file_name in sorted(file_names):
+                if any([fnmatch.fnmatch(file_name, pattern)
+                        for pattern in collectl.RAW_FILE_PATTERNS]):
+                    raw_path = os.path.join(dir_path, file_name)
+                    print("%s: %s samples" % (raw_path, collectl.ingest(raw_path)))
+
+
+if __name__ == "__main__":
+    main()
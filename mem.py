@@ -1,45 +1,87 @@
-import datetime
+import collections
+import collectl
+import fractions
+import math
 import numpy
+import os
 import sys
 
 
-class MemEntry:
-    """A memory entry."""
+def analyze(chunks, output_path="."):
+    """Write the memory utilization to data file mem.data and return the lines of its statistics.
+    The samples are processed one chunk at a time.
 
-    def __init__(self, tot, used):
-        """Initialize a MemEntry."""
-        self._tot = tot
-        self._used = used
+    chunks -- [iterable] Times of day and fields of the samples of a collectl memory raw file, in
+              chunks (see function collectl.stream).
+    output_path -- [str] Path to the directory of the data file.
+    """
+    # Number of samples of each memory utilization, which has few distinct values.
+    counts = collections.Counter()
+    start = None
+    with open(os.path.join(output_path, "mem.data"), 'w') as mem_util_file:
+        for (timestamps, values) in chunks:
+            if start is None:
+                start = int(timestamps[0])
+            # Memory utilization in percent, rounded like the ratio of used to total memory with
+            # Python's round, whose ties differ from numpy.round.
+            mem_utils = [round(used / tot, 2) * 100
+                         for (tot, used) in values[:, :2].astype(numpy.int64).tolist()]
+            # Write memory utilization.
+            collectl.write_samples(mem_util_file, collectl.elapsed(timestamps, start), mem_utils)
+            counts.update(mem_utils)
+    if not counts:
+        return []
+    return [
+        "Min memory utilization: %s%%" % min(counts),
+        "Average memory utilization: %s%%" % average(counts),
+        "Median memory utilization: %s%%" % median(counts),
+        "Max memory utilization: %s%%" % max(counts),
+        "Std deviation of memory utilization: %s%%" % std(counts)
+    ]
 
-    def percentage(self):
-        return round(self._used / self._tot, 2) * 100
+
+def average(counts):
+    """Return the average of values, computed exactly and rounded once.
+
+    counts -- [collections.Counter] Number of occurrences of each value.
+    """
+    return float(sum([fractions.Fraction(value) * count for (value, count) in counts.items()]) /
+                 sum(counts.values()))
+
+
+def median(counts):
+    """Return the median of values, the average of the two middle ones if there are as many values
+    as an even number, like numpy.median.
+
+    counts -- [collections.Counter] Number of occurrences of each value.
+    """
+    n_values = sum(counts.values())
+    # Value at each of the two middle ranks.
+    middle = {}
+    rank = 0
+    for value in sorted(counts):
+        for middle_rank in ((n_values - 1) // 2, n_values // 2):
+            if rank <= middle_rank < rank + counts[value]:
+                middle[middle_rank] = value
+        rank += counts[value]
+    return (middle[(n_values - 1) // 2] + middle[n_values // 2]) / 2
+
+
+def std(counts):
+    """Return the population standard deviation of values. The squared deviations from the average
+    are rounded like in numpy.std, but summed exactly.
+
+    counts -- [collections.Counter] Number of occurrences of each value.
+    """
+    mean = average(counts)
+    return math.sqrt(sum([fractions.Fraction((value - mean) ** 2) * count
+                          for (value, count) in counts.items()]) / sum(counts.values()))
 
 
 def main():
-    # List of timestamps and MemEntry.
-    timestamps = []
-    mem_entries = []
-    # Process memory raw file.
-    with open(sys.argv[1]) as mem_file:
-        for mem_line in mem_file:
-            # Check if it is a comment.
-            if mem_line[0] == '#':
-                continue
-            mem_entry_data = mem_line.split()
-            timestamps.append(datetime.datetime.strptime(mem_entry_data[1], "%H:%M:%S.%f"))
-            mem_entries.append(MemEntry(int(mem_entry_data[2]), int(mem_entry_data[3])))
-    mem_utils = [mem_entry.percentage() for mem_entry in mem_entries]
-    # Write memory utilization.
-    with open("mem.data", 'w') as mem_util_file:
-        for (timestamp, mem_util) in zip(timestamps, mem_utils):
-            td = timestamp - timestamps[0]
-            mem_util_file.write("%s.%s %s\n" % (td.seconds, td.microseconds, mem_util))
-    # Print statistics.
-    print("Min memory utilization: %s%%" % numpy.min(mem_utils))
-    print("Average memory utilization: %s%%" % numpy.average(mem_utils))
-    print("Median memory utilization: %s%%" % numpy.median(mem_utils))
-    print("Max memory utilization: %s%%" % numpy.max(mem_utils))
-    print("Std deviation of memory utilization: %s%%" % numpy.std(mem_utils))
+    # Process memory raw file, compressed or not, or its cache.
+    for line in analyze(collectl.stream(sys.argv[1])):
+        print(line)
 
 
 if __name__ == "__main__":
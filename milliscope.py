@@ -0,0 +1,504 @@
+import array
+import collections
+import column_cache
+import io
+import numpy
+import os
+
+# Names of the syscalls logged by milliScope, indexed by event code.
+EVENTS = ("connect", "sendto", "recvfrom")
+
+# Event code of the connect syscall.
+CONNECT = EVENTS.index("connect")
+
+# Columns of the milliScope log files loaded, by field name.
+COLUMNS = {"ts": "TS", "sock_fd": "SOCK_FD", "pid": "PID", "port": "PORT"}
+
+# Type of a log entry of a syscall.
+LOG_ENTRY_DTYPE = numpy.dtype([
+    ("event", numpy.int8),
+    ("ts", numpy.int64),
+    ("sock_fd", numpy.int32),
+    ("pid", numpy.int32),
+    ("port", numpy.int32)
+])
+
+# Number of bytes of a milliScope log file parsed at a time.
+CHUNK_SIZE = 1 << 22
+
+# Length of an interval of queue lengths in microseconds.
+INTERVAL_SIZE = 200000
+
+# Requests taking this long or longer, in microseconds, are left out of the response times.
+RESPONSE_TIME_CUTOFF = 10000000
+
+# Number of rows of log entries processed at a time.
+CHUNK_ROWS = 1 << 16
+
+# Number of log entries of a milliScope log file held back to sort local disorder.
+REORDER_WINDOW = 1 << 16
+
+# Name of the directory of the cache of the milliScope log files, in the directory of the log
+# files.
+CACHE_DIRECTORY = "milliScope.cache"
+
+# Type of an entry of the index of the cache, locating the log entries of a process on a port.
+INDEX_DTYPE = numpy.dtype([
+    ("pid", numpy.int32),
+    ("port", numpy.int32),
+    ("start", numpy.int64),
+    ("stop", numpy.int64)
+])
+
+
+def parse_chunk(chunk, n_columns, usecols):
+    """Parse lines of comma-separated integers and return the specified columns as a 2-D int64
+    array.
+
+    chunk -- [bytes] Complete lines.
+    n_columns -- [int] Number of columns per line.
+    usecols -- [list of int] Indices of the columns returned.
+    """
+    n_lines = chunk.count(b'\n') + (0 if chunk.endswith(b'\n') else 1)
+    values = column_cache.parse_numbers(chunk.replace(b'\n', b','), n_lines * n_columns,
+                                        numpy.int64, ',')
+    if values is not None:
+        return values.reshape(n_lines, n_columns)[:, usecols]
+    # Some column is not an integer.
+    return numpy.loadtxt(io.BytesIO(chunk), dtype=numpy.int64, delimiter=',', usecols=usecols,
+                         ndmin=2)
+
+
+def iter_log_file(log_path, event, pid=None, port=None):
+    """Parse a milliScope log file in chunks of CHUNK_SIZE bytes and yield the log entries of each
+    chunk of the syscalls invoked by a process on a port, or all of them, in file order, as an
+    array of LOG_ENTRY_DTYPE.
+
+    log_path -- [str] Path to the milliScope log file.
+    event -- [str] Name of the syscall logged in the file.
+    pid -- [int/None] Process id, or None to keep the log entries of all processes.
+    port -- [int/None] Port number, or None to keep the log entries of all ports.
+    """
+    with open(log_path, 'rb') as log_file:
+        yield from iter_log_stream(log_file, event, pid, port)
+
+
+def iter_log_stream(log_file, event, pid=None, port=None):
+    """Parse a milliScope log file opened in binary mode in chunks of CHUNK_SIZE bytes, like
+    function iter_log_file. The log file is read sequentially, so it may be a stream, e.g., a
+    member of a tarball.
+
+    log_file -- [file] milliScope log file opened in binary mode.
+    event -- [str] Name of the syscall logged in the file.
+    pid -- [int/None] Process id, or None to keep the log entries of all processes.
+    port -- [int/None] Port number, or None to keep the log entries of all ports.
+    """
+    header = log_file.readline().decode().strip().split(',')
+    fields = list(COLUMNS.keys())
+    usecols = [header.index(COLUMNS[field]) for field in fields]
+    for chunk in column_cache.iter_chunks(log_file, CHUNK_SIZE):
+        columns = parse_chunk(chunk, len(header), usecols)
+        mask = numpy.ones(len(columns), dtype=bool)
+        if pid is not None:
+            mask &= columns[:, fields.index("pid")] == pid
+        if port is not None:
+            mask &= columns[:, fields.index("port")] == port
+        log_entries = numpy.empty(numpy.count_nonzero(mask), dtype=LOG_ENTRY_DTYPE)
+        log_entries["event"] = EVENTS.index(event)
+        for (i, field) in enumerate(fields):
+            log_entries[field] = columns[mask, i]
+        yield log_entries
+
+
+def read_log_file(log_path, event, pid=None, port=None):
+    """Return the log entries of a milliScope log file of the syscalls invoked by a process on a
+    port, or of all log entries, in file order, as an array of LOG_ENTRY_DTYPE.
+
+    log_path -- [str] Path to the milliScope log file.
+    event -- [str] Name of the syscall logged in the file.
+    pid -- [int/None] Process id, or None to keep the log entries of all processes.
+    port -- [int/None] Port number, or None to keep the log entries of all ports.
+    """
+    return numpy.concatenate(
+        [numpy.empty(0, dtype=LOG_ENTRY_DTYPE)] + list(iter_log_file(log_path, event, pid, port))
+    )
+
+
+def reorder(chunks, window):
+    """Sort chunks of log entries that are sorted by timestamp except for local disorder, and yield
+    the sorted log entries in chunks. Log entries with the same timestamp are kept in order.
+
+    The window-1 latest log entries are held back in a re-order buffer until the next chunk
+    arrives, which sorts any log entry preceded by at most window-1 later log entries.
+
+    chunks -- [iterable of numpy.ndarray] Log entries of LOG_ENTRY_DTYPE.
+    window -- [int] Size of the re-order buffer.
+    """
+    buffered = numpy.empty(0, dtype=LOG_ENTRY_DTYPE)
+    last_ts = None
+    for chunk in chunks:
+        buffered = numpy.concatenate([buffered, chunk])
+        buffered = buffered[numpy.argsort(buffered["ts"], kind="stable")]
+        if len(buffered) < window:
+            continue
+        (sorted_chunk, buffered) = (buffered[:len(buffered) - window + 1],
+                                    buffered[len(buffered) - window + 1:])
+        if last_ts is not None and sorted_chunk["ts"][0] < last_ts:
+            raise ValueError("Log entries are out of order by more than the re-order buffer of "
+                             "{window} log entries (see REORDER_WINDOW).".format(window=window))
+        last_ts = sorted_chunk["ts"][-1]
+        yield sorted_chunk
+    if last_ts is not None and len(buffered) > 0 and buffered["ts"][0] < last_ts:
+        raise ValueError("Log entries are out of order by more than the re-order buffer of "
+                         "{window} log entries (see REORDER_WINDOW).".format(window=window))
+    yield buffered
+
+
+def merge(streams):
+    """Merge streams of chunks of log entries sorted by timestamp and yield the sorted log entries
+    in chunks. Log entries with the same timestamp are kept in the order of the streams.
+
+    A stream is read only when its latest log entry has the lowest timestamp of all streams, so
+    at most one chunk per stream is buffered.
+
+    streams -- [list of iterable of numpy.ndarray] Streams of chunks of log entries of
+               LOG_ENTRY_DTYPE.
+    """
+    streams = [iter(stream) for stream in streams]
+    buffers = [numpy.empty(0, dtype=LOG_ENTRY_DTYPE) for stream in streams]
+    # Streams with log entries left.
+    active = list(range(len(streams)))
+    pulled = list(active)
+    while True:
+        for i in pulled:
+            for chunk in streams[i]:
+                if len(chunk) > 0:
+                    buffers[i] = numpy.concatenate([buffers[i], chunk])
+                    break
+            else:
+                active.remove(i)
+        if len(active) == 0:
+            break
+        # Log entries yet to be read are not earlier than the latest one of any active stream.
+        watermark = min([buffers[i]["ts"][-1] for i in active])
+        counts = [numpy.searchsorted(buffer["ts"], watermark) for buffer in buffers]
+        merged = numpy.concatenate([buffer[:count] for (buffer, count) in zip(buffers, counts)])
+        buffers = [buffer[count:] for (buffer, count) in zip(buffers, counts)]
+        pulled = [i for i in active if buffers[i]["ts"][-1] == watermark]
+        if len(merged) > 0:
+            yield merged[numpy.argsort(merged["ts"], kind="stable")]
+    merged = numpy.concatenate(buffers)
+    yield merged[numpy.argsort(merged["ts"], kind="stable")]
+
+
+def log_paths(logs_path):
+    """Return the paths to the milliScope log files of a directory, in the order of EVENTS.
+
+    logs_path -- [str] Path to the directory of the milliScope log files.
+    """
+    return ["{logs_path}/milliScope_{event}.csv".format(logs_path=logs_path, event=event)
+            for event in EVENTS]
+
+
+def stream_log_entries(pid, port, logs_path="logs", window=None):
+    """Yield the log entries of the syscalls invoked by a process on a port, sorted by timestamp,
+    in chunks, as arrays of LOG_ENTRY_DTYPE. Log entries with the same timestamp are kept in the
+    order of the connect, sendto, and recvfrom log files.
+
+    The log entries are read from the cache written by function ingest if it is up to date.
+    Otherwise, the log files are parsed in chunks, sorted with a re-order buffer, and merged, so
+    that memory does not grow with the length of the log files.
+
+    pid -- [int] Process id.
+    port -- [int] Port number.
+    logs_path -- [str] Path to the directory of the milliScope log files.
+    window -- [int] Size of the re-order buffer of each log file, by default REORDER_WINDOW.
+    """
+    cache_path = os.path.join(logs_path, CACHE_DIRECTORY)
+    if column_cache.is_fresh(cache_path, log_paths(logs_path)):
+        return stream_cached_log_entries(pid, port, cache_path)
+    return merge([
+        reorder(iter_log_file(log_path, event, pid, port), window or REORDER_WINDOW)
+        for (event, log_path) in zip(EVENTS, log_paths(logs_path))
+    ])
+
+
+def read_log_entries(pid, port, logs_path="logs"):
+    """Return the log entries of the syscalls invoked by a process on a port, sorted by timestamp,
+    as an array of LOG_ENTRY_DTYPE. Log entries with the same timestamp are kept in the order of
+    the connect, sendto, and recvfrom log files.
+
+    The log entries are read from the cache written by function ingest if it is up to date, and
+    parsed from the log files otherwise.
+
+    pid -- [int] Process id.
+    port -- [int] Port number.
+    logs_path -- [str] Path to the directory of the milliScope log files.
+    """
+    cache_path = os.path.join(logs_path, CACHE_DIRECTORY)
+    if column_cache.is_fresh(cache_path, log_paths(logs_path)):
+        return read_cached_log_entries(pid, port, cache_path)
+    log_entries = numpy.concatenate([
+        read_log_file(log_path, event, pid, port)
+        for (event, log_path) in zip(EVENTS, log_paths(logs_path))
+    ])
+    return log_entries[numpy.argsort(log_entries["ts"], kind="stable")]
+
+
+def read_grouped_log_entries(logs_path="logs"):
+    """Parse the milliScope log files of a directory in one pass and return all log entries, as an
+    array of LOG_ENTRY_DTYPE sorted by process id, port, and timestamp, and an index locating the
+    log entries of every process on a port, as an array of INDEX_DTYPE.
+
+    Log entries with the same timestamp are kept in the order of the connect, sendto, and recvfrom
+    log files, so the log entries of a process on a port are the ones read_log_entries returns.
+
+    logs_path -- [str] Path to the directory of the milliScope log files.
+    """
+    return group_log_entries(numpy.concatenate([
+        read_log_file(log_path, event) for (event, log_path) in zip(EVENTS, log_paths(logs_path))
+    ]))
+
+
+def group_log_entries(log_entries):
+    """Sort log entries by process id, port, and timestamp, and return them, as an array of
+    LOG_ENTRY_DTYPE, and an index locating the log entries of every process on a port, as an
+    array of INDEX_DTYPE.
+
+    log_entries -- [numpy.ndarray] Log entries of the connect, sendto, and recvfrom log files,
+                   concatenated in this order.
+    """
+    # numpy.lexsort is stable, which keeps the order of the log files for equal timestamps.
+    log_entries = log_entries[numpy.lexsort((
+        log_entries["ts"], log_entries["port"], log_entries["pid"]
+    ))]
+    boundaries = numpy.flatnonzero(
+        (log_entries["pid"][1:] != log_entries["pid"][:-1]) |
+        (log_entries["port"][1:] != log_entries["port"][:-1])
+    ) + 1
+    starts = numpy.concatenate([[0], boundaries]) if len(log_entries) > 0 else boundaries
+    index = numpy.empty(len(starts), dtype=INDEX_DTYPE)
+    index["pid"] = log_entries["pid"][starts]
+    index["port"] = log_entries["port"][starts]
+    index["start"] = starts
+    index["stop"] = numpy.append(starts[1:], len(log_entries))
+    return (log_entries, index)
+
+
+def ingest(logs_path="logs"):
+    """Parse the milliScope log files of a directory once and cache their log entries in
+    subdirectory CACHE_DIRECTORY, one .npy file per field of LOG_ENTRY_DTYPE, and return the
+    number of log entries.
+
+    The log entries are sorted by process id, port, and timestamp, so that the log entries of a
+    process on a port are contiguous and sorted by timestamp. The index (index.npy) locates them.
+
+    logs_path -- [str] Path to the directory of the milliScope log files.
+    """
+    (log_entries, index) = read_grouped_log_entries(logs_path)
+    columns = {field: log_entries[field] for field in LOG_ENTRY_DTYPE.names}
+    columns["index"] = index
+    column_cache.write(os.path.join(logs_path, CACHE_DIRECTORY), columns)
+    return len(log_entries)
+
+
+def read_cached_log_entries(pid, port, cache_path):
+    """Return the log entries of the syscalls invoked by a process on a port from a cache written
+    by function ingest, sorted by timestamp, as an array of LOG_ENTRY_DTYPE. Only the rows of the
+    process on the port are read from the memory-mapped columns.
+
+    pid -- [int] Process id.
+    port -- [int] Port number.
+    cache_path -- [str] Path to the cache directory.
+    """
+    index = column_cache.read(cache_path, "index")
+    matches = numpy.flatnonzero((index["pid"] == pid) & (index["port"] == port))
+    if len(matches) == 0:
+        return numpy.empty(0, dtype=LOG_ENTRY_DTYPE)
+    (start, stop) = (int(index["start"][matches[0]]), int(index["stop"][matches[0]]))
+    return read_cached_rows(pid, port, cache_path, start, stop)
+
+
+def read_cached_rows(pid, port, cache_path, start, stop):
+    """Return rows of the log entries of a process on a port from a cache written by function
+    ingest, as an array of LOG_ENTRY_DTYPE.
+
+    pid -- [int] Process id.
+    port -- [int] Port number.
+    cache_path -- [str] Path to the cache directory.
+    start -- [int] Index of the first row.
+    stop -- [int] Index following the last row.
+    """
+    log_entries = numpy.empty(stop - start, dtype=LOG_ENTRY_DTYPE)
+    for field in ("event", "ts", "sock_fd"):
+        log_entries[field] = column_cache.read(cache_path, field)[start:stop]
+    log_entries["pid"] = pid
+    log_entries["port"] = port
+    return log_entries
+
+
+def stream_cached_log_entries(pid, port, cache_path):
+    """Yield the log entries of the syscalls invoked by a process on a port from a cache written
+    by function ingest, sorted by timestamp, in chunks of CHUNK_ROWS rows, as arrays of
+    LOG_ENTRY_DTYPE.
+
+    pid -- [int] Process id.
+    port -- [int] Port number.
+    cache_path -- [str] Path to the cache directory.
+    """
+    index = column_cache.read(cache_path, "index")
+    for i in numpy.flatnonzero((index["pid"] == pid) & (index["port"] == port)).tolist():
+        for start in range(int(index["start"][i]), int(index["stop"][i]), CHUNK_ROWS):
+            yield read_cached_rows(pid, port, cache_path, start,
+                                   min(start + CHUNK_ROWS, int(index["stop"][i])))
+
+
+def iter_chunks(log_entries):
+    """Yield an array of log entries in chunks of CHUNK_ROWS rows.
+
+    log_entries -- [numpy.ndarray] Log entries of LOG_ENTRY_DTYPE.
+    """
+    for start in range(0, len(log_entries), CHUNK_ROWS):
+        yield log_entries[start:start + CHUNK_ROWS]
+
+
+def reconstruct_requests(chunks):
+    """Aggregate log entries of the same request in a single pass and yield every request, as the
+    list of the (event code, timestamp, socket file descriptor) tuples of its log entries, in the
+    order of their connect log entries.
+
+    A request starts with a connect log entry and contains the following log entries on the same
+    socket until the next connect log entry on that socket. Log entries on a socket before its
+    first connect log entry are discarded.
+
+    chunks -- [iterable of numpy.ndarray] Log entries of LOG_ENTRY_DTYPE sorted by timestamp, in
+              chunks.
+    """
+    # Requests whose socket has not been connected again yet, by socket file descriptor.
+    open_requests = {}
+    # Requests not yielded yet, in the order of their connect log entries, and whether they are
+    # finished.
+    pending_requests = collections.deque()
+    for chunk in chunks:
+        for log_entry in zip(chunk["event"].tolist(), chunk["ts"].tolist(),
+                             chunk["sock_fd"].tolist()):
+            (event, ts, sock_fd) = log_entry
+            if event == CONNECT:
+                if sock_fd in open_requests:
+                    open_requests[sock_fd][1] = True
+                request = [[log_entry], False]
+                open_requests[sock_fd] = request
+                pending_requests.append(request)
+                while pending_requests[0][1]:
+                    yield pending_requests.popleft()[0]
+            elif sock_fd in open_requests:
+                open_requests[sock_fd][0].append(log_entry)
+    for request in pending_requests:
+        yield request[0]
+
+
+def request_spans(chunks):
+    """Return the timestamps of the first and last log entries of every request (see function
+    reconstruct_requests), in the order of their connect log entries, as two int64 arrays.
+
+    Unlike function reconstruct_requests, the requests are not buffered: every request gets the
+    next slot of the arrays at its connect log entry, and only the slot of the open request of
+    every socket is kept, so a socket connected once for the whole log costs nothing more.
+
+    chunks -- [iterable of numpy.ndarray] Log entries of LOG_ENTRY_DTYPE sorted by timestamp, in
+              chunks.
+    """
+    start_ts = array.array('q')
+    finish_ts = array.array('q')
+    # Slot of the open request of every socket, by socket file descriptor.
+    open_slots = {}
+    for chunk in chunks:
+        for (event, ts, sock_fd) in zip(chunk["event"].tolist(), chunk["ts"].tolist(),
+                                        chunk["sock_fd"].tolist()):
+            if event == CONNECT:
+                open_slots[sock_fd] = len(start_ts)
+                start_ts.append(ts)
+                finish_ts.append(ts)
+            elif sock_fd in open_slots:
+                finish_ts[open_slots[sock_fd]] = ts
+    return (numpy.array(start_ts, dtype=numpy.int64), numpy.array(finish_ts, dtype=numpy.int64))
+
+
+def queue_lengths(start_ts, finish_ts, interval_size):
+    """Return the number of requests in progress during each interval since the first request
+    started, as an int64 array.
+
+    A request is counted in every interval from the one of its first log entry to the one of its
+    last log entry. The counts are accumulated in a difference array, so the cost is linear in the
+    number of requests and intervals regardless of the interval size.
+
+    start_ts -- [numpy.ndarray] Timestamps of the first log entries of the requests, the first of
+                which started first.
+    finish_ts -- [numpy.ndarray] Timestamps of the last log entries of the requests.
+    interval_size -- [int] Length of an interval in the unit of the timestamps.
+    """
+    n_intervals = int(finish_ts.max() - start_ts[0]) // interval_size + 1
+    start_at_interval = (start_ts - start_ts[0]) // interval_size
+    finish_at_interval = (finish_ts - start_ts[0]) // interval_size
+    differences = numpy.bincount(start_at_interval, minlength=n_intervals + 1) - \
+        numpy.bincount(finish_at_interval + 1, minlength=n_intervals + 1)
+    return numpy.cumsum(differences[:n_intervals])
+
+
+def write_response_times(start_ts, finish_ts, data_path):
+    """Write the start time and response time of every request shorter than RESPONSE_TIME_CUTOFF
+    to a data file, in seconds since the first request started and in milliseconds, and return
+    the lines of their statistics.
+
+    start_ts -- [numpy.ndarray] Timestamps of the first log entries of the requests, in
+                microseconds, the first of which started first.
+    finish_ts -- [numpy.ndarray] Timestamps of the last log entries of the requests.
+    data_path -- [str] Path to the data file.
+    """
+    response_times = finish_ts - start_ts
+    completed = response_times < RESPONSE_TIME_CUTOFF
+    with open(data_path, 'w') as response_times_file:
+        if len(start_ts) > 0:
+            for (start, response_time) in zip(
+                    ((start_ts[completed] - start_ts[0]) / 1000000.0).tolist(),
+                    (response_times[completed] / 1000.0).tolist()):
+                response_times_file.write("%s %s\n" % (start, response_time))
+    response_times = response_times[completed]
+    statistics = ["Number of requests: %s" % len(start_ts)]
+    if len(response_times) > 0:
+        statistics.extend([
+            "Min response time: %s ms" % (numpy.min(response_times) / 1000.0),
+            "Average response time: %s ms" % (numpy.average(response_times) / 1000.0),
+            "Median response time: %s ms" % (numpy.median(response_times) / 1000.0),
+            "Max response time: %s ms" % (numpy.max(response_times) / 1000.0),
+            "Std deviation of response time: %s ms" % (numpy.std(response_times) / 1000.0)
+        ])
+    return statistics
+
+
+def write_queue_lengths(start_ts, finish_ts, interval_size, data_path):
+    """Write the queue length of every interval (see function queue_lengths) to a data file, with
+    the start of the interval in seconds since the first request started, and return the lines of
+    their statistics.
+
+    start_ts -- [numpy.ndarray] Timestamps of the first log entries of the requests, in
+                microseconds, the first of which started first.
+    finish_ts -- [numpy.ndarray] Timestamps of the last log entries of the requests.
+    interval_size -- [int] Length of an interval in microseconds.
+    data_path -- [str] Path to the data file.
+    """
+    lengths = queue_lengths(start_ts, finish_ts, interval_size).tolist() \
+        if len(start_ts) > 0 else []
+    with open(data_path, 'w') as queue_length_file:
+        for (i, queue_length) in enumerate(lengths):
+            queue_length_file.write("%s %s\n" % ((interval_size / 1000000 * i), queue_length))
+    statistics = ["Number of intervals: %s" % len(lengths)]
+    if len(lengths) > 0:
+        statistics.extend([
+            "Min queue length: %s" % numpy.min(lengths),
+            "Average queue length: %s" % numpy.average(lengths),
+            "Median queue length: %s" % numpy.median(lengths),
+            "Max queue length: %s" % numpy.max(lengths),
+            "Std deviation of queue length: %s" % numpy.std(lengths)
+        ])
+    return statistics
@@ -0,0 +1,232 @@
+import array
+import csv
+import milliscope
+import numpy
+import os
+import random
+import resource
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# Process id and port of the synthetic process.
+PID = 1234
+PORT = 80
+
+# Number of sockets used concurrently by the synthetic process.
+N_SOCKETS = 256
+
+# Probability that a synthetic log entry is on a socket that is never connected.
+ORPHAN_PROBABILITY = 0.001
+
+# Number of log entries of other processes written per log entry of the synthetic process.
+NOISE_RATIO = 1.0
+
+
+def synthetic_log_entries(n_rows, seed=0):
+    """Return synthetic log entries of a process reusing a fixed set of sockets, sorted by
+    timestamp, as an array of milliscope.LOG_ENTRY_DTYPE.
+
+    Each request is a connect followed by 2 to 16 sendto and recvfrom log entries on the same
+    socket.
+
+    n_rows -- [int] Number of log entries.
+    seed -- [int] Seed of the random number generator.
+    """
+    rng = random.Random(seed)
+    events = array.array('b')
+    timestamps = array.array('q')
+    sock_fds = array.array('i')
+    remaining = {}
+    ts = 0
+    for _ in range(n_rows):
+        ts += rng.randrange(0, 200)
+        timestamps.append(ts)
+        if rng.random() < ORPHAN_PROBABILITY:
+            events.append(milliscope.EVENTS.index("recvfrom"))
+            sock_fds.append(N_SOCKETS + rng.randrange(N_SOCKETS))
+            continue
+        sock_fd = rng.randrange(N_SOCKETS)
+        sock_fds.append(sock_fd)
+        if remaining.get(sock_fd, 0) == 0:
+            remaining[sock_fd] = rng.randrange(2, 17)
+            events.append(milliscope.CONNECT)
+        else:
+            remaining[sock_fd] -= 1
+            events.append(milliscope.EVENTS.index(
+                "sendto" if remaining[sock_fd] % 2 == 1 else "recvfrom"
+            ))
+    log_entries = numpy.empty(n_rows, dtype=milliscope.LOG_ENTRY_DTYPE)
+    log_entries["event"] = numpy.frombuffer(events, dtype=numpy.int8)
+    log_entries["ts"] = numpy.frombuffer(timestamps, dtype=numpy.int64)
+    log_entries["sock_fd"] = numpy.frombuffer(sock_fds, dtype=numpy.int32)
+    log_entries["pid"] = PID
+    log_entries["port"] = PORT
+    return log_entries
+
+
+def write_synthetic_logs(log_entries, logs_path, seed=0):
+    """Write synthetic log entries to milliScope log files, interleaved with log entries of other
+    processes or ports.
+
+    log_entries -- [numpy.ndarray] Log entries of milliscope.LOG_ENTRY_DTYPE.
+    logs_path -- [str] Path to the directory of the milliScope log files.
+    seed -- [int] Seed of the random number generator.
+    """
+    rng = numpy.random.RandomState(seed)
+    noise = log_entries[rng.randint(0, len(log_entries), int(len(log_entries) * NOISE_RATIO))]
+    noise["pid"] = rng.choice([PID, PID + 1], len(noise))
+    noise["port"] = numpy.where(noise["pid"] == PID, PORT + 1, rng.choice([PORT, 3306], len(noise)))
+    rows = numpy.concatenate([log_entries, noise])
+    rows = rows[numpy.argsort(rows["ts"], kind="stable")]
+    for (code, event) in enumerate(milliscope.EVENTS):
+        event_rows = rows[rows["event"] == code]
+        numpy.savetxt(
+            "{logs_path}/milliScope_{event}.csv".format(logs_path=logs_path, event=event),
+            numpy.column_stack([
+                event_rows["ts"], event_rows["pid"], event_rows["port"], event_rows["sock_fd"]
+            ]),
+            fmt="%d", delimiter=',', header="TS,PID,PORT,SOCK_FD", comments=""
+        )
+
+
+def dictreader_log_entries(pid, port, logs_path):
+    """Return the log entries of the syscalls invoked by a process on a port, sorted by timestamp,
+    as a list of (event, timestamp, socket file descriptor) tuples, read with the former
+    csv.DictReader loader.
+
+    pid -- [int] Process id.
+    port -- [int] Port number.
+    logs_path -- [str] Path to the directory of the milliScope log files.
+    """
+    log_entries = []
+    for event in milliscope.EVENTS:
+        with open("{logs_path}/milliScope_{event}.csv".format(
+                logs_path=logs_path, event=event)) as log_file:
+            for row in csv.DictReader(log_file):
+                if int(row["PID"]) == pid and int(row["PORT"]) == port:
+                    log_entries.append((event, int(row["TS"]), int(row["SOCK_FD"])))
+    log_entries.sort(key=lambda log_entry: log_entry[1])
+    return log_entries
+
+
+def nested_scan_requests(log_entries):
+    """Aggregate log entries of the same request with the former quadratic nested scan, used as
+    the reference output.
+
+    log_entries -- [numpy.ndarray] Log entries of milliscope.LOG_ENTRY_DTYPE sorted by timestamp.
+    """
+    events = log_entries["event"].tolist()
+    sock_fds = log_entries["sock_fd"].tolist()
+    requests = []
+    for i in range(len(events)):
+        if events[i] == milliscope.CONNECT:
+            request = [i]
+            j = i + 1
+            while j < len(events) and (events[j] != milliscope.CONNECT or
+                    sock_fds[i] != sock_fds[j]):
+                if sock_fds[i] == sock_fds[j]:
+                    request.append(j)
+                j += 1
+            requests.append(request)
+    return requests
+
+
+def measure(function, *args):
+    """Call a function and return its result, its duration in seconds, and the peak size in bytes
+    of the memory it allocated, measured in a second call.
+
+    function -- [function] Function.
+    args -- [list] Arguments of the function.
+    """
+    start = time.time()
+    result = function(*args)
+    elapsed = time.time() - start
+    del result
+    tracemalloc.start()
+    result = function(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return (result, elapsed, peak)
+
+
+def main():
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10000000
+    n_verified_rows = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+    n_loaded_rows = int(sys.argv[3]) if len(sys.argv) > 3 else 1000000
+    # Check that both algorithms aggregate the same requests.
+    log_entries = synthetic_log_entries(n_verified_rows)
+    start = time.time()
+    expected = nested_scan_requests(log_entries)
+    nested_scan_seconds = time.time() - start
+    start = time.time()
+    actual = list(milliscope.reconstruct_requests(milliscope.iter_chunks(log_entries)))
+    single_pass_seconds = time.time() - start
+    expected = [[(int(log_entries["event"][i]), int(log_entries["ts"][i]),
+                  int(log_entries["sock_fd"][i])) for i in request] for request in expected]
+    if actual != expected:
+        print("Requests differ from the nested scan on %s log entries" % n_verified_rows)
+        sys.exit(1)
+    print("Verified log entries: %s (%s requests)" % (n_verified_rows, len(expected)))
+    print("Nested scan: %.3f s" % nested_scan_seconds)
+    print("Single pass: %.3f s" % single_pass_seconds)
+    # Measure the single pass on the full synthetic log.
+    log_entries = synthetic_log_entries(n_rows)
+    n_requests = 0
+    start = time.time()
+    for request in milliscope.reconstruct_requests(milliscope.iter_chunks(log_entries)):
+        n_requests += 1
+    elapsed = time.time() - start
+    print("Log entries: %s (%s requests)" % (n_rows, n_requests))
+    print("Single pass: %.3f s" % elapsed)
+    print("Log entries per second: %.0f" % (n_rows / elapsed))
+    del log_entries
+    # Compare the loaders on synthetic log files.
+    logs_path = tempfile.mkdtemp()
+    try:
+        write_synthetic_logs(synthetic_log_entries(n_loaded_rows), logs_path)
+        (expected, dictreader_seconds, dictreader_peak) = measure(
+            dictreader_log_entries, PID, PORT, logs_path
+        )
+        (actual, numpy_seconds, numpy_peak) = measure(
+            milliscope.read_log_entries, PID, PORT, logs_path
+        )
+        if [(milliscope.EVENTS[event], ts, sock_fd) for (event, ts, sock_fd) in zip(
+                actual["event"].tolist(), actual["ts"].tolist(), actual["sock_fd"].tolist()
+        )] != expected:
+            print("Log entries differ from the csv.DictReader loader")
+            sys.exit(1)
+        size = sum([os.path.getsize(os.path.join(logs_path, name))
+                    for name in os.listdir(logs_path)])
+        print("Loaded log entries: %s of %s MB of log files" % (n_loaded_rows, size // 1000000))
+        print("csv.DictReader loader: %.3f s, %s MB peak" % (
+            dictreader_seconds, dictreader_peak // 1000000
+        ))
+        print("NumPy loader: %.3f s, %s MB peak" % (numpy_seconds, numpy_peak // 1000000))
+        # Compare the request spans of the sorted array with the ones of the merged streams.
+        ((expected_start_ts, expected_finish_ts), sorted_seconds, sorted_peak) = measure(
+            lambda: milliscope.request_spans(milliscope.iter_chunks(
+                milliscope.read_log_entries(PID, PORT, logs_path)
+            ))
+        )
+        ((start_ts, finish_ts), streaming_seconds, streaming_peak) = measure(
+            lambda: milliscope.request_spans(milliscope.stream_log_entries(PID, PORT, logs_path))
+        )
+        if not (numpy.array_equal(start_ts, expected_start_ts) and
+                numpy.array_equal(finish_ts, expected_finish_ts)):
+            print("Requests of the merged streams differ from the ones of the sorted array")
+            sys.exit(1)
+        print("Requests from sorted array: %.3f s, %s MB peak" % (
+            sorted_seconds, sorted_peak // 1000000
+        ))
+        print("Requests from merged streams: %.3f s, %s MB peak" % (
+            streaming_seconds, streaming_peak // 1000000
+        ))
+    finally:
+        shutil.rmtree(logs_path)
+    print("Max RSS: %s MB" % (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // 1024))
+
+if __name__ == "__main__":
+    main()
@@ -7,4 +7,13 @@ set timefmt "%s"
 set format x "%s"
 set key left top
 set grid
-plot "queue_length.data" using 1:2 with lines title "Workload: [FILL IN]"
+# Plot the data files downsampled by downsample.py, over the min/max envelopes of their samples,
+# with gnuplot -e 'suffix=".lttb"'.
+if (!exists("suffix")) suffix = ""
+if (suffix eq "") {
+  plot "queue_length.data" using 1:2 with lines title "Workload: [FILL IN]"
+} else {
+  set style fill solid 0.5 noborder
+  plot "queue_length.envelope.data" using 1:2:3 with filledcurves lc rgb "#c0c0c0" notitle, \
+       "queue_length".suffix.".data" using 1:2 with lines title "Workload: [FILL IN]"
+}
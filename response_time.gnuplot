@@ -7,4 +7,14 @@ set timefmt "%s"
 set format x "%s"
 set key left top
 set grid
-plot "response_time.data" using 1:2 with lines title "Workload: [FILL IN: WORKLOAD SIZE]"
+# Plot the data files downsampled by downsample.py, over the min/max envelopes of their samples,
+# with gnuplot -e 'suffix=".lttb"'.
+if (!exists("suffix")) suffix = ""
+if (suffix eq "") {
+  plot "response_time.data" using 1:2 with lines title "Workload: [FILL IN: WORKLOAD SIZE]"
+} else {
+  set style fill solid 0.5 noborder
+  plot "response_time.envelope.data" using 1:2:3 with filledcurves lc rgb "#c0c0c0" notitle, \
+       "response_time".suffix.".data" using 1:2 with lines \
+       title "Workload: [FILL IN: WORKLOAD SIZE]"
+}
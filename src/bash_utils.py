@@ -1,7 +1,9 @@
 """Utilities to simplify the execution of Bash scripts."""
 
 
+import os
 import subprocess
+import tempfile
 
 
 class BashScript:
@@ -12,16 +14,36 @@ class BashScript:
 
         source_code -- [str] Source code of the wrapped Bash script.
         """
-        self._path = subprocess.check_output("mktemp", shell=True).decode("utf-8").strip()
-        with open(self._path, 'w') as bash_script_file:
+        fd, self._path = tempfile.mkstemp()
+        with os.fdopen(fd, 'w') as bash_script_file:
             bash_script_file.write(source_code)
-        subprocess.run("chmod +x %s" % self._path, shell=True)
+        os.chmod(self._path, 0o700)
 
-    def execute(self, args=None):
+    def execute(self, args=None, resource_usage=None):
         """Execute the wrapped Bash script and return the text it writes to the standard output.
+        Raise subprocess.CalledProcessError if it exits with a non-zero status.
 
         args -- [list of str/None] Command-line arguments to the wrapped Bash script.
+        resource_usage -- [dict/None] Dictionary to fill with the exit status and resource usage of
+                          the wrapped Bash script and its descendants (see function os.wait4), even
+                          if it fails.
         """
         if args is None:
             args = []
-        return subprocess.check_output([self._path, *args])
+        process = subprocess.Popen([self._path, *args], stdout=subprocess.PIPE)
+        with process.stdout:
+            output = process.stdout.read()
+        _, status, rusage = os.wait4(process.pid, 0)
+        process.returncode = -os.WTERMSIG(status) if os.WIFSIGNALED(status) else \
+            os.WEXITSTATUS(status)
+        if resource_usage is not None:
+            resource_usage["exit_status"] = process.returncode
+            resource_usage.update({
+                field: getattr(rusage, field) for field in (
+                    "ru_utime", "ru_stime", "ru_maxrss", "ru_minflt", "ru_majflt", "ru_inblock",
+                    "ru_oublock", "ru_nvcsw", "ru_nivcsw"
+                )
+            })
+        if process.returncode != 0:
+            raise subprocess.CalledProcessError(process.returncode, self._path, output)
+        return output
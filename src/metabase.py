@@ -4,6 +4,8 @@
 """Command-line interface to run experiments in the Metabase runtime."""
 
 
+import os
+import sys
 import threading
 
 import click
@@ -12,6 +14,8 @@ import termcolor
 #import metabase_runtime
 import wedmakefile_parser
 import py_runtime
+import sqlite_runtime
+import tcp_runtime
 
 
 @click.group()
@@ -27,7 +31,10 @@ def main():
 @click.option("-v", "--verbose", default=False, is_flag=True)
 @click.option("-i", "--interactive", default=False, is_flag=True)
 @click.option("-q", "--quiet", default=False, is_flag=True)
-def run_local(wedmakefile_path, config_path, n_threads, log, verbose, interactive, quiet):
+@click.option("--optimistic/--pessimistic", default=False)
+@click.option("--on-conflict", type=click.Choice(["retry", "fail"]), default="retry")
+def run_local(wedmakefile_path, config_path, n_threads, log, verbose, interactive, quiet,
+        optimistic, on_conflict):
     """Run an experiment on the local machine.
 
     wedmakefile_path -- [str] Path to the WED-Makefile containing the experiment specification.
@@ -38,13 +45,18 @@ def run_local(wedmakefile_path, config_path, n_threads, log, verbose, interactiv
     verbose -- [bool] Enable/Disable verbose mode.
     interactive -- [bool] Enable/Disable interactive mode.
     quiet -- [bool] Enable/Disable quiet mode.
+    optimistic -- [bool] Enable/Disable optimistic execution of tasks.
+    on_conflict -- [str] What to do with an optimistically executed task whose dependent variables
+                   were updated concurrently: 'retry' or 'fail'.
     """
     try:
         experiment_instance = py_runtime.PyExperimentInstance(
             wedmakefile_parser.WEDMakefile(wedmakefile_path),
             config_path,
             log,
-            verbose
+            verbose,
+            optimistic,
+            on_conflict
         )
         workers = []
         for i in range(n_threads):
@@ -62,5 +74,437 @@ def run_local(wedmakefile_path, config_path, n_threads, log, verbose, interactiv
         termcolor.cprint("Success!", "white", "on_green", attrs=["bold"])
 
 
+@main.command()
+@click.argument("db_path", metavar="<db_path>")
+@click.argument("wedmakefile_path", metavar="<wedmakefile_path>")
+@click.argument("config_paths", metavar="<config_path>...", nargs=-1, required=True)
+def sqlite_instantiate(db_path, wedmakefile_path, config_paths):
+    """Instantiate an experiment in the SQLite runtime, once per configuration file.
+
+    db_path -- [str] Path to the SQLite database.
+    wedmakefile_path -- [str] Path to the WED-Makefile containing the experiment specification.
+    config_paths -- [list of str] Paths to the configuration files containing the initial states of
+                    the experiment instances.
+    """
+    try:
+        interface = sqlite_runtime.SqliteInterface(db_path)
+        for config_path in config_paths:
+            print(interface.instantiate(wedmakefile_path, config_path))
+    except Exception as e:
+        termcolor.cprint(str(e), "white", "on_red", attrs=["bold"])
+
+
+@main.command()
+@click.argument("wedmakefile_path", metavar="<wedmakefile_path>")
+@click.argument("message", metavar="<message>")
+@click.option("--host", default="localhost")
+@click.option("--port", default=5432)
+@click.option("--user", default="postgres")
+@click.option("--password", default="")
+@click.option("--dbname", default="wedmake")
+@click.option("--layout", type=click.Choice(["wide", "narrow"]), default=None)
+def metabase_push(wedmakefile_path, message, host, port, user, password, dbname, layout):
+    """Initialize or update an experiment specification on a Metabase server.
+
+    wedmakefile_path -- [str] Path to the WED-Makefile containing the experiment specification.
+    message -- [str] A message describing the experiment or its updates.
+    host -- [str] Metabase server hostname.
+    port -- [int] Metabase server port.
+    user -- [str] Metabase server username.
+    password -- [str] Metabase server password.
+    dbname -- [str] Metabase database name.
+    layout -- [str/None] Layout of experiment instance states: 'wide', with one column per
+              variable, or 'narrow', with one row per variable. Defaults to the layout of the
+              latest version of the experiment, or 'wide' for a new one.
+    """
+    try:
+        import metabase_runtime
+        interface = metabase_runtime.MetabaseInterface(host, user, password, dbname, port)
+        for name in interface.push(wedmakefile_parser.WEDMakefile(wedmakefile_path), message,
+                                   layout):
+            print(name)
+        interface.close()
+    except Exception as e:
+        termcolor.cprint(str(e), "white", "on_red", attrs=["bold"])
+
+
+@main.command()
+@click.argument("config_paths", metavar="<config_path>...", nargs=-1, required=True)
+@click.option("--host", default="localhost")
+@click.option("--port", default=5432)
+@click.option("--user", default="postgres")
+@click.option("--password", default="")
+@click.option("--dbname", default="wedmake")
+@click.option("--matrix", multiple=True, metavar="<identifier>=<value>[,<value>...]")
+@click.option("-j", "--jobs", default=8)
+def metabase_instantiate(config_paths, host, port, user, password, dbname, matrix, jobs):
+    """Instantiate the experiment pushed to a Metabase server, once per configuration file and
+    combination of matrix values, in a single transaction.
+
+    config_paths -- [list of str] Paths to the configuration files containing the initial states of
+                    the experiment instances.
+    host -- [str] Metabase server hostname.
+    port -- [int] Metabase server port.
+    user -- [str] Metabase server username.
+    password -- [str] Metabase server password.
+    dbname -- [str] Metabase database name.
+    matrix -- [list of str] Variables to assign every combination of the specified values to (e.g.,
+              CLIENT_USERS=100,200,300), on top of each configuration file.
+    jobs -- [int] Maximum number of configuration files captured at the same time.
+    """
+    try:
+        import metabase_runtime
+        interface = metabase_runtime.MetabaseInterface(host, user, password, dbname, port)
+        configs = []
+        for config_path in config_paths:
+            with open(config_path) as config_file:
+                configs.extend(interface.expand_matrix(config_file.read(), [
+                    (variable.split('=', 1)[0], variable.split('=', 1)[1].split(','))
+                    for variable in matrix
+                ]))
+        for eid in interface.instantiate_many(configs, jobs):
+            print(eid)
+        interface.close()
+    except Exception as e:
+        termcolor.cprint(str(e), "white", "on_red", attrs=["bold"])
+
+
+@main.command()
+@click.argument("n_workers", metavar="<n_workers>", default=8)
+@click.option("--host", default="localhost")
+@click.option("--port", default=5432)
+@click.option("--user", default="postgres")
+@click.option("--password", default="")
+@click.option("--dbname", default="wedmake")
+@click.option("--lease-timeout", default=60.0)
+@click.option("--wait-timeout", default=1.0)
+@click.option("--exit-when-idle/--wait", default=True)
+@click.option("--report-interval", default=10.0)
+@click.option("--log-dir", default=None)
+def metabase_schedule(n_workers, host, port, user, password, dbname, lease_timeout, wait_timeout,
+        exit_when_idle, report_interval, log_dir):
+    """Lease the tasks of every running experiment instance on a Metabase server to a fixed number
+    of worker threads, which execute their Bash scripts on this machine, periodically reporting
+    progress.
+
+    n_workers -- [int] Number of worker threads, each one holding a connection to the Metabase
+                 server.
+    host -- [str] Metabase server hostname.
+    port -- [int] Metabase server port.
+    user -- [str] Metabase server username.
+    password -- [str] Metabase server password.
+    dbname -- [str] Metabase database name.
+    lease_timeout -- [float] Seconds a leased task is reserved to a worker without a heartbeat.
+    wait_timeout -- [float] Seconds a worker waits at most for a state change when no task can be
+                    leased.
+    exit_when_idle -- [bool] Exit when no experiment instance is running.
+    report_interval -- [float] Seconds between progress reports.
+    log_dir -- [str] Path to the directory where the output of the Bash scripts is saved.
+    """
+    try:
+        import metabase_runtime
+        if log_dir is not None:
+            os.makedirs(log_dir, exist_ok=True)
+        interface = metabase_runtime.MetabaseInterface(
+            host, user, password, dbname, port, max_connections=n_workers + 1
+        )
+    except Exception as e:
+        termcolor.cprint(str(e), "white", "on_red", attrs=["bold"])
+        return
+    exceptions = []
+    done = threading.Event()
+
+    def run_worker():
+        try:
+            interface.work(lease_timeout, wait_timeout, exit_when_idle, log_dir)
+        except Exception as e:
+            exceptions.append(e)
+
+    def print_progress():
+        progress = interface.progress()
+        print("-- {running} running, {final} final, {inconsistent} inconsistent, {failed} failed "
+              "experiment instance(s); {n} task(s) executed.".format(
+            running=len([eid for eid, status, _, _ in progress if status == "running"]),
+            final=len([eid for eid, status, _, _ in progress if status == "final"]),
+            inconsistent=len([eid for eid, status, _, _ in progress if status == "inconsistent"]),
+            failed=len([eid for eid, status, _, _ in progress if status == "failed"]),
+            n=sum([n_executed for _, _, n_executed, _ in progress])
+        ))
+
+    def report():
+        while not done.wait(report_interval):
+            print_progress()
+
+    workers = [threading.Thread(target=run_worker) for i in range(n_workers)]
+    for worker_thread in workers:
+        worker_thread.start()
+    reporter = threading.Thread(target=report, daemon=True)
+    reporter.start()
+    for worker_thread in workers:
+        worker_thread.join()
+    done.set()
+    if len(exceptions):
+        termcolor.cprint(str(exceptions[0]), "white", "on_red", attrs=["bold"])
+    else:
+        print_progress()
+        termcolor.cprint("Success!", "white", "on_green", attrs=["bold"])
+    interface.close()
+
+
+@main.command()
+@click.option("--host", default="localhost")
+@click.option("--port", default=5432)
+@click.option("--user", default="postgres")
+@click.option("--password", default="")
+@click.option("--dbname", default="wedmake")
+def metabase_status(host, port, user, password, dbname):
+    """Print the status of the experiment instances on a Metabase server.
+
+    host -- [str] Metabase server hostname.
+    port -- [int] Metabase server port.
+    user -- [str] Metabase server username.
+    password -- [str] Metabase server password.
+    dbname -- [str] Metabase database name.
+    """
+    try:
+        import metabase_runtime
+        interface = metabase_runtime.MetabaseInterface(host, user, password, dbname, port)
+        for eid, status, n_executed, n_ready in interface.progress():
+            print("{eid} {status} ({n_executed} task(s) executed, {n_ready} ready)".format(
+                eid=eid,
+                status=status,
+                n_executed=n_executed,
+                n_ready=n_ready
+            ))
+        interface.close()
+    except Exception as e:
+        termcolor.cprint(str(e), "white", "on_red", attrs=["bold"])
+
+
+@main.command()
+@click.argument("eid", metavar="<eid>", type=int)
+@click.option("--host", default="localhost")
+@click.option("--port", default=5432)
+@click.option("--user", default="postgres")
+@click.option("--password", default="")
+@click.option("--dbname", default="wedmake")
+def metabase_history(eid, host, port, user, password, dbname):
+    """Print the executions of the tasks' Bash scripts of an experiment instance on a Metabase
+    server.
+
+    eid -- [int] Id of the experiment instance.
+    host -- [str] Metabase server hostname.
+    port -- [int] Metabase server port.
+    user -- [str] Metabase server username.
+    password -- [str] Metabase server password.
+    dbname -- [str] Metabase database name.
+    """
+    try:
+        import metabase_runtime
+        interface = metabase_runtime.MetabaseInterface(host, user, password, dbname, port)
+        for xid, task, worker, started_at, duration, exit_status, error, committed, max_rss in \
+                interface.executions(eid):
+            print("{xid} {task} {started_at} {duration:.3f}s exit={exit_status} rss={max_rss}KB "
+                  "{outcome} on {worker}".format(
+                xid=xid,
+                task=task,
+                started_at=started_at.isoformat(),
+                duration=duration,
+                exit_status=exit_status,
+                max_rss=max_rss,
+                outcome=error if error is not None else
+                    "committed" if committed else "discarded",
+                worker=worker
+            ))
+        interface.close()
+    except Exception as e:
+        termcolor.cprint(str(e), "white", "on_red", attrs=["bold"])
+
+
+@main.command()
+@click.option("--host", default="localhost")
+@click.option("--port", default=5432)
+@click.option("--user", default="postgres")
+@click.option("--password", default="")
+@click.option("--dbname", default="wedmake")
+def metabase_durations(host, port, user, password, dbname):
+    """Print duration percentiles of the tasks of the experiment pushed to a Metabase server,
+    across its experiment instances.
+
+    host -- [str] Metabase server hostname.
+    port -- [int] Metabase server port.
+    user -- [str] Metabase server username.
+    password -- [str] Metabase server password.
+    dbname -- [str] Metabase database name.
+    """
+    try:
+        import metabase_runtime
+        interface = metabase_runtime.MetabaseInterface(host, user, password, dbname, port)
+        for task, n, mean, p50, p90, p99, maximum in interface.task_durations():
+            if n == 0:
+                print("{task} (0 executions)".format(task=task))
+                continue
+            print("{task} ({n} execution(s)) mean={mean:.3f}s p50={p50:.3f}s p90={p90:.3f}s "
+                  "p99={p99:.3f}s max={maximum:.3f}s".format(
+                task=task,
+                n=n,
+                mean=mean,
+                p50=p50,
+                p90=p90,
+                p99=p99,
+                maximum=maximum
+            ))
+        interface.close()
+    except Exception as e:
+        termcolor.cprint(str(e), "white", "on_red", attrs=["bold"])
+
+
+@main.command()
+@click.argument("execution_id", metavar="<execution_id>", type=int)
+@click.option("--stream", type=click.Choice(["stdout", "stderr"]), default="stdout")
+@click.option("--host", default="localhost")
+@click.option("--port", default=5432)
+@click.option("--user", default="postgres")
+@click.option("--password", default="")
+@click.option("--dbname", default="wedmake")
+def metabase_output(execution_id, stream, host, port, user, password, dbname):
+    """Print the standard output or standard error of an execution of a task's Bash script stored
+    on a Metabase server.
+
+    execution_id -- [int] Id of the execution (see command metabase-history).
+    stream -- [str] Either 'stdout' or 'stderr'.
+    host -- [str] Metabase server hostname.
+    port -- [int] Metabase server port.
+    user -- [str] Metabase server username.
+    password -- [str] Metabase server password.
+    dbname -- [str] Metabase database name.
+    """
+    try:
+        import metabase_runtime
+        interface = metabase_runtime.MetabaseInterface(host, user, password, dbname, port)
+        interface.write_output(execution_id, stream, sys.stdout.buffer)
+        interface.close()
+    except Exception as e:
+        termcolor.cprint(str(e), "white", "on_red", attrs=["bold"])
+
+
+@main.command()
+@click.argument("db_path", metavar="<db_path>")
+@click.option("--log-dir", default=None)
+@click.option("--poll-interval", default=0.1)
+@click.option("--exit-when-idle/--wait", default=True)
+@click.option("--lock-timeout", default=60.0)
+@click.option("-v", "--verbose", default=False, is_flag=True)
+def worker(db_path, log_dir, poll_interval, exit_when_idle, lock_timeout, verbose):
+    """Run a worker process that claims and executes tasks of experiment instances in the SQLite
+    runtime. Several workers can run concurrently on the same database.
+
+    db_path -- [str] Path to the SQLite database.
+    log_dir -- [str/None] Path to the directory where tasks' standard output and standard error are
+               written.
+    poll_interval -- [float] Seconds to sleep when no task is ready to be executed.
+    exit_when_idle -- [bool] Exit when no experiment instance is running.
+    lock_timeout -- [float] Seconds until the variables locked by a task are released, unless its
+                    worker renews them, e.g., because it died.
+    verbose -- [bool] Enable/Disable verbose mode.
+    """
+    try:
+        sqlite_runtime.SqliteWorker(db_path, log_dir, verbose, lock_timeout).run(
+            poll_interval, exit_when_idle
+        )
+    except Exception as e:
+        termcolor.cprint(str(e), "white", "on_red", attrs=["bold"])
+    else:
+        termcolor.cprint("Success!", "white", "on_green", attrs=["bold"])
+
+
+@main.command()
+@click.argument("db_path", metavar="<db_path>")
+def sqlite_status(db_path):
+    """Print the status of the experiment instances in the SQLite runtime.
+
+    db_path -- [str] Path to the SQLite database.
+    """
+    for eid, status, message, n_executed_tasks in \
+            sqlite_runtime.SqliteInterface(db_path).status():
+        print("{eid} {status} ({n} task(s) executed){message}".format(
+            eid=eid,
+            status=status,
+            n=n_executed_tasks,
+            message="" if message is None else ": " + message
+        ))
+
+
+@main.command()
+@click.argument("wedmakefile_path", metavar="<wedmakefile_path>")
+@click.argument("config_path", metavar="<config_path>")
+@click.option("--host", default="0.0.0.0")
+@click.option("--port", default=7777)
+@click.option("--lease-timeout", default=60.0)
+@click.option("-v", "--verbose", default=False, is_flag=True)
+def coordinator(wedmakefile_path, config_path, host, port, lease_timeout, verbose):
+    """Coordinate the execution of an experiment instance whose tasks are executed by agents.
+
+    wedmakefile_path -- [str] Path to the WED-Makefile containing the experiment specification.
+    config_path -- [str] Path to the configuration file containing the initial state of the
+                   experiment instance.
+    host -- [str] Address to listen on.
+    port -- [int] Port to listen on.
+    lease_timeout -- [float] Seconds until a task leased to an agent is re-dispatched, unless the
+                     agent renews its lease.
+    verbose -- [bool] Enable/Disable verbose mode.
+    """
+    try:
+        experiment_coordinator = tcp_runtime.Coordinator(
+            wedmakefile_parser.WEDMakefile(wedmakefile_path),
+            config_path,
+            host,
+            port,
+            lease_timeout,
+            verbose=verbose
+        )
+        experiment_coordinator.run()
+    except Exception as e:
+        termcolor.cprint(str(e), "white", "on_red", attrs=["bold"])
+    else:
+        print("-- Reached a final state.")
+        termcolor.cprint("Success!", "white", "on_green", attrs=["bold"])
+
+
+@main.command()
+@click.argument("host", metavar="<host>")
+@click.argument("port", metavar="<port>", type=int)
+@click.argument("n_threads", metavar="<n_threads>", default=1)
+@click.option("--log-dir", default=None)
+@click.option("-v", "--verbose", default=False, is_flag=True)
+def agent(host, port, n_threads, log_dir, verbose):
+    """Lease and execute tasks from a coordinator.
+
+    host -- [str] Coordinator hostname.
+    port -- [int] Coordinator port.
+    n_threads -- [int] Number of tasks to execute concurrently.
+    log_dir -- [str/None] Path to the directory where tasks' standard output and standard error are
+               written.
+    verbose -- [bool] Enable/Disable verbose mode.
+    """
+    exceptions = []
+
+    def run_agent():
+        try:
+            tcp_runtime.Agent(host, port, log_dir, verbose).run()
+        except Exception as e:
+            exceptions.append(e)
+
+    workers = [threading.Thread(target=run_agent) for i in range(n_threads)]
+    for worker_thread in workers:
+        worker_thread.start()
+    for worker_thread in workers:
+        worker_thread.join()
+    if len(exceptions):
+        termcolor.cprint(str(exceptions[0]), "white", "on_red", attrs=["bold"])
+    else:
+        termcolor.cprint("Success!", "white", "on_green", attrs=["bold"])
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,935 @@
+#!/usr/bin/env python3.6
+
+
+"""Benchmarks of the Metabase runtime on a scratch PostgreSQL database."""
+
+
+import contextlib
+import json
+import math
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import click
+import psycopg2
+import psycopg2.extensions
+import yaml
+from psycopg2.extras import Json
+
+import metabase_runtime
+import wedmakefile_parser
+
+
+def synthetic_wedmakefile(n_namespaces, n_variables, n_tasks, n_dependencies, width=16,
+        bash="true"):
+    """Write a synthetic WED-Makefile to a temporary file and return its path.
+
+    Variable N<i>_V<j> is the j-th variable of namespace N<i> and variable N0_ID identifies the
+    experiment instance. Tasks are arranged in levels of the specified width: task T<t> assigns
+    'done' to its own variable, the t-th one in round-robin order over the namespaces, once the task
+    at the same position in the previous level is done. It also depends on the variables that
+    follow its own one, which may overlap with other tasks' namespaces. The experiment instance
+    reaches a final state once the tasks of the last level are done.
+
+    n_namespaces -- [int] Number of namespaces.
+    n_variables -- [int] Number of variables per namespace.
+    n_tasks -- [int] Number of tasks.
+    n_dependencies -- [int] Number of variables each task depends on, besides the one of the task
+                      at the same position in the previous level.
+    width -- [int] Number of tasks per level, at most 256.
+    bash -- [str] Bash commands executed by every task before updating its own variable.
+    """
+    variables = [
+        "N{i}_V{j}".format(i=i, j=j) for j in range(n_variables) for i in range(n_namespaces)
+    ]
+    tasks = []
+    for t in range(n_tasks):
+        tasks.append({
+            "name": "T{t}".format(t=t),
+            "guard": ["${variable} != \"done\"".format(variable=variables[t % len(variables)])] + [
+                "${variable} != \"never\"".format(variable=variables[(t + k) % len(variables)])
+                for k in range(1, n_dependencies)
+            ] + ([
+                "${variable} = \"done\"".format(variable=variables[(t - width) % len(variables)])
+            ] if t >= width else []),
+            "bash": "{bash}\n{variable}=\"done\"\n".format(
+                bash=bash,
+                variable=variables[t % len(variables)]
+            )
+        })
+    fd, path = tempfile.mkstemp(suffix=".yml")
+    with os.fdopen(fd, 'w') as wedmakefile_file:
+        yaml.dump({
+            "initial_guard": ["$N0_ID != \"\""],
+            "final_guard": [
+                "${variable} = \"done\"".format(variable=variables[t % len(variables)])
+                for t in range(max(0, n_tasks - width), n_tasks)
+            ],
+            "tasks": tasks
+        }, wedmakefile_file, default_flow_style=False)
+    return path
+
+
+@contextlib.contextmanager
+def scratch_database(host, port, user, password, dbname):
+    """Return a context manager that creates an empty database and drops it on exit.
+
+    host -- [str] PostgreSQL server hostname.
+    port -- [int] PostgreSQL server port.
+    user -- [str] PostgreSQL server username.
+    password -- [str] PostgreSQL server password.
+    dbname -- [str] Name of the scratch database, dropped first if it exists.
+    """
+    conn = psycopg2.connect(psycopg2.extensions.make_dsn(
+        host=host, port=port, dbname="postgres", user=user, password=password
+    ))
+    conn.autocommit = True
+    cur = conn.cursor()
+    cur.execute("DROP DATABASE IF EXISTS \"{dbname}\"".format(dbname=dbname))
+    cur.execute("CREATE DATABASE \"{dbname}\"".format(dbname=dbname))
+    try:
+        yield
+    finally:
+        cur.execute("DROP DATABASE IF EXISTS \"{dbname}\"".format(dbname=dbname))
+        conn.close()
+
+
+def state_relations(cur, layout):
+    """Return the names of the tables storing experiment instance states in the specified layout.
+
+    cur -- [psycopg2.extensions.cursor] Cursor of a connection to the Metabase database.
+    layout -- [str] Layout of experiment instance states.
+    """
+    if layout == "narrow":
+        return ["experiment_instance_variable"]
+    cur.execute("""
+        SELECT relname FROM pg_class
+            WHERE relkind = 'r' AND relname LIKE 'experiment\\_instance\\_state\\_%'
+    """)
+    return sorted([row[0] for row in cur.fetchall()])
+
+
+# Format of the lines printed by command compare.
+COMPARISON_FORMAT = "{tasks} tasks: {metric} {baseline:.4g} -> {result:.4g} ({change:+.1%}){flag}"
+
+# Measurements compared by command compare, with whether higher values are better.
+COMPARED_METRICS = [
+    ("push_seconds", False),
+    ("repush_seconds", False),
+    ("instantiation_per_second", True),
+    ("tasks_per_second", True),
+    ("db_cpu_seconds_per_task", False)
+]
+
+
+@contextlib.contextmanager
+def throwaway_postgres(pg_bin, port):
+    """Return a context manager that initializes and starts a PostgreSQL server in a temporary
+    directory, listening only on a Unix socket in that directory, and yields the directory (i.e.,
+    the host to connect to). The server is stopped and its directory removed on exit.
+
+    pg_bin -- [str/None] Path to the directory of the PostgreSQL executables, or None to search
+              for them in the PATH.
+    port -- [int] Port, which names the Unix socket.
+    """
+    if pg_bin is None:
+        pg_ctl = shutil.which("pg_ctl")
+        if pg_ctl is None:
+            raise RuntimeError("pg_ctl was not found in the PATH (see option --pg-bin).")
+        pg_bin = os.path.dirname(pg_ctl)
+    datadir = tempfile.mkdtemp(prefix="wedmake-pg-")
+    try:
+        subprocess.check_call([
+            os.path.join(pg_bin, "initdb"), "-D", datadir, "-U", "postgres", "--auth=trust",
+            "-E", "UTF8"
+        ], stdout=subprocess.DEVNULL)
+        subprocess.check_call([
+            os.path.join(pg_bin, "pg_ctl"), "-D", datadir, "-l", os.path.join(datadir, "log"),
+            "-o", "-p {port} -k {datadir} -c listen_addresses='' -c max_connections=200".format(
+                port=port,
+                datadir=datadir
+            ),
+            "-w", "start"
+        ], stdout=subprocess.DEVNULL)
+        try:
+            yield datadir
+        finally:
+            subprocess.check_call([
+                os.path.join(pg_bin, "pg_ctl"), "-D", datadir, "-m", "fast", "-w", "stop"
+            ], stdout=subprocess.DEVNULL)
+    finally:
+        shutil.rmtree(datadir, ignore_errors=True)
+
+
+def postmaster_pid(cur):
+    """Return the process id of the PostgreSQL server's postmaster, or None if it does not run on
+    this machine.
+
+    cur -- [psycopg2.extensions.cursor] Cursor of a connection to the PostgreSQL server.
+    """
+    cur.execute("SELECT pg_backend_pid()")
+    backend_pid = cur.fetchone()[0]
+    try:
+        with open("/proc/{pid}/stat".format(pid=backend_pid)) as stat_file:
+            return int(stat_file.read().rsplit(")", 1)[1].split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+def postgres_cpu_seconds(pid):
+    """Return the CPU time in seconds consumed so far by a PostgreSQL server (i.e., by its
+    postmaster, its live backends, and its terminated backends) according to /proc, or None if it
+    cannot be read.
+
+    pid -- [int/None] Process id of the PostgreSQL server's postmaster.
+    """
+    if pid is None or not os.path.isdir("/proc"):
+        return None
+    ticks = 0
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open("/proc/{pid}/stat".format(pid=entry)) as stat_file:
+                fields = stat_file.read().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        # Fields: state, ppid, ..., utime (11), stime (12), cutime (13), cstime (14).
+        if int(entry) == pid:
+            ticks += sum([int(field) for field in fields[11:15]])
+        elif int(fields[1]) == pid:
+            ticks += int(fields[11]) + int(fields[12])
+    return ticks / os.sysconf("SC_CLK_TCK")
+
+
+class LockWaitSampler:
+    """A thread sampling the backends of a database that are active and the ones waiting for a
+    lock held by another transaction.
+    """
+
+    def __init__(self, dsn, interval):
+        """Start sampling.
+
+        dsn -- [str] Connection string of the database.
+        interval -- [float] Seconds between samples.
+        """
+        self._conn = psycopg2.connect(dsn)
+        self._conn.autocommit = True
+        self._interval = interval
+        self._n_active = 0
+        self._n_waiting = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample)
+        self._thread.start()
+
+    def _sample(self):
+        cur = self._conn.cursor()
+        while not self._stop.wait(self._interval):
+            cur.execute("""
+                SELECT count(*) FILTER (WHERE state = 'active'),
+                       count(*) FILTER (WHERE state = 'active' AND wait_event_type = 'Lock')
+                    FROM pg_stat_activity
+                    WHERE datname = current_database() AND pid != pg_backend_pid()
+            """)
+            n_active, n_waiting = cur.fetchone()
+            self._n_active += n_active
+            self._n_waiting += n_waiting
+
+    def stop(self):
+        """Stop sampling and return the fraction of active backends found waiting for a lock."""
+        self._stop.set()
+        self._thread.join()
+        self._conn.close()
+        return self._n_waiting / self._n_active if self._n_active else 0.0
+
+
+class CountingCursor(psycopg2.extensions.cursor):
+    """A cursor counting the round trips of its statements (see class CountingConnection)."""
+
+    def execute(self, query, vars=None):
+        self.connection.count_statement()
+        return super().execute(query, vars)
+
+    def executemany(self, query, vars_list):
+        vars_list = list(vars_list)
+        for _ in vars_list:
+            self.connection.count_statement()
+        return super().executemany(query, vars_list)
+
+
+class CountingConnection(psycopg2.extensions.connection):
+    """A connection counting its round trips to the PostgreSQL server in class attribute
+    round_trips: one per statement, one for the BEGIN psycopg2 sends before the first statement of
+    a transaction, and one per commit or rollback of a transaction.
+    """
+
+    round_trips = 0
+    lock = threading.Lock()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cursor_factory = CountingCursor
+
+    @classmethod
+    def count(cls, n_round_trips):
+        with cls.lock:
+            cls.round_trips += n_round_trips
+
+    def count_statement(self):
+        self.count(1 if self.autocommit or self.get_transaction_status() !=
+                   psycopg2.extensions.TRANSACTION_STATUS_IDLE else 2)
+
+    def commit(self):
+        if self.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+            self.count(1)
+        super().commit()
+
+    def rollback(self):
+        if self.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+            self.count(1)
+        super().rollback()
+
+
+def benchmark_layout(host, port, user, password, dbname, layout, n_namespaces, n_variables,
+        n_tasks, n_dependencies, n_instances, n_updates):
+    """Measure the cost of storing and updating experiment instance states in the specified layout
+    and return the measurements as a dictionary.
+
+    Tasks' Bash scripts are not executed: updates are committed directly through function
+    _commit_<task>, one per transaction, so that the measurements isolate the state storage.
+
+    host -- [str] PostgreSQL server hostname.
+    port -- [int] PostgreSQL server port.
+    user -- [str] PostgreSQL server username.
+    password -- [str] PostgreSQL server password.
+    dbname -- [str] Name of the scratch database.
+    layout -- [str] Layout of experiment instance states.
+    n_namespaces -- [int] Number of namespaces of the synthetic WED-Makefile.
+    n_variables -- [int] Number of variables per namespace.
+    n_tasks -- [int] Number of tasks.
+    n_dependencies -- [int] Number of variables each task depends on.
+    n_instances -- [int] Number of experiment instances.
+    n_updates -- [int] Number of committed task updates.
+    """
+    wedmakefile_path = synthetic_wedmakefile(n_namespaces, n_variables, n_tasks, n_dependencies)
+    extended_path = synthetic_wedmakefile(n_namespaces, n_variables + 1, n_tasks, n_dependencies)
+    try:
+        wedmakefile = wedmakefile_parser.WEDMakefile(wedmakefile_path)
+        results = {"layout": layout}
+        with scratch_database(host, port, user, password, dbname):
+            interface = metabase_runtime.MetabaseInterface(host, user, password, dbname, port)
+            try:
+                start = time.time()
+                interface.push(wedmakefile, "benchmark", layout)
+                results["push_seconds"] = time.time() - start
+                start = time.time()
+                eids = interface.instantiate_many(interface.expand_matrix("", [
+                    ("N0_ID", [str(i) for i in range(n_instances)])
+                ]))
+                results["instantiation_per_second"] = n_instances / (time.time() - start)
+                conn = psycopg2.connect(psycopg2.extensions.make_dsn(
+                    host=host, port=port, dbname=dbname, user=user, password=password
+                ))
+                cur = conn.cursor()
+                tasks = wedmakefile.tasks()
+                start = time.time()
+                for i in range(n_updates):
+                    task = tasks[i % len(tasks)]
+                    cur.execute(
+                        "SELECT \"_commit_{task}\"(%s, %s)".format(task=task.name()),
+                        (eids[(i // len(tasks)) % len(eids)], Json([
+                            {"identifier": variable.identifier(), "value": str(i), "perm": "rw"}
+                            for variable in task.guard().on_variables()
+                        ]))
+                    )
+                    conn.commit()
+                results["updates_per_second"] = n_updates / (time.time() - start)
+                relations = state_relations(cur, layout)
+                conn.commit()
+                # Backends report their table statistics when they exit.
+                conn.close()
+                time.sleep(1.0)
+                conn = psycopg2.connect(psycopg2.extensions.make_dsn(
+                    host=host, port=port, dbname=dbname, user=user, password=password
+                ))
+                cur = conn.cursor()
+                cur.execute("""
+                    SELECT COALESCE(sum(pg_total_relation_size(c.oid)), 0)::bigint,
+                           COALESCE(sum(s.n_tup_upd), 0)::bigint,
+                           COALESCE(sum(s.n_tup_hot_upd), 0)::bigint
+                        FROM pg_class c
+                        LEFT JOIN pg_stat_user_tables s ON s.relid = c.oid
+                        WHERE c.relname = ANY(%s)
+                """, (relations,))
+                size, n_tup_upd, n_tup_hot_upd = cur.fetchone()
+                conn.close()
+                results["state_bytes"] = size
+                results["state_bytes_per_instance"] = size / n_instances
+                results["hot_update_ratio"] = n_tup_hot_upd / n_tup_upd if n_tup_upd else None
+                start = time.time()
+                interface.push(wedmakefile_parser.WEDMakefile(extended_path), "extended", layout)
+                results["push_new_variables_seconds"] = time.time() - start
+            finally:
+                interface.close()
+        return results
+    finally:
+        os.remove(wedmakefile_path)
+        os.remove(extended_path)
+
+
+def benchmark_run(host, port, user, password, dbname, layout, n_namespaces, n_tasks,
+        n_dependencies, width, n_instances, n_workers, bash, sample_interval):
+    """Measure the cost of pushing a synthetic WED-Makefile, instantiating it, and running the
+    experiment instances to completion with a pool of workers, and return the measurements as a
+    dictionary.
+
+    host -- [str] PostgreSQL server hostname.
+    port -- [int] PostgreSQL server port.
+    user -- [str] PostgreSQL server username.
+    password -- [str] PostgreSQL server password.
+    dbname -- [str] Name of the scratch database.
+    layout -- [str] Layout of experiment instance states.
+    n_namespaces -- [int] Number of namespaces of the synthetic WED-Makefile.
+    n_tasks -- [int] Number of tasks.
+    n_dependencies -- [int] Number of variables each task depends on.
+    width -- [int] Number of tasks per level.
+    n_instances -- [int] Number of experiment instances.
+    n_workers -- [int] Number of worker threads.
+    bash -- [str] Bash commands executed by every task.
+    sample_interval -- [float] Seconds between samples of the backends waiting for a lock.
+    """
+    n_variables = max(1, math.ceil(n_tasks / n_namespaces))
+    wedmakefile_path = synthetic_wedmakefile(n_namespaces, n_variables, n_tasks, n_dependencies,
+                                             width, bash)
+    dsn = psycopg2.extensions.make_dsn(
+        host=host, port=port, dbname=dbname, user=user, password=password
+    )
+    try:
+        wedmakefile = wedmakefile_parser.WEDMakefile(wedmakefile_path)
+        results = {"tasks": n_tasks, "variables": n_namespaces * n_variables}
+        with scratch_database(host, port, user, password, dbname):
+            interface = metabase_runtime.MetabaseInterface(
+                host, user, password, dbname, port, max_connections=n_workers + 2
+            )
+            try:
+                conn = psycopg2.connect(dsn)
+                cur = conn.cursor()
+                cur.execute("SHOW server_version")
+                results["server_version"] = cur.fetchone()[0]
+                pid = postmaster_pid(cur)
+                conn.commit()
+                start = time.time()
+                interface.push(wedmakefile, "benchmark", layout)
+                results["push_seconds"] = time.time() - start
+                start = time.time()
+                interface.push(wedmakefile, "benchmark", layout)
+                results["repush_seconds"] = time.time() - start
+                start = time.time()
+                interface.instantiate_many(interface.expand_matrix("", [
+                    ("N0_ID", [str(i) for i in range(n_instances)])
+                ]))
+                results["instantiation_per_second"] = n_instances / (time.time() - start)
+                cur.execute(
+                    "SELECT deadlocks FROM pg_stat_database WHERE datname = current_database()"
+                )
+                n_deadlocks = cur.fetchone()[0]
+                conn.commit()
+                statistics = [{} for _ in range(n_workers)]
+                executed = [0] * n_workers
+
+                def worker(i):
+                    executed[i] = interface.work(
+                        wait_timeout=sample_interval,
+                        statistics=statistics[i]
+                    )
+
+                threads = [threading.Thread(target=worker, args=(i,)) for i in range(n_workers)]
+                sampler = LockWaitSampler(dsn, sample_interval)
+                cpu_seconds = postgres_cpu_seconds(pid)
+                start = time.time()
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+                run_seconds = time.time() - start
+                if cpu_seconds is not None:
+                    cpu_seconds = postgres_cpu_seconds(pid) - cpu_seconds
+                results["lock_wait_ratio"] = sampler.stop()
+                n_executed = sum(executed)
+                n_attempts = sum([worker_statistics["lease_attempts"]
+                                  for worker_statistics in statistics])
+                n_leases = sum([worker_statistics["leases"] for worker_statistics in statistics])
+                results["run_seconds"] = run_seconds
+                results["tasks_executed"] = n_executed
+                results["tasks_per_second"] = n_executed / run_seconds
+                results["lease_attempts_per_second"] = n_attempts / run_seconds
+                results["empty_lease_ratio"] = (n_attempts - n_leases) / n_attempts \
+                    if n_attempts else None
+                results["rejected_commits"] = sum([worker_statistics["rejected_commits"]
+                                                   for worker_statistics in statistics])
+                results["db_cpu_seconds"] = cpu_seconds
+                results["db_cpu_seconds_per_task"] = cpu_seconds / n_executed \
+                    if cpu_seconds is not None and n_executed else None
+                conn.close()
+            finally:
+                interface.close()
+            # Backends report their database statistics when they exit.
+            time.sleep(1.0)
+            conn = psycopg2.connect(dsn)
+            cur = conn.cursor()
+            cur.execute(
+                "SELECT deadlocks FROM pg_stat_database WHERE datname = current_database()"
+            )
+            results["deadlocks"] = cur.fetchone()[0] - n_deadlocks
+            cur.execute("SELECT _status, count(*) FROM experiment_instance GROUP BY _status")
+            results["statuses"] = dict(cur.fetchall())
+            conn.close()
+        return results
+    finally:
+        os.remove(wedmakefile_path)
+
+
+def benchmark_steps(host, port, user, password, dbname, layout, mode, n_namespaces, n_tasks,
+        n_dependencies, width, n_instances, wait_timeout):
+    """Count the round trips to the PostgreSQL server made to run the experiment instances of a
+    synthetic WED-Makefile of no-op tasks to completion, and return the measurements as a
+    dictionary.
+
+    host -- [str] PostgreSQL server hostname.
+    port -- [int] PostgreSQL server port.
+    user -- [str] PostgreSQL server username.
+    password -- [str] PostgreSQL server password.
+    dbname -- [str] Name of the scratch database.
+    layout -- [str] Layout of experiment instance states.
+    mode -- [str] Either 'run', to run each experiment instance in its own thread (see method
+            metabase_runtime.MetabaseInterface.run), or 'work', to run them all with a single worker
+            thread (see method metabase_runtime.MetabaseInterface.work).
+    n_namespaces -- [int] Number of namespaces of the synthetic WED-Makefile.
+    n_tasks -- [int] Number of tasks.
+    n_dependencies -- [int] Number of variables each task depends on.
+    width -- [int] Number of tasks per level.
+    n_instances -- [int] Number of experiment instances.
+    wait_timeout -- [float] Seconds a thread waits at most for a state change when no task can be
+                    leased.
+    """
+    n_variables = max(1, math.ceil(n_tasks / n_namespaces))
+    wedmakefile_path = synthetic_wedmakefile(n_namespaces, n_variables, n_tasks, n_dependencies,
+                                             width)
+    try:
+        wedmakefile = wedmakefile_parser.WEDMakefile(wedmakefile_path)
+        results = {"mode": mode}
+        with scratch_database(host, port, user, password, dbname):
+            interface = metabase_runtime.MetabaseInterface(
+                host, user, password, dbname, port, max_connections=n_instances + 1,
+                connection_factory=CountingConnection
+            )
+            try:
+                interface.push(wedmakefile, "benchmark", layout)
+                eids = interface.instantiate_many(interface.expand_matrix("", [
+                    ("N0_ID", [str(i) for i in range(n_instances)])
+                ]))
+                if mode == "run":
+                    threads = [
+                        threading.Thread(target=interface.run, args=(eid,),
+                                         kwargs={"wait_timeout": wait_timeout})
+                        for eid in eids
+                    ]
+                else:
+                    threads = [threading.Thread(target=interface.work,
+                                                kwargs={"wait_timeout": wait_timeout})]
+                CountingConnection.round_trips = 0
+                start = time.time()
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+                results["run_seconds"] = time.time() - start
+                results["round_trips"] = CountingConnection.round_trips
+            finally:
+                interface.close()
+            conn = psycopg2.connect(psycopg2.extensions.make_dsn(
+                host=host, port=port, dbname=dbname, user=user, password=password
+            ))
+            cur = conn.cursor()
+            cur.execute("SELECT count(*) FROM task_execution WHERE _committed")
+            results["tasks_executed"] = cur.fetchone()[0]
+            cur.execute("SELECT _status, count(*) FROM experiment_instance GROUP BY _status")
+            results["statuses"] = dict(cur.fetchall())
+            conn.close()
+        results["round_trips_per_task"] = results["round_trips"] / results["tasks_executed"] \
+            if results["tasks_executed"] else None
+        return results
+    finally:
+        os.remove(wedmakefile_path)
+
+
+def benchmark_functions(host, port, user, password, dbname, layout, n_namespaces, n_tasks,
+        n_dependencies, width, n_calls):
+    """Measure the time per call of the functions generated for a synthetic WED-Makefile on one
+    experiment instance, each call in its own transaction, and return the measurements in
+    microseconds as a dictionary. A call to SELECT 1 is also measured, as the cost of a round trip.
+
+    host -- [str] PostgreSQL server hostname.
+    port -- [int] PostgreSQL server port.
+    user -- [str] PostgreSQL server username.
+    password -- [str] PostgreSQL server password.
+    dbname -- [str] Name of the scratch database.
+    layout -- [str] Layout of experiment instance states.
+    n_namespaces -- [int] Number of namespaces of the synthetic WED-Makefile.
+    n_tasks -- [int] Number of tasks.
+    n_dependencies -- [int] Number of variables each task depends on.
+    width -- [int] Number of tasks per level.
+    n_calls -- [int] Number of calls per function.
+    """
+    n_variables = max(1, math.ceil(n_tasks / n_namespaces))
+    wedmakefile_path = synthetic_wedmakefile(n_namespaces, n_variables, n_tasks, n_dependencies,
+                                             width)
+    try:
+        wedmakefile = wedmakefile_parser.WEDMakefile(wedmakefile_path)
+        task = wedmakefile.tasks()[0].name()
+        results = {"layout": layout}
+        with scratch_database(host, port, user, password, dbname):
+            interface = metabase_runtime.MetabaseInterface(host, user, password, dbname, port)
+            try:
+                interface.push(wedmakefile, "benchmark", layout)
+                eid = interface.instantiate_many(interface.expand_matrix("", [("N0_ID", ["0"])]))[0]
+            finally:
+                interface.close()
+            conn = psycopg2.connect(psycopg2.extensions.make_dsn(
+                host=host, port=port, dbname=dbname, user=user, password=password
+            ))
+            conn.autocommit = True
+            cur = conn.cursor()
+            calls = [
+                ("SELECT 1", "SELECT 1", ()),
+                ("_is_in_final_state", "SELECT _is_in_final_state(%s)", (eid,)),
+                ("_is_in_inconsistent_state", "SELECT _is_in_inconsistent_state(%s)", (eid,)),
+                ("_is_<task>_ready_to_execute",
+                 "SELECT \"_is_{task}_ready_to_execute\"(%s)".format(task=task), (eid,)),
+                ("_is_<task>_ready", "SELECT \"_is_{task}_ready\"(%s)".format(task=task), (eid,)),
+                ("_commit_<task> (no-op)", "SELECT \"_commit_{task}\"(%s, %s)".format(task=task),
+                 (eid, Json([])))
+            ]
+            results["us_per_call"] = {}
+            for name, statement, args in calls:
+                # The first call plans the statements of the function, which are then cached.
+                cur.execute(statement, args)
+                cur.fetchall()
+                start = time.time()
+                for _ in range(n_calls):
+                    cur.execute(statement, args)
+                    cur.fetchall()
+                results["us_per_call"][name] = (time.time() - start) / n_calls * 1e6
+            conn.close()
+        return results
+    finally:
+        os.remove(wedmakefile_path)
+
+
+@click.group()
+def main():
+    pass
+
+
+@main.command()
+@click.option("--host", default="localhost")
+@click.option("--port", default=5432)
+@click.option("--user", default="postgres")
+@click.option("--password", default="")
+@click.option("--dbname", default="wedmake_bench")
+@click.option("--namespaces", "n_namespaces", default=10)
+@click.option("--variables", "n_variables", default=100)
+@click.option("--tasks", "n_tasks", default=200)
+@click.option("--dependencies", "n_dependencies", default=4)
+@click.option("--instances", "n_instances", default=100)
+@click.option("--updates", "n_updates", default=5000)
+@click.option("-o", "--output", default=None)
+def layouts(host, port, user, password, dbname, n_namespaces, n_variables, n_tasks, n_dependencies,
+        n_instances, n_updates, output):
+    """Compare the update throughput and table size of the layouts of experiment instance states
+    on a synthetic WED-Makefile, printing the measurements as JSON.
+
+    host -- [str] PostgreSQL server hostname.
+    port -- [int] PostgreSQL server port.
+    user -- [str] PostgreSQL server username.
+    password -- [str] PostgreSQL server password.
+    dbname -- [str] Prefix of the names of the scratch databases, which are dropped on exit.
+    n_namespaces -- [int] Number of namespaces of the synthetic WED-Makefile.
+    n_variables -- [int] Number of variables per namespace.
+    n_tasks -- [int] Number of tasks.
+    n_dependencies -- [int] Number of variables each task depends on.
+    n_instances -- [int] Number of experiment instances.
+    n_updates -- [int] Number of committed task updates.
+    output -- [str] Path to the file where the measurements are also written.
+    """
+    results = {
+        "parameters": {
+            "namespaces": n_namespaces,
+            "variables": n_variables,
+            "tasks": n_tasks,
+            "dependencies": n_dependencies,
+            "instances": n_instances,
+            "updates": n_updates
+        },
+        "layouts": [
+            benchmark_layout(
+                host, port, user, password,
+                "{dbname}_{layout}".format(dbname=dbname, layout=layout),
+                layout, n_namespaces, n_variables, n_tasks, n_dependencies, n_instances, n_updates
+            )
+            for layout in sorted(metabase_runtime.MetabaseInterface.LAYOUTS.keys(), reverse=True)
+        ]
+    }
+    print(json.dumps(results, indent=2))
+    if output is not None:
+        with open(output, 'w') as output_file:
+            json.dump(results, output_file, indent=2)
+
+
+@main.command()
+@click.option("--host", default=None)
+@click.option("--port", default=5432)
+@click.option("--user", default="postgres")
+@click.option("--password", default="")
+@click.option("--dbname", default="wedmake_bench")
+@click.option("--pg-bin", default=None)
+@click.option("--layout", default="wide",
+              type=click.Choice(sorted(metabase_runtime.MetabaseInterface.LAYOUTS.keys())))
+@click.option("--sizes", default="10,50,200")
+@click.option("--namespaces", "n_namespaces", default=4)
+@click.option("--dependencies", "n_dependencies", default=2)
+@click.option("--width", default=8)
+@click.option("--instances", "n_instances", default=20)
+@click.option("--workers", "n_workers", default=8)
+@click.option("--task", type=click.Choice(["noop", "sleep"]), default="noop")
+@click.option("--sleep", default=0.1)
+@click.option("--sample-interval", default=0.2)
+@click.option("-o", "--output", default=None)
+def run(host, port, user, password, dbname, pg_bin, layout, sizes, n_namespaces, n_dependencies,
+        width, n_instances, n_workers, task, sleep, sample_interval, output):
+    """Run the experiment instances of synthetic WED-Makefiles of increasing size to completion,
+    printing the measurements as JSON.
+
+    Unless a PostgreSQL server hostname is specified, a throwaway PostgreSQL server is initialized
+    in a temporary directory with the executables found in the PATH or in directory pg_bin.
+
+    host -- [str/None] PostgreSQL server hostname, or None to use a throwaway server.
+    port -- [int] PostgreSQL server port.
+    user -- [str] PostgreSQL server username.
+    password -- [str] PostgreSQL server password.
+    dbname -- [str] Name of the scratch database, which is dropped on exit.
+    pg_bin -- [str] Path to the directory of the PostgreSQL executables.
+    layout -- [str] Layout of experiment instance states.
+    sizes -- [str] Comma-separated numbers of tasks of the synthetic WED-Makefiles.
+    n_namespaces -- [int] Number of namespaces of the synthetic WED-Makefiles.
+    n_dependencies -- [int] Number of variables each task depends on.
+    width -- [int] Number of tasks per level.
+    n_instances -- [int] Number of experiment instances.
+    n_workers -- [int] Number of worker threads.
+    task -- [str] Whether tasks do nothing ("noop") or sleep ("sleep").
+    sleep -- [float] Seconds each task sleeps.
+    sample_interval -- [float] Seconds between samples of the backends waiting for a lock, which
+                       is also the workers' wait timeout.
+    output -- [str] Path to the file where the measurements are also written.
+    """
+    bash = "true" if task == "noop" else "sleep {sleep}".format(sleep=sleep)
+    results = {
+        "parameters": {
+            "layout": layout,
+            "namespaces": n_namespaces,
+            "dependencies": n_dependencies,
+            "width": width,
+            "instances": n_instances,
+            "workers": n_workers,
+            "task": bash
+        }
+    }
+    with contextlib.ExitStack() as stack:
+        if host is None:
+            host = stack.enter_context(throwaway_postgres(pg_bin, port))
+            user = "postgres"
+        results["runs"] = [
+            benchmark_run(host, port, user, password, dbname, layout, n_namespaces, int(size),
+                          n_dependencies, width, n_instances, n_workers, bash, sample_interval)
+            for size in sizes.split(",")
+        ]
+    print(json.dumps(results, indent=2))
+    if output is not None:
+        with open(output, 'w') as output_file:
+            json.dump(results, output_file, indent=2)
+
+
+@main.command()
+@click.option("--host", default=None)
+@click.option("--port", default=5432)
+@click.option("--user", default="postgres")
+@click.option("--password", default="")
+@click.option("--dbname", default="wedmake_bench")
+@click.option("--pg-bin", default=None)
+@click.option("--layout", default="wide",
+              type=click.Choice(sorted(metabase_runtime.MetabaseInterface.LAYOUTS.keys())))
+@click.option("--tasks", "n_tasks", default=100)
+@click.option("--namespaces", "n_namespaces", default=4)
+@click.option("--dependencies", "n_dependencies", default=2)
+@click.option("--width", default=1)
+@click.option("--instances", "n_instances", default=1)
+@click.option("--wait-timeout", default=1.0)
+@click.option("-o", "--output", default=None)
+def steps(host, port, user, password, dbname, pg_bin, layout, n_tasks, n_namespaces,
+        n_dependencies, width, n_instances, wait_timeout, output):
+    """Count the round trips to the PostgreSQL server per executed task when running the experiment
+    instances of a synthetic WED-Makefile of no-op tasks, by default a 100-task chain, with a thread
+    per experiment instance and with a single worker thread, printing the measurements as JSON.
+
+    Unless a PostgreSQL server hostname is specified, a throwaway PostgreSQL server is initialized
+    in a temporary directory with the executables found in the PATH or in directory pg_bin.
+
+    host -- [str/None] PostgreSQL server hostname, or None to use a throwaway server.
+    port -- [int] PostgreSQL server port.
+    user -- [str] PostgreSQL server username.
+    password -- [str] PostgreSQL server password.
+    dbname -- [str] Name of the scratch database, which is dropped on exit.
+    pg_bin -- [str] Path to the directory of the PostgreSQL executables.
+    layout -- [str] Layout of experiment instance states.
+    n_tasks -- [int] Number of tasks of the synthetic WED-Makefile.
+    n_namespaces -- [int] Number of namespaces of the synthetic WED-Makefile.
+    n_dependencies -- [int] Number of variables each task depends on.
+    width -- [int] Number of tasks per level.
+    n_instances -- [int] Number of experiment instances.
+    wait_timeout -- [float] Seconds a thread waits at most for a state change when no task can be
+                    leased.
+    output -- [str] Path to the file where the measurements are also written.
+    """
+    results = {
+        "parameters": {
+            "layout": layout,
+            "tasks": n_tasks,
+            "namespaces": n_namespaces,
+            "dependencies": n_dependencies,
+            "width": width,
+            "instances": n_instances
+        }
+    }
+    with contextlib.ExitStack() as stack:
+        if host is None:
+            host = stack.enter_context(throwaway_postgres(pg_bin, port))
+            user = "postgres"
+        results["modes"] = [
+            benchmark_steps(host, port, user, password, dbname, layout, mode, n_namespaces,
+                            n_tasks, n_dependencies, width, n_instances, wait_timeout)
+            for mode in ("run", "work")
+        ]
+    print(json.dumps(results, indent=2))
+    if output is not None:
+        with open(output, 'w') as output_file:
+            json.dump(results, output_file, indent=2)
+
+
+@main.command()
+@click.option("--host", default=None)
+@click.option("--port", default=5432)
+@click.option("--user", default="postgres")
+@click.option("--password", default="")
+@click.option("--dbname", default="wedmake_bench")
+@click.option("--pg-bin", default=None)
+@click.option("--tasks", "n_tasks", default=100)
+@click.option("--namespaces", "n_namespaces", default=4)
+@click.option("--dependencies", "n_dependencies", default=2)
+@click.option("--width", default=1)
+@click.option("--calls", "n_calls", default=5000)
+@click.option("-o", "--output", default=None)
+def functions(host, port, user, password, dbname, pg_bin, n_tasks, n_namespaces, n_dependencies,
+        width, n_calls, output):
+    """Measure the time per call of the functions generated for a synthetic WED-Makefile, by
+    default a 100-task chain, in every layout of experiment instance states, printing the
+    measurements as JSON.
+
+    Unless a PostgreSQL server hostname is specified, a throwaway PostgreSQL server is initialized
+    in a temporary directory with the executables found in the PATH or in directory pg_bin.
+
+    host -- [str/None] PostgreSQL server hostname, or None to use a throwaway server.
+    port -- [int] PostgreSQL server port.
+    user -- [str] PostgreSQL server username.
+    password -- [str] PostgreSQL server password.
+    dbname -- [str] Prefix of the names of the scratch databases, which are dropped on exit.
+    pg_bin -- [str] Path to the directory of the PostgreSQL executables.
+    n_tasks -- [int] Number of tasks of the synthetic WED-Makefile.
+    n_namespaces -- [int] Number of namespaces of the synthetic WED-Makefile.
+    n_dependencies -- [int] Number of variables each task depends on.
+    width -- [int] Number of tasks per level.
+    n_calls -- [int] Number of calls per function.
+    output -- [str] Path to the file where the measurements are also written.
+    """
+    results = {
+        "parameters": {
+            "tasks": n_tasks,
+            "namespaces": n_namespaces,
+            "dependencies": n_dependencies,
+            "width": width,
+            "calls": n_calls
+        }
+    }
+    with contextlib.ExitStack() as stack:
+        if host is None:
+            host = stack.enter_context(throwaway_postgres(pg_bin, port))
+            user = "postgres"
+        results["layouts"] = [
+            benchmark_functions(
+                host, port, user, password,
+                "{dbname}_{layout}".format(dbname=dbname, layout=layout),
+                layout, n_namespaces, n_tasks, n_dependencies, width, n_calls
+            )
+            for layout in sorted(metabase_runtime.MetabaseInterface.LAYOUTS.keys(), reverse=True)
+        ]
+    print(json.dumps(results, indent=2))
+    if output is not None:
+        with open(output, 'w') as output_file:
+            json.dump(results, output_file, indent=2)
+
+
+@main.command()
+@click.argument("baseline_path")
+@click.argument("results_path")
+@click.option("--tolerance", default=0.25)
+def compare(baseline_path, results_path, tolerance):
+    """Compare the measurements of command run with a baseline, run by run, and exit with status 1
+    if any measurement regressed by more than the tolerance.
+
+    baseline_path -- [str] Path to the baseline measurements.
+    results_path -- [str] Path to the measurements.
+    tolerance -- [float] Relative regression tolerated.
+    """
+    with open(baseline_path) as baseline_file:
+        baseline = json.load(baseline_file)
+    with open(results_path) as results_file:
+        results = json.load(results_file)
+    baseline_runs = {run["tasks"]: run for run in baseline["runs"]}
+    regressed = False
+    for results_run in results["runs"]:
+        baseline_run = baseline_runs.get(results_run["tasks"])
+        if baseline_run is None:
+            continue
+        for metric, higher_is_better in COMPARED_METRICS:
+            if baseline_run.get(metric) is None or results_run.get(metric) is None:
+                continue
+            ratio = results_run[metric] / baseline_run[metric] if baseline_run[metric] else 1.0
+            worse = ratio < 1.0 - tolerance if higher_is_better else ratio > 1.0 + tolerance
+            regressed = regressed or worse
+            print(COMPARISON_FORMAT.format(
+                tasks=results_run["tasks"],
+                metric=metric,
+                baseline=baseline_run[metric],
+                result=results_run[metric],
+                change=ratio - 1.0,
+                flag=" REGRESSION" if worse else ""
+            ))
+    sys.exit(1 if regressed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,31 @@
 """Utilities to run experiments in the Metabase runtime."""
 
 
-# TODO: Replace double quotes with single quotes (SQL standard) in lists.
-# TODO: Parameterize the database "wedmake".
-# TODO: Store the content written to stdout and stderr by tasks' Bash scripts.
-# TODO: Handle tasks' Bash script errors.
-# TODO: Sleep in method run.
 # TODO: Write test cases.
 
 
-import random
+import ast
+import concurrent.futures
+import contextlib
+import hashlib
+import itertools
+import json
+import os
 import re
+import select
+import shlex
+import socket
+import tempfile
+import threading
+import time
+import weakref
+import zlib
 
 import psycopg2
+import psycopg2.errors
+import psycopg2.extensions
+import psycopg2.extras
+import psycopg2.pool
 from psycopg2.extras import Json
 
 import py_runtime
@@ -29,6 +42,14 @@ class MetabaseDependency:
         """
         self._dependency = dependency
 
+    @staticmethod
+    def quote_literal(value):
+        """Return the specified value as an SQL string literal.
+
+        value -- [str] Value to quote.
+        """
+        return "'%s'" % str(value).replace("'", "''")
+
     def to_sql(self):
         """Return the SQL code equivalent to the wrapped dependency."""
         equality_match = re.fullmatch(
@@ -36,18 +57,18 @@ class MetabaseDependency:
             self._dependency.clause()
         )
         if equality_match is not None:
-            return "\"_value_%s\" = '%s'" % (
+            return "\"_value_%s\" = %s" % (
                 equality_match.groups()[0],
-                equality_match.groups()[1][1:-1].replace("'", "''")
+                MetabaseDependency.quote_literal(equality_match.groups()[1][1:-1])
             )
         inequality_match = re.fullmatch(
             wedmakefile_parser.Dependency.INEQUALITY_CLAUSE,
             self._dependency.clause()
         )
         if inequality_match is not None:
-            return "\"_value_%s\" != '%s'" % (
+            return "\"_value_%s\" != %s" % (
                 inequality_match.groups()[0],
-                inequality_match.groups()[1][1:-1].replace("'", "''")
+                MetabaseDependency.quote_literal(inequality_match.groups()[1][1:-1])
             )
         membership_match = re.fullmatch(
             wedmakefile_parser.Dependency.MEMBERSHIP_CLAUSE,
@@ -56,7 +77,10 @@ class MetabaseDependency:
         if membership_match is not None:
             return "\"_value_%s\" IN (%s)" % (
                 membership_match.groups()[0],
-                membership_match.groups()[1][1:-1]
+                ", ".join([
+                    MetabaseDependency.quote_literal(value)
+                    for value in ast.literal_eval(membership_match.groups()[1])
+                ])
             )
         nomembership_match = re.fullmatch(
             wedmakefile_parser.Dependency.NOMEMBERSHIP_CLAUSE,
@@ -65,40 +89,735 @@ class MetabaseDependency:
         if nomembership_match is not None:
             return "\"_value_%s\" NOT IN (%s)" % (
                 nomembership_match.groups()[0],
-                nomembership_match.groups()[1][1:-1]
+                ", ".join([
+                    MetabaseDependency.quote_literal(value)
+                    for value in ast.literal_eval(nomembership_match.groups()[1])
+                ])
             )
 
 
+class MetabaseWideLayout:
+    """A layout of experiment instance states in the Metabase runtime.
+
+    Variables are grouped by namespace into tables with one row per experiment instance and a pair
+    of value and permission columns per variable, so reading all the variables of a namespace takes
+    a single row lookup. Every push adds columns for new variables.
+    """
+
+    def __init__(self, wedmakefile):
+        """Lay out the state of the experiment instances of the specified experiment.
+
+        wedmakefile -- [wedmakefile_parser.WEDMakefile] Parsed WED-Makefile containing the
+                       experiment specification.
+        """
+        self._wedmakefile = wedmakefile
+
+    @staticmethod
+    def name():
+        """Return the layout name."""
+        return "wide"
+
+    def schema(self):
+        """Return a list of the names and SQL statements of the tables, columns, triggers, and
+        functions storing experiment instance states (see method MetabaseInterface.push).
+        """
+        schema = []
+        schema.extend([('TABLE "experiment_instance_state_{namespace}"'.format(
+            namespace=namespace
+        ), """
+            -- Store experiment instance state (namespace: {namespace}).
+            CREATE TABLE IF NOT EXISTS "experiment_instance_state_{namespace}"(
+                _eid INTEGER REFERENCES experiment_instance(_id),
+                PRIMARY KEY(_eid)
+            );
+        """.format(namespace=namespace)) for namespace in self._wedmakefile.variables_namespaces()])
+        schema.extend([('COLUMN "experiment_instance_state_{namespace}"."value_{variable}"'.format(
+            namespace=variable.namespace(),
+            variable=variable.identifier()
+        ), """
+            -- Add columns to store the values and permissions of variable {variable}.
+            ALTER TABLE "experiment_instance_state_{namespace}"
+                ADD COLUMN IF NOT EXISTS "value_{variable}" TEXT;
+            ALTER TABLE "experiment_instance_state_{namespace}"
+                ADD COLUMN IF NOT EXISTS "perm_{variable}" CHAR(2);
+        """.format(
+            variable=variable.identifier(),
+            namespace=variable.namespace()
+        )) for variable in self._wedmakefile.variables()])
+        schema.extend([(
+            'TRIGGER _notify_state_change ON "experiment_instance_state_{namespace}"'.format(
+                namespace=namespace
+            ),
+            """
+            -- Notify state changes (namespace: {namespace}).
+            DROP TRIGGER IF EXISTS _notify_state_change ON "experiment_instance_state_{namespace}";
+            CREATE TRIGGER _notify_state_change AFTER UPDATE ON "experiment_instance_state_{namespace}"
+                FOR EACH ROW EXECUTE PROCEDURE _notify_state_change();
+        """.format(namespace=namespace)) for namespace in self._wedmakefile.variables_namespaces()])
+        schema.extend([('FUNCTION "_refresh_task_readiness_{namespace}"()'.format(
+            namespace=namespace
+        ), """
+            -- Re-evaluate the guards of the tasks that depend on variables of namespace {namespace}
+            --     whose values changed.
+            CREATE OR REPLACE FUNCTION "_refresh_task_readiness_{namespace}"() RETURNS trigger AS $$
+            DECLARE
+                {variables_declaration}
+            BEGIN
+                {tasks_evaluation}
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql;
+            DROP TRIGGER IF EXISTS _refresh_task_readiness ON "experiment_instance_state_{namespace}";
+            CREATE TRIGGER _refresh_task_readiness
+                AFTER INSERT OR UPDATE ON "experiment_instance_state_{namespace}"
+                FOR EACH ROW EXECUTE PROCEDURE "_refresh_task_readiness_{namespace}"();
+        """.format(
+            namespace=namespace,
+            variables_declaration="\n                ".join([
+                "\"_value_{variable}\" text;".format(variable=variable.identifier())
+                for variable in sorted(set([
+                    variable
+                    for task in self._wedmakefile.tasks()
+                    if namespace in task.guard().on_variables_namespaces()
+                    for variable in task.guard().on_variables()
+                ]))
+            ]),
+            tasks_evaluation='\n'.join(["""
+                IF TG_OP = 'INSERT' OR {changed} THEN
+                    {variables_initialization}
+                    INSERT INTO task_readiness(_eid, _task, _ready)
+                        VALUES (NEW._eid, '{task}', COALESCE({task_guard}, FALSE))
+                        ON CONFLICT (_eid, _task) DO UPDATE SET _ready = EXCLUDED._ready
+                        WHERE task_readiness._ready IS DISTINCT FROM EXCLUDED._ready;
+                END IF;
+            """.format(
+                task=task.name(),
+                changed=" OR ".join([
+                    "NEW.\"value_{variable}\" IS DISTINCT FROM OLD.\"value_{variable}\"".format(
+                        variable=variable.identifier()
+                    )
+                    for variable in task.guard().on_variables(namespace=namespace)
+                ]),
+                variables_initialization="\n                    ".join([
+                    "\"_value_{variable}\" := NEW.\"value_{variable}\";".format(
+                        variable=variable.identifier()
+                    )
+                    for variable in task.guard().on_variables(namespace=namespace)
+                ] + [
+                    "SELECT {columns} INTO {variables} FROM \"experiment_instance_state_{other}\" "
+                    "WHERE _eid = NEW._eid;".format(
+                        columns=", ".join([
+                            "\"value_%s\"" % variable.identifier()
+                            for variable in task.guard().on_variables(namespace=other)
+                        ]),
+                        other=other,
+                        variables=", ".join([
+                            "\"_value_%s\"" % variable.identifier()
+                            for variable in task.guard().on_variables(namespace=other)
+                        ])
+                    )
+                    for other in task.guard().on_variables_namespaces() if other != namespace
+                ]),
+                task_guard=" AND ".join([
+                    MetabaseDependency(dependency).to_sql()
+                    for dependency in task.guard().dependencies()
+                ])
+            ) for task in self._wedmakefile.tasks()
+            if namespace in task.guard().on_variables_namespaces()])
+        )) for namespace in self._wedmakefile.variables_namespaces()])
+        return schema
+
+    @staticmethod
+    def namespaces(variables):
+        """Return a sorted list with the namespaces of the specified variables.
+
+        variables -- [list of wedmakefile_parser.Variable] Sorted list of variables.
+        """
+        return sorted(set([variable.namespace() for variable in variables]))
+
+    def load(self, variables, eid, nowait=False):
+        """Return PL/pgSQL statements assigning the values of the specified variables of an
+        experiment instance to local variables "_value_<identifier>".
+
+        variables -- [list of wedmakefile_parser.Variable] Sorted list of variables to load.
+        eid -- [str] SQL expression of the experiment instance id.
+        nowait -- [bool] Lock the state of the experiment instance, making the enclosing function
+                  return false if it is already locked.
+        """
+        return '\n'.join([("""
+                BEGIN
+                    SELECT {columns} INTO {variables} FROM "experiment_instance_state_{namespace}"
+                        WHERE _eid = {eid} FOR UPDATE NOWAIT;
+                EXCEPTION WHEN lock_not_available THEN
+                    RETURN FALSE;
+                END;
+            """ if nowait else """
+                SELECT {columns} INTO {variables} FROM "experiment_instance_state_{namespace}"
+                    WHERE _eid = {eid};
+            """).format(
+                columns=", ".join([
+                    "\"value_%s\"" % variable.identifier()
+                    for variable in variables if variable.namespace() == namespace
+                ]),
+                namespace=namespace,
+                variables=", ".join([
+                    "\"_value_%s\"" % variable.identifier()
+                    for variable in variables if variable.namespace() == namespace
+                ]),
+                eid=eid
+            ) for namespace in self.namespaces(variables)])
+
+    def insert(self, eid):
+        """Return PL/pgSQL statements storing the state of a new experiment instance from local
+        variables "_value_<identifier>" and "_perm_<identifier>".
+
+        eid -- [str] SQL expression of the experiment instance id.
+        """
+        return '\n'.join(["""
+                    INSERT INTO "experiment_instance_state_{namespace}"(_eid, {columns})
+                        VALUES ({eid}, {variables});
+            """.format(
+                namespace=namespace,
+                columns=", ".join([
+                    "\"value_{variable}\", \"perm_{variable}\"".format(
+                        variable=variable.identifier()
+                    )
+                    for variable in self._wedmakefile.variables(namespace=namespace)
+                ]),
+                variables=", ".join([
+                    "\"_value_{variable}\", \"_perm_{variable}\"".format(
+                        variable=variable.identifier()
+                    )
+                    for variable in self._wedmakefile.variables(namespace=namespace)
+                ]),
+                eid=eid
+            ) for namespace in self._wedmakefile.variables_namespaces()])
+
+    def update(self, task, eid, diff):
+        """Return PL/pgSQL statements storing the values and permissions of the variables updated
+        by a task's Bash script. The statements may use local variables _it and _identifier.
+
+        task -- [wedmakefile_parser.Task] Task whose Bash script updated the variables.
+        eid -- [str] SQL expression of the experiment instance id.
+        diff -- [str] SQL expression of a JSON array of dictionaries with the identifiers, values,
+                and permissions of the updated variables.
+        """
+        return """
+                _it := 0;
+                WHILE _it < json_array_length({diff}) LOOP
+                    {variables_update}
+                    RAISE EXCEPTION 'Variable % must be declared as a dependency of task {task}.',
+                                    ({diff}->_it)->>'identifier';
+                END LOOP;
+        """.format(
+            task=task.name(),
+            diff=diff,
+            variables_update='\n'.join(["""
+                    IF ({diff}->_it)->>'identifier' = '{variable}' THEN
+                        UPDATE "experiment_instance_state_{namespace}"
+                            SET "value_{variable}" = ({diff}->_it)->>'value',
+                                "perm_{variable}" = ({diff}->_it)->>'perm'
+                            WHERE _eid = {eid};
+                        _it := _it + 1;
+                        CONTINUE;
+                    END IF;
+            """.format(
+                namespace=variable.namespace(),
+                variable=variable.identifier(),
+                eid=eid,
+                diff=diff
+            ) for variable in task.guard().on_variables()])
+        )
+
+    def lease_candidates(self, task, condition):
+        """Return an SQL query selecting the ids of the experiment instances whose readiness to
+        execute the specified task satisfies a condition, locking their state with SKIP LOCKED.
+
+        task -- [wedmakefile_parser.Task] Task to lease.
+        condition -- [str] SQL condition on the columns of table task_readiness (aliased r) and
+                     table experiment_instance (aliased i).
+        """
+        namespaces = task.guard().on_variables_namespaces()
+        return """
+                            SELECT r._eid FROM task_readiness r
+                                JOIN experiment_instance i ON i._id = r._eid
+                                {joins}
+                                WHERE {condition}
+                                FOR UPDATE OF {tables} SKIP LOCKED
+        """.format(
+            joins="\n                                ".join([
+                "JOIN \"experiment_instance_state_{namespace}\" \"s_{namespace}\" "
+                "ON \"s_{namespace}\"._eid = r._eid".format(namespace=namespace)
+                for namespace in namespaces
+            ]),
+            condition=condition,
+            tables=", ".join([
+                "\"s_{namespace}\"".format(namespace=namespace) for namespace in namespaces
+            ]) if len(namespaces) > 0 else "r"
+        )
+
+    def lease_state(self, task, eid, into):
+        """Return an SQL statement assigning a JSON array of dictionaries with the identifiers,
+        values, and permissions of the dependent variables of a task to a local variable.
+
+        task -- [wedmakefile_parser.Task] Leased task.
+        eid -- [str] SQL expression of the experiment instance id.
+        into -- [str] Name of the local variable, of type json.
+        """
+        namespaces = task.guard().on_variables_namespaces()
+        return """
+                                SELECT json_agg(json_build_object(
+                                    'identifier', _variables._identifier,
+                                    'value', _variables._value,
+                                    'perm', _variables._perm
+                                )) INTO {into}
+                                    FROM {tables_list}
+                                    CROSS JOIN LATERAL (VALUES {variables})
+                                        AS _variables(_identifier, _value, _perm)
+                                    WHERE {tables_condition};
+        """.format(
+            into=into,
+            tables_list=", ".join([
+                "\"experiment_instance_state_{namespace}\" \"s_{namespace}\"".format(
+                    namespace=namespace
+                )
+                for namespace in namespaces
+            ]) if len(namespaces) > 0 else "(VALUES (1)) AS _none",
+            variables=", ".join([
+                "('{variable}', \"s_{namespace}\".\"value_{variable}\", "
+                "\"s_{namespace}\".\"perm_{variable}\"::text)".format(
+                    namespace=variable.namespace(),
+                    variable=variable.identifier()
+                )
+                for variable in task.guard().on_variables()
+            ]) if len(task.guard().on_variables()) > 0 else "(NULL, NULL, NULL)",
+            tables_condition=" AND ".join([
+                "\"s_{namespace}\"._eid = {eid}".format(namespace=namespace, eid=eid)
+                for namespace in namespaces
+            ]) if len(namespaces) > 0 else "FALSE"
+        )
+
+
+class MetabaseNarrowLayout(MetabaseWideLayout):
+    """A layout of experiment instance states in the Metabase runtime.
+
+    Every variable of every experiment instance is stored in its own row of a single key-value
+    table, so pushing new variables changes no table and updating a variable rewrites a narrow row
+    that is not indexed by value (i.e., eligible for heap-only tuple updates). Readiness is
+    re-evaluated once per statement from its transition table.
+    """
+
+    @staticmethod
+    def name():
+        """Return the layout name."""
+        return "narrow"
+
+    @staticmethod
+    def identifiers(variables):
+        """Return an SQL array of the identifiers of the specified variables.
+
+        variables -- [list of wedmakefile_parser.Variable] Variables.
+        """
+        return "ARRAY[{identifiers}]::text[]".format(identifiers=", ".join([
+            "'{variable}'".format(variable=variable.identifier()) for variable in variables
+        ]))
+
+    def schema(self):
+        """Return a list of the names and SQL statements of the tables, columns, triggers, and
+        functions storing experiment instance states (see method MetabaseInterface.push).
+        """
+        dependencies = [
+            (variable, task)
+            for task in self._wedmakefile.tasks()
+            for variable in task.guard().on_variables()
+        ]
+        schema = []
+        schema.append(("TABLE experiment_instance_variable", """
+            -- Store experiment instance state, one row per variable. Free space is left in every
+            --     page so that updates can be heap-only.
+            CREATE TABLE IF NOT EXISTS experiment_instance_variable(
+                _eid INTEGER REFERENCES experiment_instance(_id),
+                _variable TEXT NOT NULL,
+                _value TEXT,
+                _perm CHAR(2),
+                PRIMARY KEY(_eid, _variable)
+            ) WITH (fillfactor = 80);
+        """))
+        schema.append(("TRIGGER _notify_state_change ON experiment_instance_variable", """
+            -- Notify state changes.
+            DROP TRIGGER IF EXISTS _notify_state_change ON experiment_instance_variable;
+            CREATE TRIGGER _notify_state_change AFTER UPDATE ON experiment_instance_variable
+                FOR EACH ROW EXECUTE PROCEDURE _notify_state_change();
+        """))
+        schema.append(("FUNCTION _refresh_task_readiness()", """
+            -- Re-evaluate the guards of the tasks that depend on the variables inserted or updated
+            --     by a statement, once per experiment instance.
+            CREATE OR REPLACE FUNCTION _refresh_task_readiness() RETURNS trigger AS $$
+            BEGIN
+                {tasks_evaluation}
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql;
+            DROP TRIGGER IF EXISTS _refresh_task_readiness_insert ON experiment_instance_variable;
+            CREATE TRIGGER _refresh_task_readiness_insert
+                AFTER INSERT ON experiment_instance_variable
+                REFERENCING NEW TABLE AS _changed
+                FOR EACH STATEMENT EXECUTE PROCEDURE _refresh_task_readiness();
+            DROP TRIGGER IF EXISTS _refresh_task_readiness_update ON experiment_instance_variable;
+            CREATE TRIGGER _refresh_task_readiness_update
+                AFTER UPDATE ON experiment_instance_variable
+                REFERENCING NEW TABLE AS _changed
+                FOR EACH STATEMENT EXECUTE PROCEDURE _refresh_task_readiness();
+        """.format(
+            tasks_evaluation="""
+                INSERT INTO task_readiness(_eid, _task, _ready)
+                    SELECT _affected._eid, _affected._task, COALESCE(CASE _affected._task
+                            {tasks_guard}
+                        END, FALSE)
+                    FROM (
+                        SELECT DISTINCT c._eid, d._task FROM _changed c
+                            JOIN (VALUES {dependencies}) AS d(_variable, _task)
+                                ON d._variable = c._variable
+                    ) AS _affected
+                    ON CONFLICT (_eid, _task) DO UPDATE SET _ready = EXCLUDED._ready
+                    WHERE task_readiness._ready IS DISTINCT FROM EXCLUDED._ready;
+            """.format(
+                tasks_guard="\n                            ".join([
+                    "WHEN '{task}' THEN \"_is_{task}_ready\"(_affected._eid)".format(
+                        task=task.name()
+                    )
+                    for task in self._wedmakefile.tasks()
+                    if len(task.guard().on_variables()) > 0
+                ]),
+                dependencies=", ".join([
+                    "('{variable}', '{task}')".format(
+                        variable=variable.identifier(),
+                        task=task.name()
+                    )
+                    for variable, task in dependencies
+                ])
+            ) if len(dependencies) > 0 else ""
+        )))
+        return schema
+
+    def load(self, variables, eid, nowait=False):
+        """Return PL/pgSQL statements assigning the values of the specified variables of an
+        experiment instance to local variables "_value_<identifier>".
+
+        variables -- [list of wedmakefile_parser.Variable] Sorted list of variables to load.
+        eid -- [str] SQL expression of the experiment instance id.
+        nowait -- [bool] Lock the state of the experiment instance, making the enclosing function
+                  return false if it is already locked.
+        """
+        if len(variables) == 0:
+            return ""
+        return (("""
+                BEGIN
+                    PERFORM 1 FROM experiment_instance_variable
+                        WHERE _eid = {eid} AND _variable = ANY({identifiers}) FOR UPDATE NOWAIT;
+                EXCEPTION WHEN lock_not_available THEN
+                    RETURN FALSE;
+                END;
+        """ if nowait else "") + """
+                SELECT {columns} INTO {variables} FROM experiment_instance_variable
+                    WHERE _eid = {eid} AND _variable = ANY({identifiers});
+        """).format(
+            columns=", ".join([
+                "max(_value) FILTER (WHERE _variable = '%s')" % variable.identifier()
+                for variable in variables
+            ]),
+            variables=", ".join([
+                "\"_value_%s\"" % variable.identifier() for variable in variables
+            ]),
+            eid=eid,
+            identifiers=self.identifiers(variables)
+        )
+
+    def insert(self, eid):
+        """Return PL/pgSQL statements storing the state of a new experiment instance from local
+        variables "_value_<identifier>" and "_perm_<identifier>".
+
+        eid -- [str] SQL expression of the experiment instance id.
+        """
+        if len(self._wedmakefile.variables()) == 0:
+            return ""
+        return """
+                    INSERT INTO experiment_instance_variable(_eid, _variable, _value, _perm)
+                        VALUES {rows};
+        """.format(rows=", ".join([
+            "({eid}, '{variable}', \"_value_{variable}\", \"_perm_{variable}\")".format(
+                eid=eid,
+                variable=variable.identifier()
+            )
+            for variable in self._wedmakefile.variables()
+        ]))
+
+    def update(self, task, eid, diff):
+        """Return PL/pgSQL statements storing the values and permissions of the variables updated
+        by a task's Bash script. The statements may use local variables _it and _identifier.
+
+        task -- [wedmakefile_parser.Task] Task whose Bash script updated the variables.
+        eid -- [str] SQL expression of the experiment instance id.
+        diff -- [str] SQL expression of a JSON array of dictionaries with the identifiers, values,
+                and permissions of the updated variables.
+        """
+        return """
+                FOR _identifier IN
+                    SELECT _diff->>'identifier' FROM json_array_elements({diff}) AS _diff
+                        WHERE _diff->>'identifier' != ALL({identifiers})
+                LOOP
+                    RAISE EXCEPTION 'Variable % must be declared as a dependency of task {task}.',
+                                    _identifier;
+                END LOOP;
+                INSERT INTO experiment_instance_variable(_eid, _variable, _value, _perm)
+                    SELECT {eid}, _diff->>'identifier', _diff->>'value', _diff->>'perm'
+                        FROM json_array_elements({diff}) AS _diff
+                    ON CONFLICT (_eid, _variable) DO UPDATE
+                        SET _value = EXCLUDED._value, _perm = EXCLUDED._perm;
+        """.format(
+            task=task.name(),
+            eid=eid,
+            diff=diff,
+            identifiers=self.identifiers(task.guard().on_variables())
+        )
+
+    def lease_candidates(self, task, condition):
+        """Return an SQL query selecting the ids of the experiment instances whose readiness to
+        execute the specified task satisfies a condition, locking their readiness with SKIP LOCKED.
+
+        task -- [wedmakefile_parser.Task] Task to lease.
+        condition -- [str] SQL condition on the columns of table task_readiness (aliased r) and
+                     table experiment_instance (aliased i).
+        """
+        return """
+                            SELECT r._eid FROM task_readiness r
+                                JOIN experiment_instance i ON i._id = r._eid
+                                WHERE {condition}
+                                FOR UPDATE OF r SKIP LOCKED
+        """.format(condition=condition)
+
+    def lease_state(self, task, eid, into):
+        """Return an SQL statement assigning a JSON array of dictionaries with the identifiers,
+        values, and permissions of the dependent variables of a task to a local variable.
+
+        task -- [wedmakefile_parser.Task] Leased task.
+        eid -- [str] SQL expression of the experiment instance id.
+        into -- [str] Name of the local variable, of type json.
+        """
+        return """
+                                SELECT json_agg(json_build_object(
+                                    'identifier', _variable,
+                                    'value', _value,
+                                    'perm', _perm::text
+                                ) ORDER BY _variable) INTO {into}
+                                    FROM experiment_instance_variable
+                                    WHERE _eid = {eid} AND _variable = ANY({identifiers});
+        """.format(
+            into=into,
+            eid=eid,
+            identifiers=self.identifiers(task.guard().on_variables())
+        )
+
+
+class MetabaseConnectionPool:
+    """A thread-safe pool of connections to the Metabase server.
+
+    Getting a connection blocks while all of them are in use. Connections idle for longer than the
+    health check interval are tested before being handed out and replaced if broken. Server-side
+    prepared statements are tracked per connection and deallocated after the schema changes.
+    """
+
+    def __init__(self, dsn, min_connections, max_connections, health_check_interval,
+            connection_factory=None):
+        """Open the minimum number of connections to the Metabase server.
+
+        dsn -- [str] Metabase server connection string.
+        min_connections -- [int] Number of connections kept open.
+        max_connections -- [int] Maximum number of connections open at the same time.
+        health_check_interval -- [float] Seconds a connection may stay idle before it is tested.
+        connection_factory -- [type/None] Subclass of psycopg2.extensions.connection to open the
+                              connections with (see function psycopg2.connect).
+        """
+        self._pool = psycopg2.pool.ThreadedConnectionPool(
+            min_connections, max_connections, dsn, connection_factory=connection_factory
+        )
+        self._semaphore = threading.BoundedSemaphore(max_connections)
+        self._health_check_interval = health_check_interval
+        self._lock = threading.Lock()
+        self._last_used_at = weakref.WeakKeyDictionary()
+        self._prepared = weakref.WeakKeyDictionary()
+        self._schema_version = 0
+
+    def getconn(self):
+        """Return a healthy connection, blocking while all connections are in use."""
+        self._semaphore.acquire()
+        try:
+            while True:
+                conn = self._pool.getconn()
+                if conn.closed:
+                    self.discard(conn)
+                    continue
+                if time.time() - self._last_used_at.get(conn, 0) > \
+                        self._health_check_interval:
+                    try:
+                        cur = conn.cursor()
+                        cur.execute("SELECT 1")
+                        cur.fetchone()
+                        conn.rollback()
+                    except (psycopg2.OperationalError, psycopg2.InterfaceError):
+                        self.discard(conn)
+                        continue
+                return conn
+        except Exception:
+            self._semaphore.release()
+            raise
+
+    def discard(self, conn):
+        """Close a connection and remove it from the pool.
+
+        conn -- [psycopg2.extensions.connection] Connection to discard.
+        """
+        with self._lock:
+            self._last_used_at.pop(conn, None)
+            self._prepared.pop(conn, None)
+        self._pool.putconn(conn, close=True)
+
+    def putconn(self, conn):
+        """Return a connection to the pool.
+
+        conn -- [psycopg2.extensions.connection] Connection to return.
+        """
+        try:
+            if conn.closed:
+                self.discard(conn)
+                return
+            if conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                conn.rollback()
+            self._last_used_at[conn] = time.time()
+            self._pool.putconn(conn)
+        finally:
+            self._semaphore.release()
+
+    @contextlib.contextmanager
+    def connection(self):
+        """Return a context manager that lends a connection from the pool."""
+        conn = self.getconn()
+        try:
+            yield conn
+        finally:
+            self.putconn(conn)
+
+    def invalidate_prepared_statements(self):
+        """Deallocate the prepared statements of every connection before they are used again."""
+        with self._lock:
+            self._schema_version += 1
+
+    def execute_prepared(self, cur, name, statement, args):
+        """Execute a server-side prepared statement, preparing it first on the cursor's connection
+        if needed.
+
+        cur -- [psycopg2.extensions.cursor] Cursor to execute the prepared statement.
+        name -- [str] Name of the prepared statement.
+        statement -- [str] PREPARE body, e.g., '(integer) AS SELECT f($1)'.
+        args -- [tuple] Arguments to the prepared statement.
+        """
+        with self._lock:
+            schema_version, prepared = self._prepared.get(cur.connection, (None, set()))
+            if schema_version != self._schema_version:
+                if schema_version is not None:
+                    cur.execute("DEALLOCATE ALL")
+                schema_version, prepared = self._schema_version, set()
+                self._prepared[cur.connection] = (schema_version, prepared)
+        if name not in prepared:
+            cur.execute("PREPARE \"{name}\"{statement}".format(name=name, statement=statement))
+            prepared.add(name)
+        cur.execute("EXECUTE \"{name}\"{placeholders}".format(
+            name=name,
+            placeholders="({})".format(", ".join(["%s"] * len(args))) if len(args) > 0 else ""
+        ), args)
+
+    def closeall(self):
+        """Close every connection."""
+        self._pool.closeall()
+
+
 class MetabaseInterface:
     """An interface to manage experiments in the Metabase runtime."""
 
-    def __init__(self, host, user, password):
-        """Set the Metabase server connection parameters.
+    # Number of bytes of the standard output or standard error of a task's Bash script compressed
+    # and stored per row of table task_execution_output.
+    OUTPUT_CHUNK_SIZE = 1 << 20
+
+    # Layouts of experiment instance states, by name.
+    LAYOUTS = {
+        MetabaseWideLayout.name(): MetabaseWideLayout,
+        MetabaseNarrowLayout.name(): MetabaseNarrowLayout
+    }
+
+    def __init__(self, host, user, password, dbname="wedmake", port=5432, min_connections=1,
+            max_connections=16, health_check_interval=30.0, connection_factory=None):
+        """Set the Metabase server connection parameters and open a pool of connections shared by
+        all methods and threads.
 
         host -- [str] Metabase server hostname.
         user -- [str] Metabase server username.
         password -- [str] Metabase server password.
+        dbname -- [str] Metabase database name.
+        port -- [int] Metabase server port.
+        min_connections -- [int] Number of connections kept open.
+        max_connections -- [int] Maximum number of connections open at the same time.
+        health_check_interval -- [float] Seconds a pooled connection may stay idle before it is
+                                 tested.
+        connection_factory -- [type/None] Subclass of psycopg2.extensions.connection to open the
+                              pooled connections with, e.g., to instrument them.
         """
-        self._host = host
-        self._user = user
-        self._password = password
+        self._pool = MetabaseConnectionPool(
+            psycopg2.extensions.make_dsn(
+                host=host,
+                port=port,
+                dbname=dbname,
+                user=user,
+                password=password
+            ),
+            min_connections,
+            max_connections,
+            health_check_interval,
+            connection_factory
+        )
+
+    def close(self):
+        """Close every connection to the Metabase server."""
+        self._pool.closeall()
 
-    def push(self, wedmakefile, message):
-        """Initialize or update the experiment specification.
+    def push(self, wedmakefile, message, layout=None):
+        """Initialize or update the experiment specification and return the names of the schema
+        objects created, replaced, or dropped.
+
+        Each table, column, trigger, and function is generated separately and its hash is stored in
+        table schema_object, so only the objects that changed since the last push are sent to the
+        Metabase server. Guards of tasks that changed since the latest experiment version (see
+        column task._hash) are re-evaluated for existing experiment instances. The layout of
+        experiment instance states cannot change once the experiment is instantiated.
 
         wedmakefile -- [wedmakefile_parser.WEDMakefile] Parsed WED-Makefile containing the
                        experiment specification.
         message -- [str] A message describing the experiment or its updates.
+        layout -- [str/None] Layout of experiment instance states: 'wide' (see class
+                  MetabaseWideLayout), 'narrow' (see class MetabaseNarrowLayout), or None to keep
+                  the layout of the latest experiment version ('wide' for a new experiment).
         """
-        sql = []
-        sql.append("""
+        if layout is None:
+            layout = self.latest_layout() or MetabaseWideLayout.name()
+        layout = self.LAYOUTS[layout](wedmakefile)
+        schema = []
+        schema.append(("TABLE guard", """
             -- Store guard.
             CREATE TABLE IF NOT EXISTS guard(
                 _id SERIAL NOT NULL,
                 PRIMARY KEY(_id)
             );
-        """)
-        sql.append("""
+        """))
+        schema.append(("TABLE guard_dependency", """
             -- Store guard logical predicate.
             CREATE TABLE IF NOT EXISTS guard_dependency(
                 _id SERIAL NOT NULL,
@@ -106,8 +825,8 @@ class MetabaseInterface:
                 _gid INTEGER REFERENCES guard(_id),
                 PRIMARY KEY(_id)
             );
-        """)
-        sql.append("""
+        """))
+        schema.append(("TABLE experiment_version", """
             -- Store experiment version.
             CREATE TABLE IF NOT EXISTS experiment_version(
                 _no SERIAL NOT NULL,
@@ -117,8 +836,10 @@ class MetabaseInterface:
                 _final_gid INTEGER REFERENCES guard(_id),
                 PRIMARY KEY(_no)
             );
-        """)
-        sql.append("""
+            ALTER TABLE experiment_version
+                ADD COLUMN IF NOT EXISTS _layout TEXT NOT NULL DEFAULT 'wide';
+        """))
+        schema.append(("TABLE task", """
             -- Store task.
             CREATE TABLE IF NOT EXISTS task(
                 _id SERIAL NOT NULL,
@@ -129,58 +850,9 @@ class MetabaseInterface:
                 _eno INTEGER REFERENCES experiment_version(_no),
                 PRIMARY KEY(_id)
             );
-        """)
-        sql.append("""
-            -- Execute an anonymous code block to initialize or update the experiment.
-            DO $$
-            DECLARE
-                initial_gid integer;
-                final_gid integer;
-                task_gid integer;
-                eno integer;
-            BEGIN
-                INSERT INTO guard DEFAULT VALUES RETURNING _id INTO initial_gid;
-                {initial_guard_dependencies_insertion}
-                INSERT INTO guard DEFAULT VALUES RETURNING _id INTO final_gid;
-                {final_guard_dependencies_insertion}
-                INSERT INTO experiment_version(_message, _initial_gid, _final_gid)
-                    VALUES ('{message}', initial_gid, final_gid) RETURNING _no INTO eno;
-                {tasks_insertion}
-            END$$;
-        """.format(
-            initial_guard_dependencies_insertion="\n                ".join([
-                "INSERT INTO guard_dependency(_clause, _gid) VALUES ('{clause}', initial_gid);".format(
-                    clause=dependency.clause().replace("'", "''")
-                )
-                for dependency in wedmakefile.initial_guard().dependencies()
-            ]),
-            final_guard_dependencies_insertion="\n                ".join([
-                "INSERT INTO guard_dependency(_clause, _gid) VALUES ('{clause}', final_gid);".format(
-                    clause=dependency.clause().replace("'", "''")
-                )
-                for dependency in wedmakefile.final_guard().dependencies()
-            ]),
-            message=message.replace("'", "''"),
-            tasks_insertion="\n                ".join([
-                """INSERT INTO guard DEFAULT VALUES RETURNING _id INTO task_gid;
-                {task_guard_dependencies_insertion}
-                """.format(
-                    task_guard_dependencies_insertion="\n                ".join([
-                        "INSERT INTO guard_dependency(_clause, _gid) VALUES ('{clause}', task_gid);".format(
-                            clause=dependency.clause().replace("'", "''")
-                        )
-                        for dependency in task.guard().dependencies()
-                    ])
-                ) +
-                """INSERT INTO task(_name, _language, _body, _gid, _eno)
-                    VALUES ('{name}', 'bash', '{body}', task_gid, eno);""".format(
-                    name=task.name(),
-                    body=task.bash_script()
-                )
-                for task in wedmakefile.tasks()
-            ])
-        ))
-        sql.append("""
+            ALTER TABLE task ADD COLUMN IF NOT EXISTS _hash TEXT;
+        """))
+        schema.append(("TABLE experiment_instance", """
             -- Store experiment instance metadata.
             CREATE TABLE IF NOT EXISTS experiment_instance(
                 _id SERIAL NOT NULL,
@@ -188,25 +860,109 @@ class MetabaseInterface:
                 _created_at TIMESTAMP DEFAULT NOW(),
                 PRIMARY KEY(_id)
             );
-        """)
-        sql.append("".join(["""
-            -- Store experiment instance state (namespace: {namespace}).
-            CREATE TABLE IF NOT EXISTS "experiment_instance_state_{namespace}"(
+            ALTER TABLE experiment_instance
+                ADD COLUMN IF NOT EXISTS _status TEXT NOT NULL DEFAULT 'running';
+            ALTER TABLE experiment_instance
+                ADD COLUMN IF NOT EXISTS _n_executed INTEGER NOT NULL DEFAULT 0;
+            ALTER TABLE experiment_instance ADD COLUMN IF NOT EXISTS _message TEXT;
+            CREATE INDEX IF NOT EXISTS experiment_instance_running ON experiment_instance(_id)
+                WHERE _status = 'running';
+        """))
+        schema.append(("FUNCTION _notify_state_change()", """
+            -- Notify the runners of an experiment instance, listening on channel
+            --     experiment_instance_<id>, and the workers, listening on channel
+            --     experiment_instance, that its state changed.
+            CREATE OR REPLACE FUNCTION _notify_state_change() RETURNS trigger AS $$
+            BEGIN
+                PERFORM pg_notify('experiment_instance_' || NEW._eid, TG_TABLE_NAME);
+                PERFORM pg_notify('experiment_instance', NEW._eid::text);
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql;
+        """))
+        schema.append(("TABLE task_readiness", """
+            -- Store whether the guard of each task is satisfied by the state of each experiment
+            --     instance (maintained by triggers on the experiment instance state tables).
+            CREATE TABLE IF NOT EXISTS task_readiness(
                 _eid INTEGER REFERENCES experiment_instance(_id),
-                PRIMARY KEY(_eid)
+                _task TEXT NOT NULL,
+                _ready BOOLEAN NOT NULL,
+                PRIMARY KEY(_eid, _task)
             );
-        """.format(namespace=namespace) for namespace in wedmakefile.variables_namespaces()]))
-        sql.append("".join(["""
-            -- Add columns to store the values and permissions of variable {variable}.
-            ALTER TABLE "experiment_instance_state_{namespace}"
-                ADD COLUMN IF NOT EXISTS "value_{variable}" TEXT;
-            ALTER TABLE "experiment_instance_state_{namespace}"
-                ADD COLUMN IF NOT EXISTS "perm_{variable}" CHAR(2);
-        """.format(
-            variable=variable.identifier(),
-            namespace=variable.namespace()
-        ) for variable in wedmakefile.variables()]))
-        sql.append("""
+            CREATE INDEX IF NOT EXISTS task_readiness_ready ON task_readiness(_eid) WHERE _ready;
+        """))
+        schema.append(("TABLE task_lease", """
+            -- Store the tasks leased to workers, which execute their Bash scripts outside of the
+            --     Metabase server, and the namespaces of their dependent variables.
+            CREATE TABLE IF NOT EXISTS task_lease(
+                _id SERIAL NOT NULL,
+                _eid INTEGER REFERENCES experiment_instance(_id),
+                _task TEXT NOT NULL,
+                _namespaces TEXT[] NOT NULL,
+                _worker TEXT NOT NULL,
+                _expires_at TIMESTAMP WITH TIME ZONE NOT NULL,
+                PRIMARY KEY(_id)
+            );
+            CREATE INDEX IF NOT EXISTS task_lease_eid ON task_lease(_eid);
+        """))
+        schema.append(("TABLE task_execution", """
+            -- Store the history of executions of tasks' Bash scripts, including the ones that
+            --     failed or whose lease expired before their updates were committed.
+            CREATE TABLE IF NOT EXISTS task_execution(
+                _id SERIAL NOT NULL,
+                _eid INTEGER REFERENCES experiment_instance(_id),
+                _task TEXT NOT NULL,
+                _hash TEXT NOT NULL,
+                _worker TEXT NOT NULL,
+                _started_at TIMESTAMP WITH TIME ZONE NOT NULL,
+                _finished_at TIMESTAMP WITH TIME ZONE NOT NULL,
+                _duration DOUBLE PRECISION NOT NULL,
+                _exit_status INTEGER,
+                _error TEXT,
+                _committed BOOLEAN NOT NULL DEFAULT FALSE,
+                _user_time DOUBLE PRECISION,
+                _system_time DOUBLE PRECISION,
+                _max_rss BIGINT,
+                _rusage JSONB,
+                PRIMARY KEY(_id)
+            );
+            CREATE INDEX IF NOT EXISTS task_execution_eid ON task_execution(_eid);
+            CREATE INDEX IF NOT EXISTS task_execution_duration
+                ON task_execution(_task, _hash, _duration)
+                WHERE _committed AND _error IS NULL;
+        """))
+        schema.append(("TABLE task_execution_output", """
+            -- Store the standard output and standard error of tasks' Bash scripts as sequences of
+            --     independently zlib-compressed chunks.
+            CREATE TABLE IF NOT EXISTS task_execution_output(
+                _xid INTEGER REFERENCES task_execution(_id) ON DELETE CASCADE,
+                _stream TEXT NOT NULL CHECK (_stream IN ('stdout', 'stderr')),
+                _chunk INTEGER NOT NULL,
+                _size INTEGER NOT NULL,
+                _data BYTEA NOT NULL,
+                PRIMARY KEY(_xid, _stream, _chunk)
+            );
+        """))
+        schema.append(("VIEW task_duration", """
+            -- Summarize the durations of the successful executions of the tasks of the latest
+            --     experiment version across experiment instances (served by index
+            --     task_execution_duration).
+            CREATE OR REPLACE VIEW task_duration AS
+                SELECT t._name AS _task,
+                       count(x._duration) AS _n,
+                       avg(x._duration) AS _mean,
+                       percentile_cont(0.5) WITHIN GROUP (ORDER BY x._duration) AS _p50,
+                       percentile_cont(0.9) WITHIN GROUP (ORDER BY x._duration) AS _p90,
+                       percentile_cont(0.99) WITHIN GROUP (ORDER BY x._duration) AS _p99,
+                       max(x._duration) AS _max
+                    FROM task t
+                    LEFT JOIN task_execution x ON x._task = t._name AND x._hash = t._hash
+                        AND x._committed AND x._error IS NULL
+                    WHERE t._eno = (SELECT max(_no) FROM experiment_version)
+                    GROUP BY t._name;
+        """))
+        schema.extend(layout.schema())
+        schema.append(("FUNCTION _instantiate(json)", """
             -- Instantiate the experiment and return the newly created experiment instance id.
             -- Args:
                 -- $1 is a JSON array of dictionaries with variable identifiers, values, and
@@ -256,39 +1012,34 @@ class MetabaseInterface:
                 MetabaseDependency(dependency).to_sql()
                 for dependency in wedmakefile.initial_guard().dependencies()
             ]),
-            variables_persistence='\n'.join(["""
-                    INSERT INTO "experiment_instance_state_{namespace}"(_eid, {columns})
-                        VALUES (_eid, {variables});
-            """.format(
-                namespace=namespace,
-                columns=", ".join([
-                    "\"value_{variable}\", \"perm_{variable}\"".format(
-                        variable=variable.identifier()
-                    )
-                    for variable in wedmakefile.variables(namespace=namespace)
-                ]),
-                variables=", ".join([
-                    "\"_value_{variable}\", \"_perm_{variable}\"".format(
-                        variable=variable.identifier()
-                    )
-                    for variable in wedmakefile.variables(namespace=namespace)
-                ])
-            ) for namespace in wedmakefile.variables_namespaces()])
-        ))
-        sql.append("""
+            variables_persistence=layout.insert("_eid")
+        )))
+        schema.append(("FUNCTION _instantiate_many(json)", """
+            -- Instantiate the experiment once per initial state and return the newly created
+            --     experiment instance ids, in the same order.
+            -- Args:
+                -- $1 is a JSON array of initial states as accepted by function _instantiate.
+            CREATE OR REPLACE FUNCTION _instantiate_many(json) RETURNS integer[] AS $$
+                SELECT array_agg(_instantiate(_state) ORDER BY _it)
+                    FROM json_array_elements($1) WITH ORDINALITY AS _states(_state, _it);
+            $$ LANGUAGE sql;
+        """))
+        schema.append(("FUNCTION _is_in_final_state(integer)", """
             -- Check whether the specified experiment instance reached a final state.
             -- Args:
                 -- $1 is the experiment instance id.
             -- Implementation:
                 -- A per-instance advisory lock is held through the entire transaction to guarantee
-                --     that no other transaction grabs locks concurrently.
-                -- All variables are initialized (not only the ones the final guard depends on) to
-                --     guarantee that no task is being executed.
+                --     that no task is leased concurrently.
+                -- An experiment instance with a task leased is not in a final or inconsistent state.
             CREATE OR REPLACE FUNCTION _is_in_final_state(integer) RETURNS boolean AS $$
             DECLARE
                 {variables_declaration}
             BEGIN
                 PERFORM pg_advisory_xact_lock($1);
+                IF EXISTS (SELECT 1 FROM task_lease WHERE _eid = $1 AND _expires_at > now()) THEN
+                    RETURN FALSE;
+                END IF;
                 {variables_initialization}
                 IF {final_guard} THEN
                     RETURN TRUE;
@@ -299,92 +1050,54 @@ class MetabaseInterface:
         """.format(
             variables_declaration="\n                ".join([
                 "\"_value_{variable}\" text;".format(variable=variable.identifier())
-                for variable in wedmakefile.variables()
+                for variable in wedmakefile.final_guard().on_variables()
             ]),
-            variables_initialization='\n'.join(["""
-                BEGIN
-                    EXECUTE 'SELECT {columns} FROM "experiment_instance_state_{namespace}" '
-                            'WHERE _eid = ' || $1 || ' FOR UPDATE NOWAIT' INTO {variables};
-                EXCEPTION WHEN lock_not_available THEN
-                    RETURN FALSE;
-                END;
-            """.format(
-                columns=", ".join([
-                    "\"value_%s\"" % variable.identifier()
-                    for variable in wedmakefile.variables(namespace=namespace)
-                ]),
-                namespace=namespace,
-                variables=", ".join([
-                    "\"_value_%s\"" % variable.identifier()
-                    for variable in wedmakefile.variables(namespace=namespace)
-                ])
-            ) for namespace in wedmakefile.variables_namespaces()]),
+            variables_initialization=layout.load(wedmakefile.final_guard().on_variables(), "$1"),
             final_guard=" AND ".join([
                 MetabaseDependency(dependency).to_sql()
                 for dependency in wedmakefile.final_guard().dependencies()
             ])
-        ))
-        sql.append("""
+        )))
+        schema.append(("FUNCTION _is_in_inconsistent_state(integer)", """
             -- Check whether the specified experiment instance reached an inconsistent state.
             -- Args:
                 -- $1 is the experiment instance id.
             -- Implementation:
                 -- A per-instance advisory lock is held through the entire transaction to guarantee
-                --     that no other transaction grabs locks concurrently.
-                -- All variables are initialized (not only the ones the final guard depends on) to
-                --     guarantee that no task is being executed.
+                --     that no task is leased concurrently.
+                -- An experiment instance with a task leased is not in a final or inconsistent state.
             CREATE OR REPLACE FUNCTION _is_in_inconsistent_state(integer) RETURNS boolean AS $$
             DECLARE
                 {variables_declaration}
             BEGIN
                 PERFORM pg_advisory_xact_lock($1);
+                IF EXISTS (SELECT 1 FROM task_lease WHERE _eid = $1 AND _expires_at > now()) THEN
+                    RETURN FALSE;
+                END IF;
                 {variables_initialization}
                 IF {final_guard} THEN
                     RETURN FALSE;
                 END IF;
-                {evaluate_tasks_guards}
+                IF EXISTS (SELECT 1 FROM task_readiness WHERE _eid = $1 AND _ready) THEN
+                    RETURN FALSE;
+                END IF;
                 RETURN TRUE;
             END;
             $$ LANGUAGE plpgsql;
         """.format(
             variables_declaration="\n                ".join([
                 "\"_value_{variable}\" text;".format(variable=variable.identifier())
-                for variable in wedmakefile.variables()
+                for variable in wedmakefile.final_guard().on_variables()
             ]),
-            variables_initialization='\n'.join(["""
-                BEGIN
-                    EXECUTE 'SELECT {columns} FROM "experiment_instance_state_{namespace}" '
-                            'WHERE _eid = ' || $1 || ' FOR UPDATE NOWAIT' INTO {variables};
-                EXCEPTION WHEN lock_not_available THEN
-                    RETURN FALSE;
-                END;
-            """.format(
-                columns=", ".join([
-                    "\"value_%s\"" % variable.identifier()
-                    for variable in wedmakefile.variables(namespace=namespace)
-                ]),
-                namespace=namespace,
-                variables=", ".join([
-                    "\"_value_%s\"" % variable.identifier()
-                    for variable in wedmakefile.variables(namespace=namespace)
-                ])
-            ) for namespace in wedmakefile.variables_namespaces()]),
+            variables_initialization=layout.load(wedmakefile.final_guard().on_variables(), "$1"),
             final_guard=" AND ".join([
                 MetabaseDependency(dependency).to_sql()
                 for dependency in wedmakefile.final_guard().dependencies()
-            ]),
-            evaluate_tasks_guards='\n'.join(["""
-                IF {task_guard} THEN
-                    RETURN FALSE;
-                END IF;
-            """.format(
-                task_guard=" AND ".join([
-                    MetabaseDependency(dependency).to_sql()
-                    for dependency in task.guard().dependencies()
-                ])
-            ) for task in wedmakefile.tasks()])
-        ))
-        sql.append("".join(["""
+            ])
+        )))
+        schema.extend([('FUNCTION "_is_{task}_ready_to_execute"(integer)'.format(
+            task=task.name()
+        ), """
             -- Check whether task {task} is ready to be executed for the specified experiment
             --     instance.
             -- Args:
@@ -410,126 +1123,37 @@ class MetabaseInterface:
                 "\"_value_{variable}\" text;".format(variable=variable.identifier())
                 for variable in task.guard().on_variables()
             ]),
-            variables_initialization='\n'.join(["""
-                BEGIN
-                    EXECUTE 'SELECT {columns} FROM "experiment_instance_state_{namespace}" '
-                            'WHERE _eid = ' || $1 || ' FOR UPDATE NOWAIT' INTO {variables};
-                EXCEPTION WHEN lock_not_available THEN
-                    RETURN FALSE;
-                END;
-            """.format(
-                columns=", ".join([
-                    "\"value_%s\"" % variable.identifier()
-                    for variable in task.guard().on_variables(namespace=namespace)
-                ]),
-                namespace=namespace,
-                variables=", ".join([
-                    "\"_value_%s\"" % variable.identifier()
-                    for variable in task.guard().on_variables(namespace=namespace)
-                ])
-            ) for namespace in task.guard().on_variables_namespaces()]),
+            variables_initialization=layout.load(task.guard().on_variables(), "$1", nowait=True),
             task_guard=" AND ".join([
                 MetabaseDependency(dependency).to_sql()
                 for dependency in task.guard().dependencies()
             ])
-        ) for task in wedmakefile.tasks()]))
-        sql.append("""
-            -- Return a JSON list with the names of the tasks ready to be executed for the specified
-            --     experiment instance.
+        )) for task in wedmakefile.tasks()])
+        schema.append(("FUNCTION _ready_to_execute(integer)", """
+            -- Return a JSON list with the names of the tasks whose guards are satisfied by the
+            --     specified experiment instance, in declaration order.
             -- Args:
                 -- $1 is the experiment instance id.
-            -- Implementation:
-                -- A per-instance advisory lock is held through the entire transaction to guarantee
-                --     that no other transaction grabs locks concurrently.
             CREATE OR REPLACE FUNCTION _ready_to_execute(integer) RETURNS json AS $$
-            DECLARE
-                _res text[];
-            BEGIN
-                PERFORM pg_advisory_xact_lock($1);
-                {tasks_evaluation}
-                RETURN array_to_json(_res);
-            END;
-            $$ LANGUAGE plpgsql;
-        """.format(
-            tasks_evaluation='\n'.join(["""
-                IF "_is_{task}_ready_to_execute"($1) THEN
-                    _res = array_append(_res, '{task}');
-                END IF;
-            """.format(task=task.name()) for task in wedmakefile.tasks()])
-        ))
-        sql.append("".join(["""
-            -- Return the values and permissions of variables updated by task {task}'s Bash script.
-            CREATE OR REPLACE FUNCTION "_bash_{task}"(text) RETURNS text AS $$\n{bash_script}
-            $$ LANGUAGE plsh;
+                SELECT array_to_json(array_agg(_task ORDER BY array_position({tasks}, _task)))
+                    FROM task_readiness WHERE _eid = $1 AND _ready;
+            $$ LANGUAGE sql STABLE;
         """.format(
-            task=task.name(),
-            bash_script=py_runtime.PyExperimentInstanceState.render_capture_bash_script(
-                setup="function main {{\n{variables}\n{body}\n}}".format(
-                    variables="""
-                        local _IFS_BACKUP=\$IFS
-                        IFS=,
-                        local _params
-                        read -a _params <<< "$1"
-                        local _it=0
-                        while [ \$_it -lt \${#_params[@]} ]; do
-                            if [ \${_params[\$_it+2]} = "ro" ]; then
-                                readonly \${_params[\$_it]}="\${_params[\$_it+1]}"
-                            else
-                                eval "\${_params[\$_it]}=\\\"\${_params[\$_it+1]}\\\""
-                            fi
-                            let _it=_it+3
-                        done
-                        IFS=\$_IFS_BACKUP
-                        unset _IFS_BACKUP
-                        unset _params
-                        unset _it
-                    """,
-                    body=task.bash_script().replace(r'\$', r'\\$').replace(r'$', r'\$')
-                ),
-                main="main 1> /dev/null 2> /dev/null"
-            )
-        ) for task in wedmakefile.tasks()]))
-        sql.append("".join(["""
-            -- Return true if task {task} is successfully and promptly executed for the specified
-            --     experiment instance. Return false, otherwise.
+            tasks="ARRAY[{tasks}]::text[]".format(tasks=", ".join([
+                "'{task}'".format(task=task.name()) for task in wedmakefile.tasks()
+            ]))
+        )))
+        schema.extend([('FUNCTION "_is_{task}_ready"(integer)'.format(task=task.name()), """
+            -- Check whether the guard of task {task} is satisfied by the specified experiment
+            --     instance, without locking its state.
             -- Args:
                 -- $1 is the experiment instance id.
-            -- Implementation:
-                -- A per-instance advisory lock is held while variables are being initialized to
-                --     guarantee that no other transaction grabs locks concurrently.
-            CREATE OR REPLACE FUNCTION "_execute_{task}"(integer) RETURNS boolean AS $$
+            CREATE OR REPLACE FUNCTION "_is_{task}_ready"(integer) RETURNS boolean AS $$
             DECLARE
                 {variables_declaration}
-                _it integer;
-                _counter integer;
-                _res text[];
-                _params text[8];
             BEGIN
-                PERFORM pg_advisory_lock($1);
                 {variables_initialization}
-                PERFORM pg_advisory_unlock($1);
                 IF {task_guard} THEN
-                    _params[1] := concat_ws(',', {params1});
-                    _params[2] := concat_ws(',', {params2});
-                    _params[3] := concat_ws(',', {params3});
-                    _params[4] := concat_ws(',', {params4});
-                    _params[5] := concat_ws(',', {params5});
-                    _params[6] := concat_ws(',', {params6});
-                    _params[7] := concat_ws(',', {params7});
-                    _params[8] := concat_ws(',', {params8});
-                    _counter := 2;
-                    WHILE length(_params[_counter]) > 0 AND _counter <= 8 LOOP
-                        _params[1] := concat_ws(',', _params[1], _params[_counter]);
-                        _counter := _counter + 1;
-                    END LOOP;
-                    _res := string_to_array("_bash_{task}"(_params[1]), E'\\n');
-                    _it := 1;
-                    WHILE _it <= array_length(_res, 1) LOOP
-                        {variables_update}
-                        RAISE EXCEPTION 'Variable % must be declared as a dependency of task '
-                                        '{task}.', _res[_it];
-                    END LOOP;
-                    {variables_persistence}
                     RETURN TRUE;
                 END IF;
                 RETURN FALSE;
@@ -538,112 +1162,431 @@ class MetabaseInterface:
         """.format(
             task=task.name(),
             variables_declaration="\n                ".join([
-                "\"_value_{variable}\" text; \"_perm_{variable}\" text;".format(
-                    variable=variable.identifier()
-                )
+                "\"_value_{variable}\" text;".format(variable=variable.identifier())
                 for variable in task.guard().on_variables()
             ]),
-            variables_initialization='\n'.join(["""
-                BEGIN
-                    EXECUTE 'SELECT {columns} FROM "experiment_instance_state_{namespace}" '
-                            'WHERE _eid = ' || $1 || ' FOR UPDATE NOWAIT' INTO {variables};
-                EXCEPTION WHEN lock_not_available THEN
-                    PERFORM pg_advisory_unlock($1);
-                    RETURN FALSE;
-                END;
-            """.format(
-                columns=", ".join([
-                    "\"value_{variable}\", \"perm_{variable}\"".format(
-                        variable=variable.identifier()
-                    )
-                    for variable in task.guard().on_variables(namespace=namespace)
-                ]),
-                namespace=namespace,
-                variables=", ".join([
-                    "\"_value_{variable}\", \"_perm_{variable}\"".format(
-                        variable=variable.identifier()
-                    )
-                    for variable in task.guard().on_variables(namespace=namespace)
-                ])
-            ) for namespace in task.guard().on_variables_namespaces()]),
+            variables_initialization=layout.load(task.guard().on_variables(), "$1"),
             task_guard=" AND ".join([
                 MetabaseDependency(dependency).to_sql()
                 for dependency in task.guard().dependencies()
-            ]),
-            params1=", ".join([
-                "'{variable}', replace(\"_value_{variable}\", ',', E'\\\,'), \"_perm_{variable}\"".\
-                        format(variable=variable.identifier())
-                for variable in task.guard().on_variables()[0:32]
-            ]) if len(task.guard().on_variables()) > 0 else "''",
-            params2=", ".join([
-                "'{variable}', replace(\"_value_{variable}\", ',', E'\\\,'), \"_perm_{variable}\"".\
-                        format(variable=variable.identifier())
-                for variable in task.guard().on_variables()[32:64]
-            ]) if len(task.guard().on_variables()) > 32 else "''",
-            params3=", ".join([
-                "'{variable}', replace(\"_value_{variable}\", ',', E'\\\,'), \"_perm_{variable}\"".\
-                        format(variable=variable.identifier())
-                for variable in task.guard().on_variables()[64:96]
-            ]) if len(task.guard().on_variables()) > 64 else "''",
-            params4=", ".join([
-                "'{variable}', replace(\"_value_{variable}\", ',', E'\\\,'), \"_perm_{variable}\"".\
-                        format(variable=variable.identifier())
-                for variable in task.guard().on_variables()[96:128]
-            ]) if len(task.guard().on_variables()) > 96 else "''",
-            params5=", ".join([
-                "'{variable}', replace(\"_value_{variable}\", ',', E'\\\,'), \"_perm_{variable}\"".\
-                        format(variable=variable.identifier())
-                for variable in task.guard().on_variables()[128:160]
-            ]) if len(task.guard().on_variables()) > 128 else "''",
-            params6=", ".join([
-                "'{variable}', replace(\"_value_{variable}\", ',', E'\\\,'), \"_perm_{variable}\"".\
-                        format(variable=variable.identifier())
-                for variable in task.guard().on_variables()[160:192]
-            ]) if len(task.guard().on_variables()) > 160 else "''",
-            params7=", ".join([
-                "'{variable}', replace(\"_value_{variable}\", ',', E'\\\,'), \"_perm_{variable}\"".\
-                        format(variable=variable.identifier())
-                for variable in task.guard().on_variables()[192:224]
-            ]) if len(task.guard().on_variables()) > 192 else "''",
-            params8=", ".join([
-                "'{variable}', replace(\"_value_{variable}\", ',', E'\\\,'), \"_perm_{variable}\"".\
-                        format(variable=variable.identifier())
-                for variable in task.guard().on_variables()[224:256]
-            ]) if len(task.guard().on_variables()) > 224 else "''",
-            variables_update='\n'.join(["""
-                        IF _res[_it] = '{variable}' THEN
-                            "_value_{variable}" := _res[_it + 1];
-                            "_perm_{variable}" := _res[_it + 2];
-                            _it := _it + 3;
-                            CONTINUE;
-                        END IF;
-            """.format(variable=variable.identifier()) for variable in task.guard().on_variables()]),
-            variables_persistence='\n'.join(["""
-                    UPDATE "experiment_instance_state_{namespace}" SET {assignments} WHERE _eid = $1;
+            ])
+        )) for task in wedmakefile.tasks()])
+        schema.append(("FUNCTION _refresh_status(integer)", """
+            -- Record whether the specified experiment instance reached a final or an inconsistent
+            --     state and return its status: 'running', 'final', or 'inconsistent'.
+            -- Args:
+                -- $1 is the experiment instance id.
+            CREATE OR REPLACE FUNCTION _refresh_status(integer) RETURNS text AS $$
+            BEGIN
+                IF _is_in_final_state($1) THEN
+                    UPDATE experiment_instance SET _status = 'final'
+                        WHERE _id = $1 AND _status = 'running';
+                ELSIF _is_in_inconsistent_state($1) THEN
+                    UPDATE experiment_instance SET _status = 'inconsistent'
+                        WHERE _id = $1 AND _status = 'running';
+                END IF;
+                RETURN (SELECT _status FROM experiment_instance WHERE _id = $1);
+            END;
+            $$ LANGUAGE plpgsql;
+        """))
+        schema.extend([('FUNCTION "_commit_{task}"(integer, json)'.format(task=task.name()), """
+            -- Persist the values and permissions of variables updated by task {task}'s Bash script.
+            -- Args:
+                -- $1 is the experiment instance id.
+                -- $2 is a JSON array of dictionaries with the identifiers, values, and permissions
+                --     of the updated variables.
+            CREATE OR REPLACE FUNCTION "_commit_{task}"(integer, json) RETURNS void AS $$
+            DECLARE
+                _it integer;
+                _identifier text;
+            BEGIN
+                {variables_update}
+            END;
+            $$ LANGUAGE plpgsql;
+        """.format(
+            task=task.name(),
+            variables_update=layout.update(task, "$1", "$2")
+        )) for task in wedmakefile.tasks()])
+        schema.append(("FUNCTION _lease(integer, text, double precision)", """
+            -- Lease a task whose guard is satisfied by the state of a running experiment instance
+            --     to a worker, which executes its Bash script outside of the Metabase server.
+            -- Args:
+                -- $1 is the experiment instance id, or null to lease a task of any experiment
+                --     instance.
+                -- $2 is the worker name.
+                -- $3 is the number of seconds until the lease expires, unless renewed.
+            -- Returns:
+                -- A JSON object with the lease id ("lease"), the experiment instance id ("eid"),
+                --     the task name, guard, and Bash script ("task"), and the values and
+                --     permissions of the task's dependent variables ("state"). "lease" is null if
+                --     no task could be leased.
+            -- Implementation:
+                -- Tasks found ready in table task_readiness are tried in random order. For each
+                --     one, the rows of running experiment instances that satisfy its guard are
+                --     locked with FOR UPDATE SKIP LOCKED (see method lease_candidates of the state
+                --     layout). An experiment instance is skipped if another unexpired lease depends
+                --     on variables of the same namespaces.
+                -- A per-instance advisory lock is held through the entire transaction to guarantee
+                --     that its status is not refreshed concurrently (see function _refresh_status).
+                --     It is only tried, and the experiment instance skipped if another transaction
+                --     holds it, so that workers leasing tasks never wait for each other's locks.
+            CREATE OR REPLACE FUNCTION _lease(integer, text, double precision) RETURNS json AS $$
+            DECLARE
+                _instance integer;
+                _task text;
+                _lid integer;
+                _state json;
+            BEGIN
+                FOR _task IN
+                    SELECT _candidates._task FROM (
+                        SELECT DISTINCT r._task FROM task_readiness r
+                            JOIN experiment_instance i ON i._id = r._eid
+                            WHERE r._ready AND i._status = 'running'
+                                AND ($1 IS NULL OR r._eid = $1)
+                    ) AS _candidates ORDER BY random()
+                LOOP
+                    {tasks_lease}
+                END LOOP;
+                RETURN json_build_object('lease', NULL, 'eid', NULL, 'task', NULL, 'state', NULL);
+            END;
+            $$ LANGUAGE plpgsql;
+        """.format(
+            tasks_lease='\n'.join(["""
+                    IF _task = '{task}' THEN
+                        FOR _instance IN
+                            {candidates}
+                        LOOP
+                            IF NOT pg_try_advisory_xact_lock(_instance) THEN
+                                CONTINUE;
+                            END IF;
+                            IF NOT EXISTS (
+                                SELECT 1 FROM task_lease l
+                                    WHERE l._eid = _instance AND l._expires_at > now()
+                                        AND (l._task = '{task}' OR l._namespaces && {namespaces})
+                            ) AND "_is_{task}_ready"(_instance) AND (
+                                SELECT i._status FROM experiment_instance i WHERE i._id = _instance
+                            ) = 'running' THEN
+                                INSERT INTO task_lease(_eid, _task, _namespaces, _worker, _expires_at)
+                                    VALUES (_instance, '{task}', {namespaces}, $2,
+                                            now() + $3 * interval '1 second')
+                                    RETURNING _id INTO _lid;
+                                {state}
+                                RETURN json_build_object(
+                                    'lease', _lid,
+                                    'eid', _instance,
+                                    'task', {task_json}::json,
+                                    'state', COALESCE(_state, '[]'::json)
+                                );
+                            END IF;
+                        END LOOP;
+                    END IF;
             """.format(
-                namespace=namespace,
-                assignments=", ".join([
-                    "\"value_{variable}\" = \"_value_{variable}\", "
-                    "\"perm_{variable}\" = \"_perm_{variable}\"".format(
-                        variable=variable.identifier()
-                    ) for variable in task.guard().on_variables(namespace=namespace)
-                ])
-            ) for namespace in task.guard().on_variables_namespaces()])
-        ) for task in wedmakefile.tasks()]))
-        sql_str = '\n'.join([
-            line[12:] if line.startswith(12 * ' ') else line
-            for line in "".join(sql).split('\n')
-            if line.strip()
-        ])
-        conn = psycopg2.connect("host={host} dbname={dbname} user={user} password={password}".format(
-            host=self._host,
-            dbname="wedmake",
-            user=self._user,
-            password=self._password
+                task=task.name(),
+                candidates=layout.lease_candidates(
+                    task,
+                    "r._task = '{task}' AND r._ready AND i._status = 'running' "
+                    "AND ($1 IS NULL OR r._eid = $1)".format(task=task.name())
+                ),
+                namespaces="ARRAY[{namespaces}]::text[]".format(namespaces=", ".join([
+                    MetabaseDependency.quote_literal(namespace)
+                    for namespace in task.guard().on_variables_namespaces()
+                ])),
+                state=layout.lease_state(task, "_instance", "_state"),
+                task_json=MetabaseDependency.quote_literal(json.dumps({
+                    "name": task.name(),
+                    "guard": [dependency.clause() for dependency in task.guard().dependencies()],
+                    "bash": task.bash_script()
+                }))
+            ) for task in wedmakefile.tasks()])
+        )))
+        schema.append(("FUNCTION _renew_lease(integer, text, double precision)", """
+            -- Extend an unexpired lease and return whether it was extended.
+            -- Args:
+                -- $1 is the lease id.
+                -- $2 is the worker name.
+                -- $3 is the number of seconds until the lease expires, unless renewed again.
+            CREATE OR REPLACE FUNCTION _renew_lease(integer, text, double precision)
+                    RETURNS boolean AS $$
+                WITH _renewed AS (
+                    UPDATE task_lease SET _expires_at = now() + $3 * interval '1 second'
+                        WHERE _id = $1 AND _worker = $2 AND _expires_at > now()
+                        RETURNING _id
+                )
+                SELECT EXISTS (SELECT 1 FROM _renewed);
+            $$ LANGUAGE sql;
+        """))
+        schema.append(("FUNCTION _commit_lease(integer, text, json, text)", """
+            -- Release an unexpired lease, persisting the updates of its task's Bash script or
+            --     recording that the task failed, and report the resulting status of its
+            --     experiment instance.
+            -- Args:
+                -- $1 is the lease id.
+                -- $2 is the worker name.
+                -- $3 is a JSON array of dictionaries with the identifiers, values, and permissions
+                --     of the variables updated by the task's Bash script.
+                -- $4 is the error raised while executing the task's Bash script, or null.
+            -- Returns:
+                -- A JSON object with the experiment instance id ("eid"), whether the lease was
+                --     still valid ("committed"), and the status of the experiment instance
+                --     ("status").
+            CREATE OR REPLACE FUNCTION _commit_lease(integer, text, json, text) RETURNS json AS $$
+            DECLARE
+                _instance integer;
+                _task text;
+            BEGIN
+                DELETE FROM task_lease l
+                    WHERE l._id = $1 AND l._worker = $2 AND l._expires_at > now()
+                    RETURNING l._eid, l._task INTO _instance, _task;
+                IF _instance IS NULL THEN
+                    RETURN json_build_object('eid', NULL, 'committed', FALSE, 'status', NULL);
+                END IF;
+                IF $4 IS NOT NULL THEN
+                    UPDATE experiment_instance SET _status = 'failed', _message = $4
+                        WHERE _id = _instance AND _status = 'running';
+                ELSE
+                    {tasks_commit}
+                    UPDATE experiment_instance SET _n_executed = _n_executed + 1
+                        WHERE _id = _instance;
+                END IF;
+                RETURN json_build_object(
+                    'eid', _instance,
+                    'committed', TRUE,
+                    'status', _refresh_status(_instance)
+                );
+            END;
+            $$ LANGUAGE plpgsql;
+        """.format(
+            tasks_commit='\n'.join(["""
+                    IF _task = '{task}' THEN
+                        PERFORM "_commit_{task}"(_instance, $3);
+                    END IF;
+            """.format(task=task.name()) for task in wedmakefile.tasks()])
+        )))
+        schema.append(("FUNCTION _sweep()", """
+            -- Record the status of the running experiment instances that have no task ready to
+            --     be executed and return how many of them reached a final or an inconsistent state.
+            CREATE OR REPLACE FUNCTION _sweep() RETURNS integer AS $$
+            DECLARE
+                _eid integer;
+                _n integer := 0;
+            BEGIN
+                FOR _eid IN
+                    SELECT i._id FROM experiment_instance i
+                        WHERE i._status = 'running' AND NOT EXISTS (
+                            SELECT 1 FROM task_readiness r WHERE r._eid = i._id AND r._ready
+                        ) AND NOT EXISTS (
+                            SELECT 1 FROM task_lease l WHERE l._eid = i._id AND l._expires_at > now()
+                        )
+                        ORDER BY i._id
+                LOOP
+                    IF _refresh_status(_eid) != 'running' THEN
+                        _n := _n + 1;
+                    END IF;
+                END LOOP;
+                RETURN _n;
+            END;
+            $$ LANGUAGE plpgsql;
+        """))
+        with self._pool.connection() as conn:
+            cur = conn.cursor()
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS schema_object(
+                    _name TEXT NOT NULL,
+                    _hash TEXT NOT NULL,
+                    PRIMARY KEY(_name)
+                );
+                LOCK TABLE schema_object IN SHARE ROW EXCLUSIVE MODE;
+                SELECT _name, _hash FROM schema_object;
+            """)
+            hashes = dict(cur.fetchall())
+            changes = [
+                (name, statement) for name, statement in schema
+                if hashes.get(name) != self.hash(statement)
+            ]
+            drops = sorted(set(hashes.keys()) - set([name for name, _ in schema]))
+            if len(changes) > 0:
+                cur.execute('\n'.join([
+                    line[12:] if line.startswith(12 * ' ') else line
+                    for line in "".join([statement for _, statement in changes]).split('\n')
+                    if line.strip()
+                ]))
+            for name in drops:
+                # Tables, columns, and triggers of removed namespaces or variables are kept to
+                # preserve the state of existing experiment instances.
+                if name.startswith("FUNCTION "):
+                    cur.execute("DROP {name} CASCADE".format(name=name))
+            cur.execute("DELETE FROM schema_object WHERE _name = ANY(%s)", (drops,))
+            cur.executemany("""
+                INSERT INTO schema_object(_name, _hash) VALUES (%s, %s)
+                    ON CONFLICT (_name) DO UPDATE SET _hash = EXCLUDED._hash
+            """, [(name, self.hash(statement)) for name, statement in changes])
+            cur.execute("""
+                SELECT _name, _hash FROM task
+                    WHERE _eno = (SELECT max(_no) FROM experiment_version)
+            """)
+            tasks_hashes = dict(cur.fetchall())
+            cur.execute("""
+                SELECT _layout FROM experiment_version ORDER BY _no DESC LIMIT 1
+            """)
+            previous_layout = cur.fetchone()
+            if previous_layout is not None and previous_layout[0] != layout.name():
+                cur.execute("SELECT EXISTS (SELECT 1 FROM experiment_instance)")
+                if cur.fetchone()[0]:
+                    raise RuntimeError(
+                        "The experiment was instantiated with the {previous} layout, so it cannot "
+                        "be pushed with the {layout} layout.".format(
+                            previous=previous_layout[0],
+                            layout=layout.name()
+                        )
+                    )
+            self.insert_experiment_version(cur, wedmakefile, message, layout.name())
+            cur.execute(
+                "DELETE FROM task_readiness WHERE _task != ALL(%s)",
+                ([task.name() for task in wedmakefile.tasks()],)
+            )
+            for task in wedmakefile.tasks():
+                if tasks_hashes.get(task.name()) != self.task_hash(task):
+                    cur.execute("""
+                        INSERT INTO task_readiness(_eid, _task, _ready)
+                            SELECT _id, %s, COALESCE("_is_{task}_ready"(_id), FALSE)
+                            FROM experiment_instance
+                            ON CONFLICT (_eid, _task) DO UPDATE SET _ready = EXCLUDED._ready
+                    """.format(task=task.name()), (task.name(),))
+            conn.commit()
+        if len(changes) > 0 or len(drops) > 0:
+            self._pool.invalidate_prepared_statements()
+        return [name for name, _ in changes] + drops
+
+    def latest_layout(self):
+        """Return the name of the layout of experiment instance states of the latest experiment
+        version, or None if the experiment was never pushed.
+        """
+        with self._pool.connection() as conn:
+            cur = conn.cursor()
+            cur.execute("SELECT to_regclass('experiment_version') IS NOT NULL")
+            layout = None
+            if cur.fetchone()[0]:
+                cur.execute("SELECT _layout FROM experiment_version ORDER BY _no DESC LIMIT 1")
+                row = cur.fetchone()
+                layout = row[0] if row is not None else None
+            conn.commit()
+        return layout
+
+    @staticmethod
+    def hash(statement):
+        """Return the hexadecimal SHA-1 digest of the specified SQL statement.
+
+        statement -- [str] SQL statement.
+        """
+        return hashlib.sha1(statement.encode()).hexdigest()
+
+    @classmethod
+    def task_hash(cls, task):
+        """Return the hexadecimal SHA-1 digest of the name, guard, and Bash script of the specified
+        task.
+
+        task -- [wedmakefile_parser.Task] Task to hash.
+        """
+        return cls.hash('\n'.join(
+            [task.name(), task.bash_script()] +
+            [dependency.clause() for dependency in task.guard().dependencies()]
         ))
-        cur = conn.cursor()
-        cur.execute(sql_str)
-        conn.commit()
+
+    @classmethod
+    def insert_experiment_version(cls, cur, wedmakefile, message, layout="wide"):
+        """Store a new version of the experiment specification and return its number.
+
+        cur -- [psycopg2.extensions.cursor] Cursor of the transaction to store the version in.
+        wedmakefile -- [wedmakefile_parser.WEDMakefile] Parsed WED-Makefile containing the
+                       experiment specification.
+        message -- [str] A message describing the experiment or its updates.
+        layout -- [str] Name of the layout of experiment instance states.
+        """
+        guards = [wedmakefile.initial_guard(), wedmakefile.final_guard()] + [
+            task.guard() for task in wedmakefile.tasks()
+        ]
+        cur.execute("""
+            INSERT INTO guard(_id)
+                SELECT nextval(pg_get_serial_sequence('guard', '_id'))
+                FROM generate_series(1, %s)
+                RETURNING _id
+        """, (len(guards),))
+        gids = [row[0] for row in cur.fetchall()]
+        psycopg2.extras.execute_values(
+            cur,
+            "INSERT INTO guard_dependency(_clause, _gid) VALUES %s",
+            [
+                (dependency.clause(), gid)
+                for guard, gid in zip(guards, gids)
+                for dependency in guard.dependencies()
+            ]
+        )
+        cur.execute(
+            "INSERT INTO experiment_version(_message, _initial_gid, _final_gid, _layout) "
+            "VALUES (%s, %s, %s, %s) RETURNING _no",
+            (message, gids[0], gids[1], layout)
+        )
+        eno = cur.fetchone()[0]
+        psycopg2.extras.execute_values(
+            cur,
+            "INSERT INTO task(_name, _language, _body, _gid, _eno, _hash) VALUES %s",
+            [
+                (task.name(), "bash", task.bash_script(), gid, eno, cls.task_hash(task))
+                for task, gid in zip(wedmakefile.tasks(), gids[2:])
+            ]
+        )
+        return eno
+
+    @staticmethod
+    def capture_initial_state(config):
+        """Return the initial state set by the specified configuration as a list of dictionaries
+        with variable identifiers, values, and permissions (see function _instantiate).
+
+        config -- [str] Bash script containing the initial state of an experiment instance.
+        """
+        return MetabaseInterface.state_to_json(
+            py_runtime.PyExperimentInstanceState.from_bash_script(setup="", main=config.strip())
+        )
+
+    @staticmethod
+    def expand_matrix(config, matrix):
+        """Return a list with one configuration per combination of the values in the specified
+        matrix, each one extending the specified configuration with read-only assignments.
+
+        config -- [str] Bash script containing the variables common to all combinations.
+        matrix -- [list of (str, list of str)] Variable identifiers and the values to combine.
+        """
+        return [
+            config.rstrip() + "\n" + "\n".join([
+                "readonly {identifier}={value}".format(
+                    identifier=identifier,
+                    value=shlex.quote(value)
+                )
+                for (identifier, _), value in zip(matrix, values)
+            ]) + "\n"
+            for values in itertools.product(*[values for _, values in matrix])
+        ]
+
+    def instantiate_many(self, configs, max_workers=8):
+        """Instantiate the specified experiment once per configuration and return the newly
+        created experiment instance ids, in the same order.
+
+        The configurations are captured concurrently and all experiment instances are created in a
+        single transaction (see function _instantiate_many): if any initial state is invalid, no
+        experiment instance is created.
+
+        configs -- [list of str] Bash scripts containing the initial states of the experiment
+                   instances.
+        max_workers -- [int] Maximum number of configurations captured at the same time.
+        """
+        with concurrent.futures.ThreadPoolExecutor(max_workers) as executor:
+            initial_states = list(executor.map(self.capture_initial_state, configs))
+        with self._pool.connection() as conn:
+            cur = conn.cursor()
+            cur.execute("SELECT _instantiate_many(%s)", (Json(initial_states),))
+            eids = [int(eid) for eid in cur.fetchone()[0]]
+            conn.commit()
+        return eids
 
     def instantiate(self, config_path):
         """Instantiate the specified experiment and return the newly created experiment instance id.
@@ -652,56 +1595,388 @@ class MetabaseInterface:
                        experiment instance.
         """
         with open(config_path) as config_file:
-            initial_state = py_runtime.PyExperimentInstanceState.from_bash_script(
-                setup="",
-                main=config_file.read().strip()
+            return self.instantiate_many([config_file.read()])[0]
+
+    @staticmethod
+    def wait_for_notification(conn, timeout):
+        """Block until the specified connection receives a notification or the timeout expires,
+        discarding the received notifications.
+
+        conn -- [psycopg2.extensions.connection] Connection listening on some channel.
+        timeout -- [float] Seconds to wait at most.
+        """
+        if not conn.notifies:
+            select.select([conn], [], [], timeout)
+            conn.poll()
+        del conn.notifies[:]
+
+    @staticmethod
+    def state_from_json(variables):
+        """Return a PyExperimentInstanceState initialized from a list of dictionaries with variable
+        identifiers, values, and permissions.
+
+        variables -- [list of dict] Values and permissions of variables.
+        """
+        ei_state = py_runtime.PyExperimentInstanceState()
+        for variable in variables:
+            identifier = wedmakefile_parser.Variable.validate_identifier(variable["identifier"])
+            ei_state[identifier] = wedmakefile_parser.Variable.validate_value(variable["value"] or "")
+            ei_state._permission[identifier] = variable["perm"]
+        return ei_state
+
+    @staticmethod
+    def state_to_json(ei_state):
+        """Return a list of dictionaries with the identifiers, values, and permissions of the
+        variables of the specified PyExperimentInstanceState.
+
+        ei_state -- [py_runtime.PyExperimentInstanceState] State to serialize.
+        """
+        return [{
+            "identifier": variable_identifier,
+            "perm": "ro" if ei_state.is_readonly(variable_identifier) else "rw",
+            "value": ei_state[variable_identifier]
+        } for variable_identifier in sorted(ei_state.keys())]
+
+    @staticmethod
+    def worker_name():
+        """Return a name identifying the calling thread across the workers of a Metabase server."""
+        return "{hostname}:{pid}:{thread}".format(
+            hostname=socket.gethostname(),
+            pid=os.getpid(),
+            thread=threading.get_ident()
+        )
+
+    def lease(self, cur, eid, worker, lease_timeout):
+        """Lease a task to the specified worker and return the lease (see function _lease).
+
+        cur -- [psycopg2.extensions.cursor] Cursor of the worker's connection.
+        eid -- [int/None] Id of the experiment instance to lease a task of, or None to lease a task
+               of any running experiment instance.
+        worker -- [str] Worker name.
+        lease_timeout -- [float] Seconds until the lease expires, unless renewed.
+        """
+        while True:
+            try:
+                self._pool.execute_prepared(
+                    cur,
+                    "_lease",
+                    "(integer, text, double precision) AS SELECT _lease($1, $2, $3)",
+                    (eid, worker, lease_timeout)
+                )
+                lease = cur.fetchone()[0]
+            except (psycopg2.errors.DeadlockDetected, psycopg2.errors.LockNotAvailable):
+                # Another worker locked the same rows in the meantime, so try again.
+                cur.connection.rollback()
+                continue
+            cur.connection.commit()
+            return lease
+
+    def renew_lease(self, cur, lease_id, worker, lease_timeout, stop):
+        """Renew the specified lease until stopped or expired.
+
+        cur -- [psycopg2.extensions.cursor] Cursor of the worker's connection, idle while the
+               leased task's Bash script executes.
+        lease_id -- [int] Id of the lease to renew.
+        worker -- [str] Worker name.
+        lease_timeout -- [float] Seconds until the lease expires, unless renewed again.
+        stop -- [threading.Event] Event set to stop renewing the lease.
+        """
+        while not stop.wait(lease_timeout / 3.0):
+            cur.execute("SELECT _renew_lease(%s, %s, %s)", (lease_id, worker, lease_timeout))
+            renewed = cur.fetchone()[0]
+            cur.connection.commit()
+            if not renewed:
+                return
+
+    @classmethod
+    def store_output(cls, cur, execution_id, stream, path):
+        """Store the content of the specified file as the standard output or standard error of an
+        execution of a task's Bash script, reading and compressing it one chunk at a time.
+
+        cur -- [psycopg2.extensions.cursor] Cursor of the transaction to store the content in.
+        execution_id -- [int] Id of the execution of the task's Bash script.
+        stream -- [str] Either 'stdout' or 'stderr'.
+        path -- [str] Path to the file the task's Bash script wrote the stream to.
+        """
+        with open(path, "rb") as output_file:
+            for chunk_no, chunk in enumerate(iter(
+                lambda: output_file.read(cls.OUTPUT_CHUNK_SIZE), b""
+            )):
+                cur.execute("""
+                    INSERT INTO task_execution_output(_xid, _stream, _chunk, _size, _data)
+                        VALUES (%s, %s, %s, %s, %s)
+                """, (execution_id, stream, chunk_no, len(chunk),
+                      psycopg2.Binary(zlib.compress(chunk))))
+
+    def execute_lease(self, cur, lease, worker, lease_timeout, logdir_path=None):
+        """Execute the Bash script of a leased task on this machine, renewing the lease meanwhile,
+        and commit its updates in a short transaction, along with a record of the execution (see
+        table task_execution) and its standard output and standard error. Return the outcome (see
+        function _commit_lease).
+
+        cur -- [psycopg2.extensions.cursor] Cursor of the worker's connection.
+        lease -- [dict] Lease returned by function _lease.
+        worker -- [str] Worker name.
+        lease_timeout -- [float] Seconds until the lease expires, unless renewed.
+        logdir_path -- [str/None] Path to the directory where the standard output and standard error
+                       of the task's Bash script are also kept.
+        """
+        task = wedmakefile_parser.Task(
+            lease["task"]["name"],
+            wedmakefile_parser.Guard(lease["task"]["guard"]),
+            lease["task"]["bash"]
+        )
+        ei_state = self.state_from_json(lease["state"])
+        if logdir_path is not None:
+            outputs = [
+                os.path.join(logdir_path, "{eid}_{task}_{lease}.{ext}".format(
+                    eid=lease["eid"],
+                    task=task.name(),
+                    lease=lease["lease"],
+                    ext=ext
+                ))
+                for ext in ("out", "err")
+            ]
+        else:
+            outputs = []
+            for ext in ("out", "err"):
+                fd, path = tempfile.mkstemp(suffix="." + ext)
+                os.close(fd)
+                outputs.append(path)
+        stop = threading.Event()
+        heartbeat_thread = threading.Thread(
+            target=self.renew_lease,
+            args=(cur, lease["lease"], worker, lease_timeout, stop)
+        )
+        heartbeat_thread.start()
+        diff_state, error, resource_usage = None, None, {}
+        started_at = time.time()
+        try:
+            other_state = py_runtime.PyExperimentInstanceState.from_task(
+                task, ei_state, outputs[0], outputs[1], resource_usage
             )
-        conn = psycopg2.connect("host={host} dbname={dbname} user={user} password={password}".format(
-            host=self._host,
-            dbname="wedmake",
-            user=self._user,
-            password=self._password
-        ))
-        cur = conn.cursor()
-        cur.execute("SELECT _instantiate({initial_state})".format(
-            initial_state=Json([{
-                "identifier": variable_identifier,
-                "perm": "ro" if initial_state.is_readonly(variable_identifier) else "rw",
-                "value": initial_state[variable_identifier]
-            } for variable_identifier in sorted(initial_state.keys())])
-        ))
-        eid = int(cur.fetchone()[0])
-        conn.commit()
-        return eid
+            for variable_identifier in other_state.keys():
+                if wedmakefile_parser.Variable(variable_identifier) not in \
+                        task.guard().on_variables():
+                    raise RuntimeError(
+                        "UndeclaredDependency: Variable {variable_identifier} was not declared "
+                        "as a dependency of task {task}.".format(
+                            task=task.name(),
+                            variable_identifier=variable_identifier
+                        )
+                    )
+            diff_state = self.state_to_json(other_state.diff(ei_state))
+        except Exception as e:
+            error = str(e) or "TaskExecutionError: Error while executing task {task}.".format(
+                task=task.name()
+            )
+        finally:
+            finished_at = time.time()
+            stop.set()
+            heartbeat_thread.join()
+        try:
+            # The lease is checked against the start of the transaction, so storing a long output
+            # cannot make it expire.
+            cur.execute("""
+                INSERT INTO task_execution(_eid, _task, _hash, _worker, _started_at, _finished_at,
+                        _duration, _exit_status, _error, _user_time, _system_time, _max_rss,
+                        _rusage)
+                    VALUES (%s, %s, %s, %s, to_timestamp(%s), to_timestamp(%s), %s, %s, %s, %s, %s,
+                            %s, %s)
+                    RETURNING _id
+            """, (
+                lease["eid"], task.name(), self.task_hash(task), worker, started_at, finished_at,
+                finished_at - started_at, resource_usage.get("exit_status"), error,
+                resource_usage.get("ru_utime"), resource_usage.get("ru_stime"),
+                resource_usage.get("ru_maxrss"), Json(resource_usage) if resource_usage else None
+            ))
+            execution_id = cur.fetchone()[0]
+            for stream, path in zip(("stdout", "stderr"), outputs):
+                self.store_output(cur, execution_id, stream, path)
+            cur.execute(
+                "SELECT _commit_lease(%s, %s, %s, %s)",
+                (lease["lease"], worker, Json(diff_state or []), error)
+            )
+            outcome = cur.fetchone()[0]
+            cur.execute(
+                "UPDATE task_execution SET _committed = %s WHERE _id = %s",
+                (outcome["committed"], execution_id)
+            )
+            cur.connection.commit()
+        finally:
+            if logdir_path is None:
+                for path in outputs:
+                    os.remove(path)
+        return outcome
+
+    def run(self, eid, lease_timeout=60.0, wait_timeout=1.0, logdir_path=None):
+        """A thread to run the specified experiment instance. Return True if it reached a final
+        state. Return False, otherwise.
 
-    def run(self, eid):
-        """A thread to run the specified experiment instance.
+        The thread leases tasks of the experiment instance (see function _lease) and executes their
+        Bash scripts on this machine, so no transaction is held open while a script executes. When
+        no task can be leased, the thread sleeps until the state of the experiment instance changes
+        (see function _notify_state_change) or the wait timeout expires, since a task may have been
+        skipped only because another worker leased a task depending on the same variables.
 
         eid -- [int] Id of the experiment instance to run.
+        lease_timeout -- [float] Seconds until a leased task is leased again to another worker,
+                         unless its lease is renewed.
+        wait_timeout -- [float] Seconds to wait at most for a state change between attempts that
+                        lease no task.
+        logdir_path -- [str/None] Path to the directory where the standard output and standard error
+                       of tasks' Bash scripts are written.
         """
-        conn = psycopg2.connect("host={host} dbname={dbname} user={user} password={password}".format(
-            host=self._host,
-            dbname="wedmake",
-            user=self._user,
-            password=self._password
-        ))
-        cur = conn.cursor()
-        is_in_final_state = False
-        is_in_inconsistent_state = False
-        while not is_in_final_state and not is_in_inconsistent_state:
-            cur.execute("SELECT _ready_to_execute({eid})".format(eid=eid))
-            ready_tasks = cur.fetchone()[0]
+        worker = self.worker_name()
+        with self._pool.connection() as conn:
+            cur = conn.cursor()
+            cur.execute("LISTEN experiment_instance_{eid}".format(eid=int(eid)))
             conn.commit()
-            if ready_tasks is not None and len(ready_tasks):
-                cur.execute("SELECT \"_execute_{task}\"({eid})".format(
-                    eid=eid,
-                    task=random.choice(ready_tasks)
-                ))
-                cur.fetchone()
+            try:
+                while True:
+                    lease = self.lease(cur, eid, worker, lease_timeout)
+                    if lease["lease"] is not None:
+                        status = self.execute_lease(
+                            cur, lease, worker, lease_timeout, logdir_path
+                        )["status"]
+                    else:
+                        cur.execute("SELECT _refresh_status(%s)", (eid,))
+                        status = cur.fetchone()[0]
+                        conn.commit()
+                    if status not in (None, "running"):
+                        return status == "final"
+                    if lease["lease"] is None:
+                        self.wait_for_notification(conn, wait_timeout)
+            finally:
+                conn.rollback()
+                cur.execute("UNLISTEN *")
+                conn.commit()
+
+    def work(self, lease_timeout=60.0, wait_timeout=1.0, exit_when_idle=True, logdir_path=None,
+            statistics=None):
+        """A thread to execute tasks of any running experiment instance. Return the number of tasks
+        executed.
+
+        The thread leases tasks (see function _lease) and executes their Bash scripts on this
+        machine. When no task can be leased, the thread records the status of the running
+        experiment instances that have neither tasks ready nor leased (see function _sweep) and
+        sleeps until the state of some experiment instance changes or the wait timeout expires.
+
+        lease_timeout -- [float] Seconds until a leased task is leased again to another worker,
+                         unless its lease is renewed.
+        wait_timeout -- [float] Seconds to wait at most for a state change between attempts that
+                        lease no task.
+        exit_when_idle -- [bool] Return when no experiment instance is running.
+        logdir_path -- [str/None] Path to the directory where the standard output and standard error
+                       of tasks' Bash scripts are written.
+        statistics -- [dict/None] Dictionary to accumulate the number of attempts to lease a task
+                      ("lease_attempts"), of leased tasks ("leases"), and of leases that expired
+                      before their updates were committed ("rejected_commits").
+        """
+        worker = self.worker_name()
+        n_executed = 0
+        if statistics is None:
+            statistics = {}
+        for key in ("lease_attempts", "leases", "rejected_commits"):
+            statistics.setdefault(key, 0)
+        with self._pool.connection() as conn:
+            cur = conn.cursor()
+            cur.execute("LISTEN experiment_instance")
+            conn.commit()
+            try:
+                while True:
+                    lease = self.lease(cur, None, worker, lease_timeout)
+                    statistics["lease_attempts"] += 1
+                    if lease["lease"] is not None:
+                        statistics["leases"] += 1
+                        if self.execute_lease(cur, lease, worker, lease_timeout, logdir_path)[
+                                "committed"]:
+                            n_executed += 1
+                        else:
+                            statistics["rejected_commits"] += 1
+                        continue
+                    cur.execute("SELECT _sweep()")
+                    conn.commit()
+                    cur.execute("SELECT count(*) FROM experiment_instance WHERE _status = 'running'")
+                    n_running = cur.fetchone()[0]
+                    conn.commit()
+                    if n_running == 0 and exit_when_idle:
+                        return n_executed
+                    self.wait_for_notification(conn, wait_timeout)
+            finally:
+                conn.rollback()
+                cur.execute("UNLISTEN *")
                 conn.commit()
-            cur.execute("SELECT _is_in_inconsistent_state({eid})".format(eid=eid))
-            is_in_inconsistent_state = bool(cur.fetchone()[0])
+
+    def progress(self):
+        """Return a list with the id, status, number of executed tasks, and number of ready tasks
+        of every experiment instance, sorted by id.
+        """
+        with self._pool.connection() as conn:
+            cur = conn.cursor()
+            cur.execute("""
+                SELECT i._id, i._status, i._n_executed, count(r._task)
+                    FROM experiment_instance i
+                    LEFT JOIN task_readiness r ON r._eid = i._id AND r._ready
+                    GROUP BY i._id
+                    ORDER BY i._id
+            """)
+            progress = cur.fetchall()
             conn.commit()
-            cur.execute("SELECT _is_in_final_state({eid})".format(eid=eid))
-            is_in_final_state = bool(cur.fetchone()[0])
+        return progress
+
+    def executions(self, eid):
+        """Return a list with the id, task name, worker name, start time, duration in seconds, exit
+        status, error, whether the updates were committed, and maximum resident set size in
+        kilobytes of every execution of a Bash script of the specified experiment instance, sorted
+        by start time.
+
+        eid -- [int] Id of the experiment instance.
+        """
+        with self._pool.connection() as conn:
+            cur = conn.cursor()
+            cur.execute("""
+                SELECT _id, _task, _worker, _started_at, _duration, _exit_status, _error,
+                       _committed, _max_rss
+                    FROM task_execution
+                    WHERE _eid = %s
+                    ORDER BY _started_at, _id
+            """, (eid,))
+            executions = cur.fetchall()
+            conn.commit()
+        return executions
+
+    def task_durations(self):
+        """Return a list with the name, number of successful executions, and mean, median, 90th
+        percentile, 99th percentile, and maximum duration in seconds of every task of the latest
+        experiment version, sorted by name (see view task_duration).
+        """
+        with self._pool.connection() as conn:
+            cur = conn.cursor()
+            cur.execute("""
+                SELECT _task, _n, _mean, _p50, _p90, _p99, _max FROM task_duration ORDER BY _task
+            """)
+            durations = cur.fetchall()
+            conn.commit()
+        return durations
+
+    def write_output(self, execution_id, stream, output_file):
+        """Write the standard output or standard error of an execution of a task's Bash script to
+        the specified file, fetching and decompressing it one chunk at a time.
+
+        execution_id -- [int] Id of the execution of the task's Bash script.
+        stream -- [str] Either 'stdout' or 'stderr'.
+        output_file -- [file] Binary file to write to.
+        """
+        with self._pool.connection() as conn:
+            cur = conn.cursor(name="task_execution_output_{id}".format(id=int(execution_id)))
+            cur.itersize = 1
+            cur.execute("""
+                SELECT _data FROM task_execution_output
+                    WHERE _xid = %s AND _stream = %s
+                    ORDER BY _chunk
+            """, (execution_id, stream))
+            for data, in cur:
+                output_file.write(zlib.decompress(data))
+            cur.close()
             conn.commit()
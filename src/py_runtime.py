@@ -68,7 +68,7 @@ class PyExperimentInstanceState(dict):
         )
 
     @classmethod
-    def from_bash_script(cls, setup, main, args=None):
+    def from_bash_script(cls, setup, main, args=None, resource_usage=None):
         """Return a PyExperimentInstanceState initialized with the values and permissions assigned
         to global variables by main commands, which execute after setup commands.
 
@@ -76,12 +76,14 @@ class PyExperimentInstanceState(dict):
                  captured.
         main -- [str] Bash commands to execute last whose updates to global variables are captured.
         args -- [list of str/None] Command-line arguments to setup and main commands.
+        resource_usage -- [dict/None] Dictionary to fill with the exit status and resource usage of
+                          setup and main commands (see method bash_utils.BashScript.execute).
         """
         ei_state = cls()
         bash_script = bash_utils.BashScript(
             PyExperimentInstanceState.render_capture_bash_script(setup, main)
         )
-        variables = bash_script.execute(args).decode("utf-8").strip().split('\n')
+        variables = bash_script.execute(args, resource_usage).decode("utf-8").strip().split('\n')
         for identifier, value, permission in zip(variables[0::3], variables[1::3], variables[2::3]):
             identifier = wedmakefile_parser.Variable.validate_identifier(identifier)
             value = wedmakefile_parser.Variable.validate_value(value)
@@ -90,10 +92,64 @@ class PyExperimentInstanceState(dict):
             ei_state._permission[identifier] = permission
         return ei_state
 
+    @classmethod
+    def from_task(cls, task, ei_state, stdout="/dev/null", stderr="/dev/null",
+            resource_usage=None):
+        """Return a PyExperimentInstanceState initialized with the values and permissions assigned
+        to variables by the specified task's Bash script, which executes with the values and
+        permissions of its dependent variables taken from the specified PyExperimentInstanceState.
+
+        task -- [wedmakefile_parser.Task] Task whose Bash script is executed.
+        ei_state -- [PyExperimentInstanceState] PyExperimentInstanceState to read the values and
+                    permissions of the task's dependent variables from.
+        stdout -- [str] Path to the file where the standard output of the task's Bash script is
+                  written.
+        stderr -- [str] Path to the file where the standard error of the task's Bash script is
+                  written.
+        resource_usage -- [dict/None] Dictionary to fill with the exit status and resource usage of
+                          the task's Bash script (see method bash_utils.BashScript.execute).
+        """
+        return cls.from_bash_script(
+            setup="function main {{\n{variables}\n{body}\n}}".format(
+                variables="""
+                    local _IFS_BACKUP=\$IFS
+                    IFS=,
+                    local _params
+                    read -a _params <<< "$1"
+                    local _it=0
+                    while [ \$_it -lt \${#_params[@]} ]; do
+                        if [ \${_params[\$_it+2]} = "ro" ]; then
+                            readonly \${_params[\$_it]}="\${_params[\$_it+1]}"
+                        else
+                            eval "\${_params[\$_it]}=\\\"\${_params[\$_it+1]}\\\""
+                        fi
+                        let _it=_it+3
+                    done
+                    IFS=\$_IFS_BACKUP
+                    unset _IFS_BACKUP
+                    unset _params
+                    unset _it
+                """,
+                body=task.bash_script().replace(r'\$', r'\\$').replace(r'$', r'\$')
+            ),
+            main="main 1> {stdout} 2> {stderr}".format(stdout=stdout, stderr=stderr),
+            args=[','.join([
+                arg.replace(",", "\\,")
+                for var_id_val_perm in [[
+                    variable.identifier(),
+                    ei_state.get(variable.identifier(), ""),
+                    "ro" if ei_state.is_readonly(variable.identifier()) else "rw"
+                ] for variable in task.guard().on_variables()]
+                for arg in var_id_val_perm
+            ])],
+            resource_usage=resource_usage
+        )
+
     def __init__(self):
         """Initialize an empty PyExperimentInstanceState."""
         super().__init__()
         self._permission = dict()
+        self._version = dict()
 
     def is_readonly(self, variable_identifier):
         """Return True if the specified variable can only be read. Return False, otherwise.
@@ -109,12 +165,34 @@ class PyExperimentInstanceState(dict):
         """
         return not self.is_readonly(variable_identifier)
 
+    def version(self, variable_identifier):
+        """Return the number of times the value or permission of the specified variable was
+        updated.
+
+        variable_identifier -- [str] Identifier of the variable to evaluate.
+        """
+        return self._version.get(variable_identifier, 0)
+
+    def copy(self):
+        """Return a PyExperimentInstanceState with the same values, permissions, and versions of
+        variables."""
+        ei_state = PyExperimentInstanceState()
+        ei_state.update(self)
+        ei_state._version = dict(self._version)
+        return ei_state
+
     def update(self, other):
-        """Update the values and permissions of variables.
+        """Update the values and permissions of variables, incrementing the versions of variables
+        whose value or permission changed.
 
         other -- [PyExperimentInstanceState] Another PyExperimentInstanceState to update the values
                  and permissions of variables.
         """
+        for variable_identifier, variable_value in other.items():
+            if self.get(variable_identifier, None) != variable_value or \
+                    self._permission.get(variable_identifier, None) != \
+                    other._permission.get(variable_identifier, None):
+                self._version[variable_identifier] = self.version(variable_identifier) + 1
         super().update(other)
         self._permission.update(other._permission)
 
@@ -220,7 +298,8 @@ class PyExperimentInstance:
 
     _ei_lock = threading.Lock()
 
-    def __init__(self, wedmakefile, config_path, log, verbose):
+    def __init__(self, wedmakefile, config_path, log, verbose, optimistic=False,
+            conflict_policy="retry"):
         """Initialize a PyExperimentInstance with the specified parsed WED-Makefile, configuration
         file, and options.
 
@@ -230,7 +309,15 @@ class PyExperimentInstance:
                        experiment instance.
         log -- [bool] Enable/Disable logging.
         verbose -- [bool] Enable/Disable verbose mode.
+        optimistic -- [bool] Enable/Disable optimistic execution of tasks, which run against a
+                      snapshot of the state and validate the versions of their dependent variables
+                      at commit time instead of holding variable locks.
+        conflict_policy -- [str] What to do with an optimistically executed task whose dependent
+                           variables were updated concurrently: 'retry' (discard its updates and
+                           reschedule it) or 'fail' (report a conflict).
         """
+        if conflict_policy not in ("retry", "fail"):
+            raise ValueError("The conflict policy must be either 'retry' or 'fail'.")
         self._wedmakefile = wedmakefile
         with open(config_path) as config_file:
             self._state = PyExperimentInstanceState.from_bash_script(
@@ -249,6 +336,9 @@ class PyExperimentInstance:
         if log:
             os.mkdir(self._logdir_path)
         self._verbose = verbose
+        self._optimistic = optimistic
+        self._conflict_policy = conflict_policy
+        self._running_tasks = set()
         self._exceptions = []
         self._variable_locks = dict([
             (variable.identifier(), threading.Lock())
@@ -292,6 +382,24 @@ class PyExperimentInstance:
         else:
             print("-- Finished the execution of task {task}.".format(task=task.name()))
 
+    def print_aborted_task_message(self, task, variable_identifiers):
+        """Write a message to the standard output about aborting the execution of the specified
+        task to reschedule it.
+
+        task -- [wedmakefile_parser.Task] Task whose execution was aborted.
+        variable_identifiers -- [list of str] Identifiers of the variables read by the specified
+                                task that were updated concurrently.
+        """
+        if self._verbose:
+            print("{timestamp} - Aborted the execution of task {task}, conflicting on "
+                  "variable(s): {variable_identifiers}.".format(
+                timestamp=time.strftime("%Y-%m-%d-%H-%M-%S"),
+                task=task.name(),
+                variable_identifiers=", ".join(variable_identifiers)
+            ))
+        else:
+            print("-- Aborted the execution of task {task}.".format(task=task.name()))
+
     def print_reached_final_state_message(self):
         """Write a message to the standard output about reaching a final state."""
         if self._verbose:
@@ -311,6 +419,8 @@ class PyExperimentInstance:
     def is_in_final_state(self):
         """Return True if in a final state (i.e., reached a state that satisfies the final guard and
         no other thread is executing a task). Return False, otherwise."""
+        if self._running_tasks:
+            return False
         # Try to grab all the locks to guarantee no other thread is executing a task.
         for (i, variable) in enumerate(self._wedmakefile.variables()):
             if not self._variable_locks[variable.identifier()].acquire(blocking=False):
@@ -332,6 +442,8 @@ class PyExperimentInstance:
         """Return True if in an inconsistent state (i.e., reached a state that does not satisfy the
         final guard nor the guard of any task and no other thread is executing a task). Return
         False, otherwise."""
+        if self._running_tasks:
+            return False
         # Try to grab all the locks to guarantee no other thread is executing a task.
         for (i, variable) in enumerate(self._wedmakefile.variables()):
             if not self._variable_locks[variable.identifier()].acquire(blocking=False):
@@ -363,6 +475,8 @@ class PyExperimentInstance:
 
         task -- [wedmakefile_parser.Task] Task to evaluate.
         """
+        if task.name() in self._running_tasks:
+            return False
         for (i, variable) in enumerate(task.guard().on_variables()):
             if not self._variable_locks[variable.identifier()].acquire(blocking=False):
                 j = 0
@@ -382,12 +496,52 @@ class PyExperimentInstance:
         """Return a list of tasks ready to be promptly executed."""
         return [task for task in self._wedmakefile.tasks() if self.is_ready_to_execute_task(task)]
 
+    def task_output_paths(self, task):
+        """Return the paths to the files where the standard output and the standard error of the
+        specified task's Bash script are written.
+
+        task -- [wedmakefile_parser.Task] Task to execute.
+        """
+        if not self._logdir_path:
+            return "/dev/null", "/dev/null"
+        timestamp = time.strftime("%Y%m%d%H%M%S")
+        return tuple(
+            os.path.join(self._logdir_path, "{task}_{timestamp}.{ext}".format(
+                task=task.name(),
+                timestamp=timestamp,
+                ext=ext
+            ))
+            for ext in ("out", "err")
+        )
+
+    def check_declared_dependencies(self, task, other_state):
+        """Return True if the specified task's Bash script only updated variables declared as its
+        dependencies. Record an exception and return False, otherwise.
+
+        task -- [wedmakefile_parser.Task] Executed task.
+        other_state -- [PyExperimentInstanceState] Values and permissions of variables assigned by
+                       the task's Bash script.
+        """
+        for variable_identifier in other_state.keys():
+            if wedmakefile_parser.Variable(variable_identifier) not in task.guard().on_variables():
+                self._exceptions.append(RuntimeError(
+                    "UndeclaredDependency: Variable {variable_identifier} was not declared "
+                    "as a dependency of task {task}.".format(
+                        task=task.name(),
+                        variable_identifier=variable_identifier
+                    )
+                ))
+                return False
+        return True
+
     def execute_task(self, task):
         """Return True if the specified task is successfully and promptly executed. Return False,
         otherwise.
 
         task -- [wedmakefile_parser.Task] Task to execute.
         """
+        if self._optimistic:
+            return self.execute_task_optimistically(task)
         PyExperimentInstance._ei_lock.acquire()
         for (i, variable) in enumerate(task.guard().on_variables()):
             if not self._variable_locks[variable.identifier()].acquire(blocking=False):
@@ -406,54 +560,8 @@ class PyExperimentInstance:
         else:
             self.print_triggered_task_message(task)
             try:
-                stdout=os.path.join(
-                    self._logdir_path,
-                    "{task}_{timestamp}.out".format(
-                        task=task.name(),
-                        timestamp=time.strftime("%Y%m%d%H%M%S")
-                    )
-                ) if self._logdir_path else "/dev/null"
-                stderr=os.path.join(
-                    self._logdir_path,
-                    "{task}_{timestamp}.err".format(
-                        task=task.name(),
-                        timestamp=time.strftime("%Y%m%d%H%M%S")
-                    )
-                ) if self._logdir_path else "/dev/null"
-                other_state = PyExperimentInstanceState.from_bash_script(
-                    setup="function main {{\n{variables}\n{body}\n}}".format(
-                        variables="""
-                            local _IFS_BACKUP=\$IFS
-                            IFS=,
-                            local _params
-                            read -a _params <<< "$1"
-                            local _it=0
-                            while [ \$_it -lt \${#_params[@]} ]; do
-                                if [ \${_params[\$_it+2]} = "ro" ]; then
-                                    readonly \${_params[\$_it]}="\${_params[\$_it+1]}"
-                                else
-                                    eval "\${_params[\$_it]}=\\\"\${_params[\$_it+1]}\\\""
-                                fi
-                                let _it=_it+3
-                            done
-                            IFS=\$_IFS_BACKUP
-                            unset _IFS_BACKUP
-                            unset _params
-                            unset _it
-                        """,
-                        body=task.bash_script().replace(r'\$', r'\\$').replace(r'$', r'\$')
-                    ),
-                    main="main 1> {stdout} 2> {stderr}".format(stdout=stdout, stderr=stderr),
-                    args=[','.join([
-                        arg.replace(",", "\\,")
-                        for var_id_val_perm in [[
-                            variable.identifier(),
-                            self._state.get(variable.identifier(), ""),
-                            "ro" if self._state.is_readonly(variable.identifier()) else "rw"
-                        ] for variable in task.guard().on_variables()]
-                        for arg in var_id_val_perm
-                    ])]
-                )
+                stdout, stderr = self.task_output_paths(task)
+                other_state = PyExperimentInstanceState.from_task(task, self._state, stdout, stderr)
             except Exception as exception:
                 self._exceptions.append(RuntimeError(
                     "TaskExecutionError: Error while executing "
@@ -461,27 +569,84 @@ class PyExperimentInstance:
                 ))
                 execute_task = False
             else:
-                for variable_identifier, variable_value in other_state.items():
-                    if wedmakefile_parser.Variable(variable_identifier) not in \
-                            task.guard().on_variables():
-                        self._exceptions.append(RuntimeError(
-                            "UndeclaredDependency: Variable {variable_identifier} was not declared "
-                            "as a dependency of task {task}.".format(
-                                task=task.name(),
-                                variable_identifier=variable_identifier
-                            )
-                        ))
-                        execute_task = False
-                        break
-                else:
+                if self.check_declared_dependencies(task, other_state):
                     self.print_finished_task_message(task, other_state.diff(self._state))
                     PyExperimentInstance._ei_lock.acquire()
                     self._state.update(other_state)
                     PyExperimentInstance._ei_lock.release()
+                else:
+                    execute_task = False
         for variable in task.guard().on_variables():
             self._variable_locks[variable.identifier()].release()
         return execute_task
 
+    def execute_task_optimistically(self, task):
+        """Return True if the specified task is successfully executed and its updates are committed.
+        Return False, otherwise.
+
+        The task's Bash script executes against a snapshot of the state without holding any
+        variable lock. At commit time, the versions of the task's dependent variables are validated
+        against the ones read from the snapshot. If any of them changed, the task's updates are
+        discarded and the task is either rescheduled or reported as a conflict, according to the
+        conflict policy.
+
+        task -- [wedmakefile_parser.Task] Task to execute.
+        """
+        PyExperimentInstance._ei_lock.acquire()
+        if task.name() in self._running_tasks:
+            PyExperimentInstance._ei_lock.release()
+            return False
+        for dependency in task.guard().dependencies():
+            if not PyDependency(dependency).is_satisfied_by(self._state):
+                PyExperimentInstance._ei_lock.release()
+                return False
+        snapshot = self._state.copy()
+        self._running_tasks.add(task.name())
+        PyExperimentInstance._ei_lock.release()
+        execute_task = True
+        self.print_triggered_task_message(task)
+        try:
+            stdout, stderr = self.task_output_paths(task)
+            other_state = PyExperimentInstanceState.from_task(task, snapshot, stdout, stderr)
+        except Exception as exception:
+            self._exceptions.append(RuntimeError(
+                "TaskExecutionError: Error while executing "
+                "task {task}.".format(task=task.name())
+            ))
+            execute_task = False
+        else:
+            if self.check_declared_dependencies(task, other_state):
+                PyExperimentInstance._ei_lock.acquire()
+                conflicting_variables = [
+                    variable.identifier()
+                    for variable in task.guard().on_variables()
+                    if self._state.version(variable.identifier()) != \
+                            snapshot.version(variable.identifier())
+                ]
+                if not conflicting_variables:
+                    self._state.update(other_state)
+                PyExperimentInstance._ei_lock.release()
+                if conflicting_variables:
+                    if self._conflict_policy == "fail":
+                        self._exceptions.append(RuntimeError(
+                            "ConflictingExecution: Variable(s) {variable_identifiers} read by task "
+                            "{task} were updated concurrently.".format(
+                                task=task.name(),
+                                variable_identifiers=", ".join(conflicting_variables)
+                            )
+                        ))
+                    else:
+                        self.print_aborted_task_message(task, conflicting_variables)
+                    execute_task = False
+                else:
+                    self.print_finished_task_message(task, other_state.diff(snapshot))
+            else:
+                execute_task = False
+        PyExperimentInstance._ei_lock.acquire()
+        self._running_tasks.discard(task.name())
+        PyExperimentInstance._ei_lock.release()
+        return execute_task
+
     def run(self):
         while not self.is_in_final_state() and len(self._exceptions) == 0:
             if self.is_in_inconsistent_state():
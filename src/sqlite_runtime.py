@@ -0,0 +1,549 @@
+"""Utilities to run experiments in the SQLite runtime.
+
+The SQLite runtime keeps the state of experiment instances, task claims, and task results in a
+local SQLite database in WAL mode. Any number of independent worker processes on the same host
+look for tasks ready to be executed in read transactions, claim one with a short atomic transaction,
+execute its Bash script outside of any transaction, and commit the resulting updates with another
+short transaction. The variables locked by a claimed task are released if its worker dies or stops
+renewing them, in which case the task can be claimed again and late results are discarded.
+"""
+
+
+import os
+import random
+import socket
+import sqlite3
+import threading
+import time
+
+import py_runtime
+import wedmakefile_parser
+
+
+class SqliteInterface:
+    """An interface to manage experiments in the SQLite runtime."""
+
+    def __init__(self, db_path, timeout=60.0):
+        """Open the specified SQLite database, creating its schema if it does not exist.
+
+        db_path -- [str] Path to the SQLite database.
+        timeout -- [float] Seconds to wait for other processes to release the database lock.
+        """
+        self._db_path = db_path
+        self._conn = sqlite3.connect(db_path, timeout=timeout, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            -- Store experiment instance metadata.
+            CREATE TABLE IF NOT EXISTS experiment_instance(
+                _id INTEGER PRIMARY KEY AUTOINCREMENT,
+                _wedmakefile_path TEXT NOT NULL,
+                _status TEXT NOT NULL DEFAULT 'running',
+                _message TEXT,
+                _created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            );
+            CREATE INDEX IF NOT EXISTS experiment_instance_status
+                ON experiment_instance(_status);
+            -- Store experiment instance state.
+            CREATE TABLE IF NOT EXISTS experiment_instance_state(
+                _eid INTEGER NOT NULL REFERENCES experiment_instance(_id),
+                _identifier TEXT NOT NULL,
+                _value TEXT NOT NULL,
+                _perm TEXT NOT NULL,
+                _version INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY(_eid, _identifier)
+            );
+            -- Store the variables locked by tasks being executed.
+            CREATE TABLE IF NOT EXISTS variable_lock(
+                _eid INTEGER NOT NULL REFERENCES experiment_instance(_id),
+                _identifier TEXT NOT NULL,
+                _task TEXT NOT NULL,
+                _worker TEXT NOT NULL,
+                _expires_at REAL NOT NULL,
+                PRIMARY KEY(_eid, _identifier)
+            );
+            -- Store task executions.
+            CREATE TABLE IF NOT EXISTS task_result(
+                _id INTEGER PRIMARY KEY AUTOINCREMENT,
+                _eid INTEGER NOT NULL REFERENCES experiment_instance(_id),
+                _task TEXT NOT NULL,
+                _worker TEXT NOT NULL,
+                _started_at REAL NOT NULL,
+                _finished_at REAL,
+                _status TEXT NOT NULL DEFAULT 'running'
+            );
+            CREATE INDEX IF NOT EXISTS task_result_eid ON task_result(_eid);
+        """)
+
+    def instantiate(self, wedmakefile_path, config_path):
+        """Instantiate the specified experiment and return the newly created experiment instance id.
+
+        wedmakefile_path -- [str] Path to the WED-Makefile containing the experiment specification.
+        config_path -- [str] Path to the configuration file containing the initial state of the
+                       experiment instance.
+        """
+        wedmakefile_path = os.path.abspath(wedmakefile_path)
+        wedmakefile = wedmakefile_parser.WEDMakefile(wedmakefile_path)
+        with open(config_path) as config_file:
+            initial_state = py_runtime.PyExperimentInstanceState.from_bash_script(
+                setup="",
+                main=config_file.read().strip()
+            )
+        for dependency in wedmakefile.initial_guard().dependencies():
+            if not py_runtime.PyDependency(dependency).is_satisfied_by(initial_state):
+                raise RuntimeError(
+                    "UnsatisfiedInitialGuard: The initial state does not satisfy dependency "
+                    "{dependency_clause}.".format(
+                        dependency_clause=dependency.clause()
+                    )
+                )
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            eid = self._conn.execute(
+                "INSERT INTO experiment_instance(_wedmakefile_path) VALUES (?)",
+                (wedmakefile_path,)
+            ).lastrowid
+            self._conn.executemany(
+                "INSERT INTO experiment_instance_state(_eid, _identifier, _value, _perm) "
+                "VALUES (?, ?, ?, ?)",
+                [
+                    (
+                        eid,
+                        variable_identifier,
+                        variable_value,
+                        "ro" if initial_state.is_readonly(variable_identifier) else "rw"
+                    )
+                    for variable_identifier, variable_value in initial_state.items()
+                ]
+            )
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("COMMIT")
+        return eid
+
+    def status(self):
+        """Return a list of (experiment instance id, status, message, number of executed tasks)
+        tuples."""
+        return self._conn.execute("""
+            SELECT _id, _status, _message, (
+                SELECT COUNT(*) FROM task_result
+                    WHERE task_result._eid = experiment_instance._id AND _status = 'success'
+            )
+            FROM experiment_instance ORDER BY _id
+        """).fetchall()
+
+    def load_state(self, eid):
+        """Return the PyExperimentInstanceState of the specified experiment instance.
+
+        eid -- [int] Id of the experiment instance.
+        """
+        ei_state = py_runtime.PyExperimentInstanceState()
+        for identifier, value, perm, version in self._conn.execute(
+                "SELECT _identifier, _value, _perm, _version FROM experiment_instance_state "
+                "WHERE _eid = ?", (eid,)):
+            ei_state[identifier] = value
+            ei_state._permission[identifier] = perm
+            ei_state._version[identifier] = version
+        return ei_state
+
+
+class SqliteWorker:
+    """A worker process to run experiment instances in the SQLite runtime."""
+
+    def __init__(self, db_path, logdir_path=None, verbose=False, lock_timeout=60.0):
+        """Initialize a SqliteWorker on the specified SQLite database.
+
+        db_path -- [str] Path to the SQLite database.
+        logdir_path -- [str/None] Path to the directory where the standard output and standard error
+                       of tasks' Bash scripts are written. If None, they are discarded.
+        verbose -- [bool] Enable/Disable verbose mode.
+        lock_timeout -- [float] Seconds until the variables locked by a claimed task are released,
+                        unless its worker renews them.
+        """
+        self._db_path = db_path
+        self._interface = SqliteInterface(db_path)
+        self._conn = self._interface._conn
+        self._id = "{hostname}:{pid}".format(hostname=socket.gethostname(), pid=os.getpid())
+        self._logdir_path = logdir_path
+        if logdir_path is not None:
+            os.makedirs(logdir_path, exist_ok=True)
+        self._verbose = verbose
+        self._lock_timeout = lock_timeout
+        self._wedmakefiles = dict()
+
+    def wedmakefile(self, wedmakefile_path):
+        """Return the parsed WED-Makefile at the specified path, parsing it only once.
+
+        wedmakefile_path -- [str] Path to the WED-Makefile.
+        """
+        if wedmakefile_path not in self._wedmakefiles:
+            self._wedmakefiles[wedmakefile_path] = wedmakefile_parser.WEDMakefile(wedmakefile_path)
+        return self._wedmakefiles[wedmakefile_path]
+
+    def print_message(self, eid, message):
+        """Write a message about the specified experiment instance to the standard output.
+
+        eid -- [int] Id of the experiment instance.
+        message -- [str] Message to write.
+        """
+        if self._verbose:
+            print("{timestamp} - [{worker}] Experiment instance {eid}: {message}".format(
+                timestamp=time.strftime("%Y-%m-%d-%H-%M-%S"),
+                worker=self._id,
+                eid=eid,
+                message=message
+            ))
+        else:
+            print("-- Experiment instance {eid}: {message}".format(eid=eid, message=message))
+
+    def release_stale_locks(self):
+        """Release the variables locked by dead worker processes on this host and the variables
+        whose locks expired without being renewed, and mark the executions of their tasks as
+        abandoned.
+        """
+        hostname = socket.gethostname()
+        now = time.time()
+        stale_locks = []
+        for worker, eid, task, expires_at in self._conn.execute(
+                "SELECT _worker, _eid, _task, MIN(_expires_at) FROM variable_lock "
+                "GROUP BY _worker, _eid, _task").fetchall():
+            is_dead = False
+            worker_hostname, pid = worker.rsplit(':', 1)
+            if worker_hostname == hostname:
+                try:
+                    os.kill(int(pid), 0)
+                except ProcessLookupError:
+                    is_dead = True
+                except PermissionError:
+                    pass
+            if is_dead or expires_at < now:
+                stale_locks.append((worker, eid, task, is_dead))
+        if not stale_locks:
+            return
+        released = []
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            for worker, eid, task, is_dead in stale_locks:
+                # The locks of a live worker may have been renewed in the meantime.
+                if self._conn.execute(
+                        "DELETE FROM variable_lock WHERE _worker = ? AND _eid = ? AND _task = ? "
+                        "AND (? OR _expires_at < ?)",
+                        (worker, eid, task, is_dead, now)).rowcount == 0:
+                    continue
+                self._conn.execute(
+                    "UPDATE task_result SET _status = 'abandoned' "
+                    "WHERE _worker = ? AND _eid = ? AND _task = ? AND _status = 'running'",
+                    (worker, eid, task)
+                )
+                released.append((worker, eid, task))
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("COMMIT")
+        for worker, eid, task in released:
+            self.print_message(eid, "Released the variables locked by task {task} of {worker}; the "
+                                    "task can be claimed again.".format(task=task, worker=worker))
+
+    def is_unchanged(self, eid, ei_state, variables=None):
+        """Return True if the specified experiment instance is still running and the specified
+        variables still have the versions they have in the specified state. Return False, otherwise.
+
+        eid -- [int] Id of the experiment instance.
+        ei_state -- [PyExperimentInstanceState] State of the experiment instance read earlier.
+        variables -- [list of wedmakefile_parser.Variable/None] Variables to check. If None, every
+                     variable of the experiment instance is checked.
+        """
+        if self._conn.execute(
+                "SELECT _status FROM experiment_instance WHERE _id = ?", (eid,)
+        ).fetchone()[0] != 'running':
+            return False
+        if variables is None:
+            return dict(self._conn.execute(
+                "SELECT _identifier, _version FROM experiment_instance_state WHERE _eid = ?", (eid,)
+            ).fetchall()) == ei_state._version
+        for variable in variables:
+            row = self._conn.execute(
+                "SELECT _version FROM experiment_instance_state WHERE _eid = ? AND _identifier = ?",
+                (eid, variable.identifier())
+            ).fetchone()
+            if (None if row is None else row[0]) != ei_state._version.get(variable.identifier()):
+                return False
+        return True
+
+    def scan(self):
+        """Look for a task ready to be executed in a read transaction, which does not block other
+        workers. Return a tuple (candidate, transitions), where candidate is a tuple (experiment
+        instance id, task, PyExperimentInstanceState) or None if no task is ready to be executed,
+        and transitions is a list of (experiment instance id, status, PyExperimentInstanceState)
+        tuples of the experiment instances found in a final or inconsistent state.
+        """
+        candidate = None
+        transitions = []
+        self._conn.execute("BEGIN")
+        try:
+            running_instances = self._conn.execute(
+                "SELECT _id, _wedmakefile_path FROM experiment_instance WHERE _status = 'running'"
+            ).fetchall()
+            random.shuffle(running_instances)
+            for eid, wedmakefile_path in running_instances:
+                wedmakefile = self.wedmakefile(wedmakefile_path)
+                ei_state = self._interface.load_state(eid)
+                locked_variables = set([row[0] for row in self._conn.execute(
+                    "SELECT _identifier FROM variable_lock WHERE _eid = ?", (eid,)
+                )])
+                ready_tasks = []
+                has_satisfied_guard = False
+                for task in wedmakefile.tasks():
+                    for dependency in task.guard().dependencies():
+                        if not py_runtime.PyDependency(dependency).is_satisfied_by(ei_state):
+                            break
+                    else:
+                        has_satisfied_guard = True
+                        if not any([
+                            variable.identifier() in locked_variables
+                            for variable in task.guard().on_variables()
+                        ]):
+                            ready_tasks.append(task)
+                # The state is only final or inconsistent if no task is being executed, and then no
+                # further task is executed, as in PyExperimentInstance.run.
+                if not locked_variables:
+                    is_in_final_state = True
+                    for dependency in wedmakefile.final_guard().dependencies():
+                        if not py_runtime.PyDependency(dependency).is_satisfied_by(ei_state):
+                            is_in_final_state = False
+                    if is_in_final_state:
+                        transitions.append((eid, 'final', ei_state))
+                        continue
+                    if not has_satisfied_guard:
+                        transitions.append((eid, 'inconsistent', ei_state))
+                        continue
+                if ready_tasks:
+                    candidate = (eid, random.choice(ready_tasks), ei_state)
+                    break
+        finally:
+            self._conn.execute("COMMIT")
+        return candidate, transitions
+
+    def claim(self):
+        """Claim a task ready to be executed, locking its dependent variables. Return a tuple
+        (experiment instance id, task, PyExperimentInstanceState, task result id) or None if no task
+        is ready to be executed. Experiment instances found in a final or inconsistent state are
+        marked as such.
+
+        Candidates are looked for by method scan, outside of the database write lock, which is only
+        held to check that they are unchanged and to lock the variables of the chosen task.
+        """
+        while True:
+            candidate, transitions = self.scan()
+            if candidate is None and not transitions:
+                return None
+            claimed = None
+            marked = []
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for eid, status, ei_state in transitions:
+                    if self._conn.execute(
+                            "SELECT COUNT(*) FROM variable_lock WHERE _eid = ?", (eid,)
+                    ).fetchone()[0] > 0 or not self.is_unchanged(eid, ei_state):
+                        continue
+                    self._conn.execute(
+                        "UPDATE experiment_instance SET _status = ?, _message = ? WHERE _id = ?",
+                        (
+                            status,
+                            None if status == 'final' else
+                            "InconsistentState: Reached an inconsistent state.",
+                            eid
+                        )
+                    )
+                    marked.append((eid, status))
+                if candidate is not None:
+                    eid, task, ei_state = candidate
+                    variables = task.guard().on_variables()
+                    if self.is_unchanged(eid, ei_state, variables) and not any([
+                        self._conn.execute(
+                            "SELECT 1 FROM variable_lock WHERE _eid = ? AND _identifier = ?",
+                            (eid, variable.identifier())
+                        ).fetchone() is not None
+                        for variable in variables
+                    ]):
+                        expires_at = time.time() + self._lock_timeout
+                        self._conn.executemany(
+                            "INSERT INTO variable_lock(_eid, _identifier, _task, _worker, "
+                            "_expires_at) VALUES (?, ?, ?, ?, ?)",
+                            [
+                                (eid, variable.identifier(), task.name(), self._id, expires_at)
+                                for variable in variables
+                            ]
+                        )
+                        result_id = self._conn.execute(
+                            "INSERT INTO task_result(_eid, _task, _worker, _started_at) "
+                            "VALUES (?, ?, ?, ?)",
+                            (eid, task.name(), self._id, time.time())
+                        ).lastrowid
+                        claimed = (eid, task, ei_state, result_id)
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            for eid, status in marked:
+                self.print_message(eid, "Reached a final state." if status == 'final' else
+                                        "Reached an inconsistent state.")
+            # Otherwise, another worker changed the candidate's experiment instance in the meantime.
+            if claimed is not None or candidate is None:
+                return claimed
+
+    def heartbeat(self, eid, task, stop):
+        """Renew the variables locked by the specified task until stopped or released.
+
+        eid -- [int] Id of the experiment instance.
+        task -- [wedmakefile_parser.Task] Task being executed.
+        stop -- [threading.Event] Event set to stop renewing the locks.
+        """
+        # SQLite connections cannot be shared between threads.
+        conn = sqlite3.connect(self._db_path, timeout=60.0, isolation_level=None)
+        try:
+            while not stop.wait(self._lock_timeout / 3.0):
+                if conn.execute(
+                        "UPDATE variable_lock SET _expires_at = ? "
+                        "WHERE _eid = ? AND _task = ? AND _worker = ?",
+                        (time.time() + self._lock_timeout, eid, task.name(), self._id)
+                ).rowcount == 0:
+                    return
+        finally:
+            conn.close()
+
+    def commit(self, eid, task, ei_state, result_id, other_state, error):
+        """Atomically commit the updates of an executed task and release its dependent variables.
+
+        eid -- [int] Id of the experiment instance.
+        task -- [wedmakefile_parser.Task] Executed task.
+        ei_state -- [PyExperimentInstanceState] State the task was executed against.
+        result_id -- [int] Id of the task result.
+        other_state -- [PyExperimentInstanceState/None] Values and permissions of variables assigned
+                       by the task's Bash script.
+        error -- [str/None] Error raised while executing the task, if any.
+        """
+        if error is None:
+            for variable_identifier in other_state.keys():
+                if wedmakefile_parser.Variable(variable_identifier) not in \
+                        task.guard().on_variables():
+                    error = "UndeclaredDependency: Variable {variable_identifier} was not " \
+                            "declared as a dependency of task {task}.".format(
+                        task=task.name(),
+                        variable_identifier=variable_identifier
+                    )
+                    break
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            if self._conn.execute(
+                    "SELECT _status FROM task_result WHERE _id = ?", (result_id,)
+            ).fetchone()[0] != 'running':
+                self._conn.execute("ROLLBACK")
+                self.print_message(eid, "Discarded the results of task {task}: its locks were "
+                                        "released.".format(task=task.name()))
+                return
+            if error is None:
+                diff_state = other_state.diff(ei_state)
+                self._conn.executemany("""
+                    INSERT INTO experiment_instance_state(_eid, _identifier, _value, _perm)
+                        VALUES (?, ?, ?, ?)
+                    ON CONFLICT(_eid, _identifier) DO UPDATE
+                        SET _value = excluded._value, _perm = excluded._perm,
+                            _version = _version + 1
+                """, [
+                    (
+                        eid,
+                        variable_identifier,
+                        variable_value,
+                        "ro" if diff_state.is_readonly(variable_identifier) else "rw"
+                    )
+                    for variable_identifier, variable_value in diff_state.items()
+                ])
+            else:
+                self._conn.execute(
+                    "UPDATE experiment_instance SET _status = 'failed', _message = ? "
+                    "WHERE _id = ?",
+                    (error, eid)
+                )
+            self._conn.execute(
+                "UPDATE task_result SET _finished_at = ?, _status = ? WHERE _id = ?",
+                (time.time(), "success" if error is None else "error", result_id)
+            )
+            self._conn.execute(
+                "DELETE FROM variable_lock WHERE _eid = ? AND _task = ? AND _worker = ?",
+                (eid, task.name(), self._id)
+            )
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("COMMIT")
+        if error is None:
+            self.print_message(eid, "Finished the execution of task {task}.".format(
+                task=task.name()
+            ))
+        else:
+            self.print_message(eid, error)
+
+    def execute(self, eid, task, ei_state):
+        """Execute the specified task's Bash script against the specified state outside of any
+        transaction. Return a tuple (PyExperimentInstanceState, error).
+
+        eid -- [int] Id of the experiment instance.
+        task -- [wedmakefile_parser.Task] Task to execute.
+        ei_state -- [PyExperimentInstanceState] State to execute the task against.
+        """
+        self.print_message(eid, "Triggered the execution of task {task}.".format(task=task.name()))
+        stdout, stderr = "/dev/null", "/dev/null"
+        if self._logdir_path is not None:
+            timestamp = time.strftime("%Y%m%d%H%M%S")
+            stdout, stderr = [
+                os.path.join(self._logdir_path, "{eid}_{task}_{timestamp}.{ext}".format(
+                    eid=eid,
+                    task=task.name(),
+                    timestamp=timestamp,
+                    ext=ext
+                ))
+                for ext in ("out", "err")
+            ]
+        try:
+            return py_runtime.PyExperimentInstanceState.from_task(
+                task, ei_state, stdout, stderr
+            ), None
+        except Exception:
+            return None, "TaskExecutionError: Error while executing task {task}.".format(
+                task=task.name()
+            )
+
+    def run(self, poll_interval=0.1, exit_when_idle=True):
+        """Claim and execute tasks until no experiment instance is running (or forever, if
+        exit_when_idle is False).
+
+        poll_interval -- [float] Seconds to sleep when no task is ready to be executed.
+        exit_when_idle -- [bool] Return when no experiment instance is running.
+        """
+        self.release_stale_locks()
+        released_at = time.time()
+        while True:
+            claimed = self.claim()
+            if claimed is not None:
+                eid, task, ei_state, result_id = claimed
+                stop = threading.Event()
+                heartbeat_thread = threading.Thread(target=self.heartbeat, args=(eid, task, stop))
+                heartbeat_thread.start()
+                try:
+                    other_state, error = self.execute(eid, task, ei_state)
+                finally:
+                    stop.set()
+                    heartbeat_thread.join()
+                self.commit(eid, task, ei_state, result_id, other_state, error)
+                continue
+            if exit_when_idle and self._conn.execute(
+                    "SELECT COUNT(*) FROM experiment_instance WHERE _status = 'running'"
+            ).fetchone()[0] == 0:
+                return
+            # Workers that die while executing a task hold its variables until released here.
+            if time.time() - released_at >= self._lock_timeout / 3.0:
+                self.release_stale_locks()
+                released_at = time.time()
+            time.sleep(poll_interval)
@@ -0,0 +1,458 @@
+"""Utilities to distribute the tasks of an experiment instance across several hosts.
+
+A coordinator owns the state of an experiment instance and all scheduling decisions. Agents running
+on other hosts connect to the coordinator over TCP, lease tasks ready to be executed, execute their
+Bash scripts locally, and return the updated variables. Leases expire unless renewed, in which case
+the leased task is re-dispatched to another agent and late results are discarded.
+
+Messages are JSON objects, one per line. An agent sends requests and the coordinator answers each of
+them with exactly one response:
+- {"op": "lease"} -> {"op": "task", "lease": ..., "task": ..., "guard": [...], "bash": ...,
+  "state": [[identifier, value, permission], ...], "timeout": ...}, {"op": "wait", "delay": ...}, or
+  {"op": "done", "status": ..., "message": ...};
+- {"op": "renew", "lease": ...} -> {"op": "ok"} or {"op": "expired"};
+- {"op": "complete", "lease": ..., "state": [[identifier, value, permission], ...]} or
+  {"op": "complete", "lease": ..., "error": ...} -> {"op": "ok"} or {"op": "expired"}.
+"""
+
+
+import itertools
+import json
+import os
+import random
+import socket
+import socketserver
+import threading
+import time
+
+import py_runtime
+import wedmakefile_parser
+
+
+def state_to_list(ei_state):
+    """Return a JSON-serializable list of [identifier, value, permission] lists.
+
+    ei_state -- [py_runtime.PyExperimentInstanceState] State to serialize.
+    """
+    return [
+        [variable_identifier, variable_value, "ro" if ei_state.is_readonly(variable_identifier)
+                else "rw"]
+        for variable_identifier, variable_value in sorted(ei_state.items())
+    ]
+
+
+def state_from_list(variables):
+    """Return a PyExperimentInstanceState initialized from a list of [identifier, value,
+    permission] lists.
+
+    variables -- [list of list of str] Serialized state.
+    """
+    ei_state = py_runtime.PyExperimentInstanceState()
+    for variable_identifier, variable_value, permission in variables:
+        ei_state[wedmakefile_parser.Variable.validate_identifier(variable_identifier)] = \
+                wedmakefile_parser.Variable.validate_value(variable_value)
+        ei_state._permission[variable_identifier] = permission
+    return ei_state
+
+
+class Lease:
+    """A task leased to an agent."""
+
+    def __init__(self, lease_id, task, agent, timeout):
+        """Initialize a Lease.
+
+        lease_id -- [int] Id of the lease.
+        task -- [wedmakefile_parser.Task] Leased task.
+        agent -- [str] Address of the agent holding the lease.
+        timeout -- [float] Seconds until the lease expires, unless renewed.
+        """
+        self._id = lease_id
+        self._task = task
+        self._agent = agent
+        self._timeout = timeout
+        self._expires_at = time.time() + timeout
+
+    def id(self):
+        """Return the id."""
+        return self._id
+
+    def task(self):
+        """Return the leased task."""
+        return self._task
+
+    def agent(self):
+        """Return the address of the agent holding the lease."""
+        return self._agent
+
+    def renew(self):
+        """Postpone the expiration of the lease."""
+        self._expires_at = time.time() + self._timeout
+
+    def is_expired(self):
+        """Return True if the lease expired. Return False, otherwise."""
+        return time.time() > self._expires_at
+
+
+class CoordinatorServer(socketserver.ThreadingTCPServer):
+    """A TCP server handling each agent connection in its own thread."""
+
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+class Coordinator:
+    """A coordinator that owns the state of an experiment instance and leases its tasks to
+    agents."""
+
+    def __init__(self, wedmakefile, config_path, host="0.0.0.0", port=0, lease_timeout=60.0,
+            poll_interval=0.1, verbose=False):
+        """Initialize a Coordinator with the specified parsed WED-Makefile and configuration file,
+        listening on the specified address.
+
+        wedmakefile -- [wedmakefile_parser.WEDMakefile] Parsed WED-Makefile containing the
+                       experiment specification.
+        config_path -- [str] Path to the configuration file containing the initial state of the
+                       experiment instance.
+        host -- [str] Address to listen on.
+        port -- [int] Port to listen on (0 picks a free port).
+        lease_timeout -- [float] Seconds until a lease expires unless renewed by its agent.
+        poll_interval -- [float] Seconds agents wait before asking again when no task is ready.
+        verbose -- [bool] Enable/Disable verbose mode.
+        """
+        self._wedmakefile = wedmakefile
+        with open(config_path) as config_file:
+            self._state = py_runtime.PyExperimentInstanceState.from_bash_script(
+                setup="",
+                main=config_file.read().strip()
+            )
+        for dependency in wedmakefile.initial_guard().dependencies():
+            if not py_runtime.PyDependency(dependency).is_satisfied_by(self._state):
+                raise RuntimeError(
+                    "UnsatisfiedInitialGuard: The initial state does not satisfy dependency "
+                    "{dependency_clause}.".format(
+                        dependency_clause=dependency.clause()
+                    )
+                )
+        self._lease_timeout = lease_timeout
+        self._poll_interval = poll_interval
+        self._verbose = verbose
+        self._lock = threading.Lock()
+        self._leases = dict()
+        self._lease_ids = itertools.count(1)
+        self._locked_variables = set()
+        self._status = "running"
+        self._message = None
+        self._finished = threading.Event()
+        self._n_connections = 0
+        coordinator = self
+
+        class Handler(socketserver.StreamRequestHandler):
+
+            def handle(self):
+                with coordinator._lock:
+                    coordinator._n_connections += 1
+                try:
+                    for line in self.rfile:
+                        response = coordinator.handle(
+                            json.loads(line.decode("utf-8")),
+                            "{host}:{port}".format(
+                                host=self.client_address[0],
+                                port=self.client_address[1]
+                            )
+                        )
+                        self.wfile.write((json.dumps(response) + '\n').encode("utf-8"))
+                        self.wfile.flush()
+                        if response["op"] == "done":
+                            break
+                finally:
+                    with coordinator._lock:
+                        coordinator._n_connections -= 1
+
+        self._server = CoordinatorServer((host, port), Handler)
+
+    def address(self):
+        """Return the (host, port) the coordinator listens on."""
+        return self._server.server_address
+
+    def state(self):
+        """Return the state of the experiment instance."""
+        return self._state
+
+    def print_message(self, message):
+        """Write a message to the standard output.
+
+        message -- [str] Message to write.
+        """
+        if self._verbose:
+            print("{timestamp} - {message}".format(
+                timestamp=time.strftime("%Y-%m-%d-%H-%M-%S"),
+                message=message
+            ))
+        else:
+            print("-- " + message)
+
+    def satisfies(self, guard):
+        """Return True if the state of the experiment instance satisfies the specified guard.
+        Return False, otherwise.
+
+        guard -- [wedmakefile_parser.Guard] Guard to evaluate.
+        """
+        for dependency in guard.dependencies():
+            if not py_runtime.PyDependency(dependency).is_satisfied_by(self._state):
+                return False
+        return True
+
+    def release(self, lease):
+        """Release the variables locked by the specified lease.
+
+        lease -- [Lease] Lease to release.
+        """
+        del self._leases[lease.id()]
+        for variable in lease.task().guard().on_variables():
+            self._locked_variables.discard(variable.identifier())
+
+    def finish(self, status, message=None):
+        """Record that the experiment instance reached a terminal status.
+
+        status -- [str] 'final', 'inconsistent', or 'failed'.
+        message -- [str/None] Description of the terminal status.
+        """
+        self._status = status
+        self._message = message
+        self._finished.set()
+
+    def handle(self, request, agent):
+        """Return the response to the specified request.
+
+        request -- [dict] Request sent by an agent.
+        agent -- [str] Address of the agent.
+        """
+        with self._lock:
+            for lease in list(self._leases.values()):
+                if lease.is_expired():
+                    self.release(lease)
+                    self.print_message(
+                        "Lease {lease} of task {task} held by {agent} expired; the task will be "
+                        "re-dispatched.".format(lease=lease.id(), task=lease.task().name(),
+                                                agent=lease.agent())
+                    )
+            if request["op"] == "lease":
+                return self.handle_lease(agent)
+            if request["op"] == "renew":
+                if request["lease"] not in self._leases:
+                    return {"op": "expired"}
+                self._leases[request["lease"]].renew()
+                return {"op": "ok"}
+            if request["op"] == "complete":
+                return self.handle_complete(request)
+            return {"op": "error", "message": "Unknown operation {op}.".format(op=request["op"])}
+
+    def handle_lease(self, agent):
+        """Return a lease on a task ready to be executed, if any.
+
+        agent -- [str] Address of the agent asking for a lease.
+        """
+        if self._status != "running":
+            return {"op": "done", "status": self._status, "message": self._message}
+        # The state is only final or inconsistent if no task is being executed, and then no further
+        # task is executed, as in PyExperimentInstance.run.
+        if not self._leases:
+            if self.satisfies(self._wedmakefile.final_guard()):
+                self.finish("final")
+                return {"op": "done", "status": self._status, "message": self._message}
+            if not any([self.satisfies(task.guard()) for task in self._wedmakefile.tasks()]):
+                self.finish("inconsistent", "InconsistentState: Reached an inconsistent state.")
+                return {"op": "done", "status": self._status, "message": self._message}
+        ready_tasks = [
+            task for task in self._wedmakefile.tasks()
+            if not any([
+                variable.identifier() in self._locked_variables
+                for variable in task.guard().on_variables()
+            ]) and self.satisfies(task.guard())
+        ]
+        if ready_tasks:
+            task = random.choice(ready_tasks)
+            lease = Lease(next(self._lease_ids), task, agent, self._lease_timeout)
+            self._leases[lease.id()] = lease
+            for variable in task.guard().on_variables():
+                self._locked_variables.add(variable.identifier())
+            self.print_message("Leased task {task} to {agent}.".format(
+                task=task.name(),
+                agent=agent
+            ))
+            return {
+                "op": "task",
+                "lease": lease.id(),
+                "task": task.name(),
+                "guard": [dependency.clause() for dependency in task.guard().dependencies()],
+                "bash": task.bash_script(),
+                "state": state_to_list(self._state),
+                "timeout": self._lease_timeout
+            }
+        return {"op": "wait", "delay": self._poll_interval}
+
+    def handle_complete(self, request):
+        """Apply the updates of a completed task, unless its lease expired.
+
+        request -- [dict] Request sent by an agent.
+        """
+        lease = self._leases.get(request["lease"], None)
+        if lease is None:
+            return {"op": "expired"}
+        self.release(lease)
+        if self._status != "running":
+            return {"op": "ok"}
+        if request.get("error", None) is not None:
+            self.finish("failed", request["error"])
+            return {"op": "ok"}
+        diff_state = state_from_list(request["state"])
+        for variable_identifier in diff_state.keys():
+            if wedmakefile_parser.Variable(variable_identifier) not in \
+                    lease.task().guard().on_variables():
+                self.finish("failed", "UndeclaredDependency: Variable {variable_identifier} was "
+                            "not declared as a dependency of task {task}.".format(
+                    task=lease.task().name(),
+                    variable_identifier=variable_identifier
+                ))
+                return {"op": "ok"}
+        self._state.update(diff_state)
+        self.print_message("Finished the execution of task {task}.".format(
+            task=lease.task().name()
+        ))
+        return {"op": "ok"}
+
+    def run(self):
+        """Serve agents until the experiment instance reaches a terminal status and every connected
+        agent was notified. Return True if it reached a final state. Return False, otherwise."""
+        server_thread = threading.Thread(target=self._server.serve_forever)
+        server_thread.daemon = True
+        server_thread.start()
+        self._finished.wait()
+        deadline = time.time() + self._lease_timeout
+        while self._n_connections > 0 and time.time() < deadline:
+            time.sleep(self._poll_interval)
+        self._server.shutdown()
+        self._server.server_close()
+        if self._status != "final":
+            raise RuntimeError(self._message)
+        return True
+
+
+class Agent:
+    """An agent that leases tasks from a coordinator and executes them locally."""
+
+    def __init__(self, host, port, logdir_path=None, verbose=False):
+        """Initialize an Agent connecting to the specified coordinator.
+
+        host -- [str] Coordinator hostname.
+        port -- [int] Coordinator port.
+        logdir_path -- [str/None] Path to the directory where the standard output and standard error
+                       of tasks' Bash scripts are written. If None, they are discarded.
+        verbose -- [bool] Enable/Disable verbose mode.
+        """
+        self._address = (host, port)
+        self._logdir_path = logdir_path
+        if logdir_path is not None:
+            os.makedirs(logdir_path, exist_ok=True)
+        self._verbose = verbose
+        self._lock = threading.Lock()
+        self._file = None
+
+    def request(self, message):
+        """Send a request to the coordinator and return its response.
+
+        message -- [dict] Request to send.
+        """
+        with self._lock:
+            self._file.write((json.dumps(message) + '\n').encode("utf-8"))
+            self._file.flush()
+            line = self._file.readline()
+        if not line:
+            raise ConnectionError("The coordinator closed the connection.")
+        return json.loads(line.decode("utf-8"))
+
+    def heartbeat(self, lease_id, timeout, stop):
+        """Renew the specified lease until stopped or expired.
+
+        lease_id -- [int] Id of the lease to renew.
+        timeout -- [float] Seconds until the lease expires.
+        stop -- [threading.Event] Event set to stop renewing the lease.
+        """
+        while not stop.wait(timeout / 3.0):
+            if self.request({"op": "renew", "lease": lease_id})["op"] != "ok":
+                return
+
+    def execute(self, response):
+        """Execute a leased task and return the request completing it.
+
+        response -- [dict] Lease sent by the coordinator.
+        """
+        task = wedmakefile_parser.Task(
+            response["task"],
+            wedmakefile_parser.Guard(response["guard"]),
+            response["bash"]
+        )
+        ei_state = state_from_list(response["state"])
+        stdout, stderr = "/dev/null", "/dev/null"
+        if self._logdir_path is not None:
+            timestamp = time.strftime("%Y%m%d%H%M%S")
+            stdout, stderr = [
+                os.path.join(self._logdir_path, "{task}_{timestamp}.{ext}".format(
+                    task=task.name(),
+                    timestamp=timestamp,
+                    ext=ext
+                ))
+                for ext in ("out", "err")
+            ]
+        if self._verbose:
+            print("{timestamp} - Triggered the execution of task {task}.".format(
+                timestamp=time.strftime("%Y-%m-%d-%H-%M-%S"),
+                task=task.name()
+            ))
+        try:
+            other_state = py_runtime.PyExperimentInstanceState.from_task(
+                task, ei_state, stdout, stderr
+            )
+        except Exception:
+            return {
+                "op": "complete",
+                "lease": response["lease"],
+                "error": "TaskExecutionError: Error while executing task {task}.".format(
+                    task=task.name()
+                )
+            }
+        return {
+            "op": "complete",
+            "lease": response["lease"],
+            "state": state_to_list(other_state.diff(ei_state))
+        }
+
+    def run(self):
+        """Lease and execute tasks until the coordinator reports a terminal status. Return the
+        terminal status."""
+        with socket.create_connection(self._address) as sock:
+            self._file = sock.makefile("rwb")
+            while True:
+                response = self.request({"op": "lease"})
+                if response["op"] == "done":
+                    return response["status"]
+                if response["op"] == "wait":
+                    time.sleep(response["delay"])
+                    continue
+                stop = threading.Event()
+                heartbeat_thread = threading.Thread(
+                    target=self.heartbeat,
+                    args=(response["lease"], response["timeout"], stop)
+                )
+                heartbeat_thread.start()
+                try:
+                    completion = self.execute(response)
+                finally:
+                    stop.set()
+                    heartbeat_thread.join()
+                if self.request(completion)["op"] == "expired" and self._verbose:
+                    print("{timestamp} - Discarded the results of task {task}: its lease "
+                          "expired.".format(
+                        timestamp=time.strftime("%Y-%m-%d-%H-%M-%S"),
+                        task=response["task"]
+                    ))
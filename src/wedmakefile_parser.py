@@ -247,6 +247,9 @@ class Guard:
             Dependency(clause)
             for clause in (clauses if isinstance(clauses, list) else [clauses])
         ])
+        self._on_variables = sorted(set([
+            dependency.on_variable() for dependency in self._dependencies
+        ]))
 
     def dependencies(self):
         """Return the dependencies."""
@@ -258,11 +261,11 @@ class Guard:
 
         namespace -- [str/None] Namespace to filter the dependent variables.
         """
-        return sorted([
+        return [
             variable
-            for variable in set([dependency.on_variable() for dependency in self._dependencies])
+            for variable in self._on_variables
             if namespace is None or variable.namespace() == namespace
-        ])
+        ]
 
     def on_variables_namespaces(self):
         """Return a sorted list with the namespaces of the dependent variables."""
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The runtimes are imported as top-level modules, as metabase.py does.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
@@ -0,0 +1,91 @@
+import os
+import signal
+import sqlite3
+import subprocess
+import sys
+import time
+
+import pytest
+
+import sqlite_runtime
+
+METABASE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src",
+                        "metabase.py")
+
+WEDMAKEFILE = """
+initial_guard:
+  - $A = ""
+
+final_guard:
+  - $A = "1"
+
+tasks:
+- name: TA
+  guard:
+    - $A = ""
+  bash: |
+    sleep 2
+    readonly A="1"
+"""
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    (tmp_path / "wf.yml").write_text(WEDMAKEFILE)
+    (tmp_path / "cfg.sh").write_text('A=""\n')
+    db_path = str(tmp_path / "db.sqlite")
+    sqlite_runtime.SqliteInterface(db_path).instantiate(
+        str(tmp_path / "wf.yml"), str(tmp_path / "cfg.sh")
+    )
+    return db_path
+
+
+def start_worker(db_path, lock_timeout):
+    return subprocess.Popen(
+        [sys.executable, METABASE, "worker", db_path, "--lock-timeout", str(lock_timeout)],
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+    )
+
+
+def wait_for_lock(db_path, timeout=10.0):
+    conn = sqlite3.connect(db_path)
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if conn.execute("SELECT COUNT(*) FROM variable_lock").fetchone()[0] > 0:
+            return
+        time.sleep(0.05)
+    raise TimeoutError("No task was claimed.")
+
+
+def task_results(db_path):
+    return sorted(row[0] for row in sqlite3.connect(db_path).execute(
+        "SELECT _status FROM task_result"
+    ))
+
+
+def test_killed_worker_releases_its_locks(db_path):
+    killed = start_worker(db_path, 6.0)
+    wait_for_lock(db_path)
+    survivor = start_worker(db_path, 6.0)
+    time.sleep(0.5)
+    killed.send_signal(signal.SIGKILL)
+    killed.wait()
+    # The dead worker is detected within a third of the lock timeout, before it expires.
+    assert survivor.wait(timeout=30) == 0
+    assert sqlite_runtime.SqliteInterface(db_path).status() == [(1, "final", None, 1)]
+    assert task_results(db_path) == ["abandoned", "success"]
+
+
+def test_expired_locks_are_released_and_late_results_discarded(db_path):
+    stopped = start_worker(db_path, 1.0)
+    wait_for_lock(db_path)
+    stopped.send_signal(signal.SIGSTOP)
+    try:
+        other = start_worker(db_path, 1.0)
+        assert other.wait(timeout=30) == 0
+    finally:
+        stopped.send_signal(signal.SIGCONT)
+    output = stopped.communicate(timeout=30)[0].decode("utf-8")
+    assert "Discarded the results of task TA" in output
+    assert sqlite_runtime.SqliteInterface(db_path).status() == [(1, "final", None, 1)]
+    assert task_results(db_path) == ["abandoned", "success"]
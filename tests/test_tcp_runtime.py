@@ -0,0 +1,116 @@
+import json
+import socket
+import threading
+
+import pytest
+
+import tcp_runtime
+import wedmakefile_parser
+
+WEDMAKEFILE = """
+initial_guard:
+  - $A = ""
+
+final_guard:
+  - $A = "1"
+  - $B = "1"
+
+tasks:
+- name: TA
+  guard:
+    - $A = ""
+  bash: |
+    readonly A="1"
+
+- name: TB
+  guard:
+    - $A = "1"
+    - $B = ""
+  bash: |
+    B="1"
+"""
+
+
+@pytest.fixture
+def coordinator(tmp_path):
+    (tmp_path / "wf.yml").write_text(WEDMAKEFILE)
+    (tmp_path / "cfg.sh").write_text('A=""\nB=""\n')
+    coordinator = tcp_runtime.Coordinator(
+        wedmakefile_parser.WEDMakefile(str(tmp_path / "wf.yml")),
+        str(tmp_path / "cfg.sh"),
+        host="127.0.0.1",
+        lease_timeout=0.5,
+        poll_interval=0.05
+    )
+    result = {}
+
+    def run():
+        try:
+            result["final"] = coordinator.run()
+        except RuntimeError as e:
+            result["error"] = e
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    yield coordinator, result
+    thread.join(timeout=30)
+    assert result == {"final": True}
+
+
+def run_agents(coordinator, n_agents):
+    statuses = []
+    threads = [
+        threading.Thread(target=lambda: statuses.append(
+            tcp_runtime.Agent(*coordinator.address()).run()
+        ))
+        for _ in range(n_agents)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=30)
+    return statuses
+
+
+class RawAgent:
+    """An agent speaking the protocol by hand, to lease a task and never renew it."""
+
+    def __init__(self, address):
+        self._sock = socket.create_connection(address)
+        self._file = self._sock.makefile("rwb")
+
+    def request(self, message):
+        self._file.write((json.dumps(message) + '\n').encode("utf-8"))
+        self._file.flush()
+        return json.loads(self._file.readline().decode("utf-8"))
+
+    def close(self):
+        self._file.close()
+        self._sock.close()
+
+
+def test_agents_reach_the_final_state(coordinator):
+    coordinator, result = coordinator
+    assert run_agents(coordinator, 2) == ["final", "final"]
+    assert coordinator.state()["A"] == "1"
+    assert coordinator.state()["B"] == "1"
+
+
+def test_expired_lease_is_redispatched_and_late_completion_rejected(coordinator, capsys):
+    coordinator, result = coordinator
+    stale_agent = RawAgent(coordinator.address())
+    try:
+        lease = stale_agent.request({"op": "lease"})
+        assert lease["op"] == "task" and lease["task"] == "TA"
+        # The stale agent never renews its lease, so another agent executes TA again.
+        assert run_agents(coordinator, 1) == ["final"]
+        assert "Lease {lease} of task TA".format(lease=lease["lease"]) in capsys.readouterr().out
+        assert stale_agent.request({
+            "op": "complete",
+            "lease": lease["lease"],
+            "state": [["A", "late", "rw"]]
+        }) == {"op": "expired"}
+    finally:
+        stale_agent.close()
+    assert coordinator.state()["A"] == "1"
+    assert coordinator.state()["B"] == "1"